@@ -1,17 +1,31 @@
 from io import BytesIO
 import re
+import json
+import pickle
+import queue
+import base64
 import sqlite3
 from unicodedata import category
 import uuid
 import pandas as pd
 from werkzeug.utils import secure_filename
 import psycopg2
+import psycopg2.extras
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, send_file, url_for, session, flash
+from flask import Flask, Response, render_template, request, redirect, send_file, url_for, session, flash, jsonify, g, has_request_context
 from uuid import uuid4
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import logging
+import threading
+import select
+import shutil
+import tempfile
+import zipfile
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 import xlsxwriter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
@@ -30,6 +44,10 @@ app = Flask(__name__)
 app.secret_key = 'your-secret-key-123'
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Finished background exports; outside static/ so they are only served
+# through the access-checked download route. With several hosts, point it
+# at storage they all mount.
+app.config['EXPORT_FOLDER'] = os.environ.get('EXPORT_FOLDER', 'exports')
 
 # Valid jenis perwakilan options
 VALID_JENIS_PWK = ['KBRI', 'KJRI', 'PTRI', 'KRI', 'KDEI', 'PJB']
@@ -38,103 +56,490 @@ VALID_JENIS_PWK = ['KBRI', 'KJRI', 'PTRI', 'KRI', 'KDEI', 'PJB']
 # DATABASE FUNCTIONS
 # ==============================================
 
+DB_CONFIG = {
+    'host': "localhost",
+    'database': "db_simontok",
+    'user': "postgres",
+    'password': "sswatuniS4"
+}
+
+# Connection pool settings
+DB_POOL_MIN_SIZE = 2          # connections opened eagerly and kept warm
+DB_POOL_MAX_SIZE = 20         # hard cap on open connections
+DB_POOL_TIMEOUT = 10          # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = 1800   # recycle connections older than this (seconds)
+DB_POOL_MAX_IDLE = 300        # close spare connections idle longer than this (seconds)
+DB_POOL_PING_AFTER = 30       # ping connections idle longer than this on checkout (seconds)
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool.
+
+    Connections are handed out with getconn() and must be returned with
+    putconn(). On checkout a connection is health-checked (and pinged if it
+    has been idle for a while); connections past their lifetime are recycled.
+    """
+
+    def __init__(self, min_size, max_size, timeout, max_lifetime, max_idle,
+                 ping_after, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.connect_kwargs = connect_kwargs
+
+        self._lock = threading.Condition()
+        self._idle = deque()      # (conn, created_at, last_used)
+        self._created = {}        # id(conn) -> created_at, for checked-out conns
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        self._stats['connections_opened'] += 1
+        logger.debug("Database connection opened")
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats['connections_closed'] += 1
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - last_used > self.ping_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def fill(self):
+        """Open connections up to min_size"""
+        with self._lock:
+            while self._size < self.min_size:
+                conn = self._connect()
+                now = time.monotonic()
+                self._idle.append((conn, now, now))
+                self._size += 1
+            self._lock.notify_all()
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        started = time.monotonic()
+        while True:
+            candidate = None
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout}s "
+                            f"(pool size {self._size}/{self.max_size})"
+                        )
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    # LIFO keeps the hot connections hot and lets spares go idle
+                    candidate = self._idle.pop()
+                else:
+                    # Reserve a slot before connecting outside the lock
+                    self._size += 1
+
+            if candidate is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                created_at = time.monotonic()
+            else:
+                conn, created_at, last_used = candidate
+                now = time.monotonic()
+                if now - created_at > self.max_lifetime:
+                    self._stats['recycled'] += 1
+                    self._discard(conn)
+                    continue
+                if not self._is_healthy(conn, last_used):
+                    self._stats['failed_health_checks'] += 1
+                    self._discard(conn)
+                    continue
+
+            with self._lock:
+                self._created[id(conn)] = created_at
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += time.monotonic() - started
+            return conn
+
+    def _discard(self, conn):
+        self._close(conn)
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+
+    def putconn(self, conn, discard=False):
+        with self._lock:
+            created_at = self._created.pop(id(conn), time.monotonic())
+
+        if not discard and not conn.closed:
+            # Never hand out a connection with an open transaction
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        now = time.monotonic()
+        if discard or conn.closed or now - created_at > self.max_lifetime:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            self._idle.append((conn, created_at, now))
+            self._prune_idle(now)
+            self._lock.notify()
+
+    def _prune_idle(self, now):
+        # Called with the lock held: close spares that have been idle too long
+        while self._size > self.min_size and self._idle:
+            conn, created_at, last_used = self._idle[0]
+            if now - last_used <= self.max_idle:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            })
+        checkouts = stats['checkouts'] or 1
+        stats['avg_wait_ms'] = round(stats.pop('wait_time_total') * 1000 / checkouts, 3)
+        return stats
+
+    def closeall(self):
+        with self._lock:
+            while self._idle:
+                conn, _, _ = self._idle.popleft()
+                self._size -= 1
+                self._close(conn)
+            self._lock.notify_all()
+
+
+db_pool = ConnectionPool(
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_MAX_LIFETIME,
+    DB_POOL_MAX_IDLE,
+    DB_POOL_PING_AFTER,
+    **DB_CONFIG
+)
+
 def get_db_connection():
+    """Check a connection out of the pool; return it with release_db_connection()"""
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            database="db_simontok",
-            user="postgres",
-            password="sswatuniS4"
-        )
-        logger.debug("Database connection successful")
-        return conn
+        return db_pool.getconn()
     except psycopg2.Error as e:
         logger.error(f'Database connection error: {e}')
-        flash(f'Database connection error: {e}', 'error')
+        if has_request_context():
+            flash(f'Database connection error: {e}', 'error')
+        raise
+
+def release_db_connection(conn, discard=False):
+    db_pool.putconn(conn, discard=discard)
+
+# Connection held by transaction() blocks that run outside a request
+_tx_local = threading.local()
+
+# Role the row-level security policies apply to (migrations/004)
+DB_SCOPED_ROLE = 'app_perwakilan'
+
+def current_perwakilan_scope():
+    """Trigram the current user's rows are restricted to (None when unrestricted).
+
+    A non-admin without a trigram gets '', which matches no perwakilan rows.
+    """
+    if not has_request_context() or session.get('role') == 0:
         return None
+    return normalize_trigram(session.get('trigram'))
 
-def execute_query(query, params=None, fetch=False, fetch_one=False, commit=False):
+def set_connection_scope(conn, trigram):
+    """Restrict a connection to one perwakilan's rows, or lift it with trigram=None.
+
+    The setting is session-level (run outside a transaction), so it survives
+    the rollbacks of the request using the connection.
+    """
+    conn.autocommit = True
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(query, params or ())
-                if commit:
-                    conn.commit()
-                    return True
-                if fetch_one:
-                    result = cur.fetchone()
-                    return result if result else None
-                if fetch:
-                    return cur.fetchall()
-                return True
+        with conn.cursor() as cur:
+            if trigram is not None:
+                cur.execute(f"SET ROLE {DB_SCOPED_ROLE}; SELECT set_config('app.trigram', %s, false)",
+                            (trigram,))
+            else:
+                cur.execute("RESET ROLE; RESET app.trigram")
+    finally:
+        conn.autocommit = False
+
+def get_request_connection():
+    """Return the connection bound to the current request, checking one out on first use.
+
+    All execute_query() calls in a request share this connection and a single
+    transaction. Writes (commit=True) are committed once when the request
+    finishes successfully; any database error rolls the whole request back.
+    For non-admin users the connection runs under row-level security scoped
+    to their perwakilan.
+    """
+    if 'db_conn' not in g:
+        conn = get_db_connection()
+        scope = current_perwakilan_scope()
+        if scope is not None:
+            try:
+                set_connection_scope(conn, scope)
+            except psycopg2.Error:
+                release_db_connection(conn, discard=True)
+                raise
+        g.db_conn = conn
+        g.db_scope = scope
+        g.db_pending = False
+    return g.db_conn
+
+def _run_query(conn, query, params, fetch, fetch_one):
+    with conn.cursor() as cur:
+        cur.execute(query, params or ())
+        if fetch_one:
+            result = cur.fetchone()
+            return result if result else None
+        if fetch:
+            return cur.fetchall()
+        return True
+
+def _run_bulk(conn, query, rows, template, page_size, fetch):
+    with conn.cursor() as cur:
+        result = psycopg2.extras.execute_values(
+            cur, query, rows, template=template, page_size=page_size, fetch=fetch
+        )
+        return result if fetch else len(rows)
+
+def _execute(run, commit):
+    """Run run(conn) on the current unit of work's connection, or a pooled one"""
+    if has_request_context():
+        state, conn = g, get_request_connection()
+    elif getattr(_tx_local, 'conn', None) is not None:
+        state, conn = _tx_local, _tx_local.conn
+    else:
+        state, conn = None, None
+
+    if conn is not None:
+        try:
+            result = run(conn)
+            if commit:
+                state.db_pending = True
+            return result
+        except Exception as e:
+            logger.error(f"Database error: {str(e)}")
+            # The transaction is aborted; undo the whole unit of work
+            if not conn.closed:
+                conn.rollback()
+            state.db_pending = False
+            state.db_after_commit = None
+            raise e
+
+    # Outside a request (CLI, background work): one pooled connection per call
+    conn = get_db_connection()
+    try:
+        with conn:
+            return run(conn)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
-        if commit:
-            conn.rollback()
         raise e
+    finally:
+        release_db_connection(conn, discard=conn.closed != 0)
 
-def get_next_urutan():
-    """Get the next auto-increment value for no_urutan"""
-    result = execute_query(
-        "SELECT COALESCE(MAX(NO_URUTAN), 0) + 1 FROM REF_PERWAKILAN",
-        fetch_one=True
-    )
-    return result[0] if result else 1
+def execute_query(query, params=None, fetch=False, fetch_one=False, commit=False):
+    result = _execute(lambda conn: _run_query(conn, query, params, fetch, fetch_one), commit)
+    return True if commit else result
 
-def generate_next_kategori_id():
-    try:
-        # Get the last ID from the database
-        last_id = execute_query(
-            "SELECT id FROM ref_kategori_sistem ORDER BY id DESC LIMIT 1",
-            fetch_one=True
-        )
-        
-        if last_id and last_id[0]:  # Check if result exists and has at least one element
-            current_id = last_id[0]
-            # Extract numeric part if format is K0001
-            if current_id.startswith('K'):
-                try:
-                    num = int(current_id[1:]) + 1
-                    return f"K{num:04d}"
-                except ValueError:
-                    return "K0001"
-            return "K0001"  # Fallback if format is unexpected
-        return "K0001"  # First record
-    except Exception as e:
-        logger.error(f"Error generating ID: {str(e)}")
-        return "K0001"  # Fallback on error
+def execute_bulk(query, rows, template=None, page_size=500, fetch=False, commit=False):
+    """Write many rows in a single statement using a multi-row VALUES list.
 
-def get_next_no_perwakilan():
-    """Get the next auto-increment value for no_perwakilan"""
-    result = execute_query(
-        "SELECT COALESCE(MAX(NO_PERWAKILAN), 0) + 1 FROM REF_PERWAKILAN",
-        fetch_one=True
-    )
-    return result[0] if result else 1
+    query must contain a single ``VALUES %s`` placeholder, e.g.
+    ``INSERT INTO tabel_x (a, b) VALUES %s``. Returns the rows produced by a
+    RETURNING clause when fetch=True, otherwise the number of rows sent.
+    """
+    if not rows:
+        return [] if fetch else 0
+    return _execute(lambda conn: _run_bulk(conn, query, rows, template, page_size, fetch), commit)
 
-def generate_tipe_palsan_id():
-    """Generate ID Tipe Palsan otomatis (P0001, P0002, dst)"""
-    last_id = execute_query(
-        "SELECT id_tipe FROM tipe_palsan ORDER BY id_tipe DESC LIMIT 1",
-        fetch_one=True
-    )
-    
-    if last_id and last_id[0]:
-        last_num = int(last_id[0][1:])
-        return f"P{last_num + 1:04d}"
-    return "P0001"
+def after_commit(callback):
+    """Run callback once the current unit of work has committed.
 
-def generate_palsan_id():
-    """Generate ID Palsan otomatis (PL001, PL002, dst)"""
-    last_id = execute_query(
-        "SELECT id_palsan FROM tabel_palsan ORDER BY id_palsan DESC LIMIT 1",
-        fetch_one=True
-    )
-    
-    if last_id and last_id[0]:
-        last_num = int(last_id[0][2:])  # Ambil angka setelah 'PL'
-        return f"PL{last_num + 1:03d}"
-    return "PL001"
+    Used for in-process side effects of a write (cache eviction) that must
+    not happen before other sessions can see the write. Outside a request
+    or transaction() block every statement commits at once, so callback
+    runs immediately. Callbacks of a rolled back unit of work are dropped.
+    """
+    if has_request_context():
+        state = g
+    elif getattr(_tx_local, 'conn', None) is not None:
+        state = _tx_local
+    else:
+        callback()
+        return
+    if getattr(state, 'db_after_commit', None) is None:
+        state.db_after_commit = []
+    state.db_after_commit.append(callback)
+
+def _run_after_commit(state):
+    callbacks, state.db_after_commit = getattr(state, 'db_after_commit', None) or [], None
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After-commit callback failed: {e}")
+
+@contextmanager
+def transaction():
+    """Run the enclosed execute_query() calls as one unit of work.
+
+    Commits once when the outermost block exits and rolls everything back
+    if it raises. Blocks may be nested; only the outermost one commits.
+    Inside a request this is the request's own transaction, so writes made
+    earlier in the same request are committed (or rolled back) with it.
+    """
+    if has_request_context():
+        state = g
+        conn = get_request_connection()
+        owned = False
+    elif getattr(_tx_local, 'conn', None) is not None:
+        state = _tx_local
+        conn = _tx_local.conn
+        owned = False
+    else:
+        state = _tx_local
+        conn = state.conn = get_db_connection()
+        state.db_pending = False
+        owned = True
+
+    depth = getattr(state, 'db_tx_depth', 0)
+    state.db_tx_depth = depth + 1
+    try:
+        yield conn
+        if depth == 0 and state.db_pending:
+            conn.commit()
+            state.db_pending = False
+            if owned:
+                _run_after_commit(state)
+    except Exception:
+        if depth == 0:
+            if not conn.closed:
+                conn.rollback()
+            state.db_pending = False
+            if owned:
+                state.db_after_commit = None
+        raise
+    finally:
+        state.db_tx_depth = depth
+        if owned:
+            state.conn = None
+            release_db_connection(conn, discard=conn.closed != 0)
+
+@app.after_request
+def commit_request_session(response):
+    """Commit the request's pending writes in one round-trip"""
+    conn = g.get('db_conn')
+    if conn is not None and g.get('db_pending'):
+        conn.commit()
+        g.db_pending = False
+        _run_after_commit(g)
+    return response
+
+@app.teardown_request
+def close_request_session(exc):
+    """Return the request's connection to the pool, discarding uncommitted work"""
+    conn = g.pop('db_conn', None)
+    if conn is None:
+        return
+    if g.pop('db_pending', False):
+        logger.warning("Rolling back uncommitted request transaction")
+
+    discard = conn.closed != 0
+    if g.pop('db_scope', None) is not None and not discard:
+        # Pooled connections go back unrestricted
+        try:
+            conn.rollback()
+            set_connection_scope(conn, None)
+        except psycopg2.Error as e:
+            logger.error(f"Could not reset connection scope: {e}")
+            discard = True
+    release_db_connection(conn, discard=discard)
+
+# Formatted IDs are allocated from Postgres sequences (migrations/005) inside
+# the INSERT itself: entity -> (sequence, prefix, zero-padded width)
+ID_SEQUENCES = {
+    'pengguna': ('seq_id_pengguna', 'U', 4),
+    'kategori_sistem': ('seq_id_kategori_sistem', 'K', 4),
+    'jenis_sistem': ('seq_id_jenis_sistem', 'J', 4),
+    'sistem': ('seq_id_sistem', 'S', 4),
+    'tipe_palsan': ('seq_id_tipe_palsan', 'P', 4),
+    'palsan': ('seq_id_palsan', 'PL', 3),
+}
+
+def next_id_sql(entity):
+    """SQL expression that allocates the next formatted ID of an entity (e.g. PL0042)"""
+    sequence, prefix, width = ID_SEQUENCES[entity]
+    return f"format_id('{prefix}', {width}, nextval('{sequence}'))"
+
+def reserve_ids(entity, count):
+    """Allocate a block of count formatted IDs of an entity in one round-trip.
+
+    Meant for bulk loads: pair the IDs with the rows handed to execute_bulk()
+    instead of allocating one per row. The IDs are unique and ascending, and
+    contiguous unless another session draws from the same sequence meanwhile.
+    """
+    if count <= 0:
+        return []
+    sequence, prefix, width = ID_SEQUENCES[entity]
+    rows = execute_query("""
+        SELECT format_id(%s, %s, n)
+        FROM (SELECT nextval(%s) AS n FROM generate_series(1, %s)) ids
+        ORDER BY n
+    """, (prefix, width, sequence, count), fetch=True) or []
+    return [row[0] for row in rows]
+
+def normalize_trigram(value):
+    """Canonical form of a perwakilan trigram as stored in id_pwk columns"""
+    return (value or '').strip().upper()
 
 def generate_distribution_pdf(data):
     buffer = BytesIO()
@@ -277,6 +682,1173 @@ def generate_distribution_pdf(data):
     buffer.seek(0)
     return buffer
 
+# ==============================================
+# SCHEMA MIGRATIONS
+# ==============================================
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def apply_migrations():
+    """Apply pending migrations/*.sql files in name order, each in its own transaction.
+
+    Applied files are recorded in schema_migrations and never run again.
+    Returns the names of the migrations applied by this call.
+    """
+    execute_query("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """, commit=True)
+    applied = {row[0] for row in execute_query("SELECT name FROM schema_migrations", fetch=True) or []}
+
+    names = sorted(n for n in os.listdir(MIGRATIONS_DIR) if n.endswith('.sql'))
+    done = []
+    for name in names:
+        if name in applied:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+            sql = f.read()
+        with transaction() as conn:
+            # Run the file verbatim: no parameters, so '%' needs no escaping
+            with conn.cursor() as cur:
+                cur.execute(sql)
+            execute_query("INSERT INTO schema_migrations (name) VALUES (%s)", (name,), commit=True)
+        logger.info(f"Applied migration {name}")
+        done.append(name)
+    return done
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending database migrations."""
+    for name in apply_migrations():
+        print(f"Applied {name}")
+
+# ==============================================
+# LIST QUERY HELPERS
+# ==============================================
+
+def build_where(where):
+    """Join a list of predicates into a WHERE clause (empty string if none)"""
+    where = [w for w in (where or []) if w]
+    if not where:
+        return ""
+    return " WHERE " + " AND ".join(f"({w})" for w in where)
+
+# Formats a search term is read in to match date columns by equality, which
+# unlike ILIKE on their text form can use a b-tree index
+SEARCH_DATE_FORMATS = ('%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y')
+
+def search_date(search):
+    """Return the search term as a date, or None if it is not one"""
+    for fmt in SEARCH_DATE_FORMATS:
+        try:
+            return datetime.strptime(search.strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
+
+# List totals are cached per (entity, search, trigram) scope, shared by all
+# app processes, so paging through a list only runs the page query
+LIST_COUNT_CACHE_TTL = 60  # seconds
+LIST_COUNT_CACHE_SIZE = 1024
+
+# Lists whose totals also change when another entity's table is written
+LIST_COUNT_DEPENDENTS = {
+    'perwakilan': ('pengguna', 'kepri', 'personel', 'pegawai_setempat', 'pendidikan',
+                   'fungsional', 'aks', 'jenis_sistem', 'alkom', 'palsan'),
+    'jabatan': ('personel', 'pendidikan'),
+    'personel': ('pendidikan', 'fungsional', 'aks'),
+    'jenis_pendidikan': ('pendidikan',),
+    'pendidikan': ('fungsional',),
+    'jenis_fungsional': ('fungsional',),
+    'jenis_sistem': ('sistem',),
+}
+
+class TTLCache:
+    """Thread-safe TTL/LRU cache keyed by tuples whose first item names the entity"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope):
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is None:
+                return None
+            total, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[scope]
+                return None
+            self._entries.move_to_end(scope)
+            return total
+
+    def set(self, scope, total):
+        with self._lock:
+            self._entries[scope] = (total, time.monotonic() + self.ttl)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *entities):
+        """Drop every cached total belonging to the given entities"""
+        entities = set(entities)
+        with self._lock:
+            for scope in [s for s in self._entries if s[0] in entities]:
+                del self._entries[scope]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SharedCache:
+    """TTL cache shared by all app processes, stored in the app_cache table.
+
+    Same interface as TTLCache; values are pickled. Reads are a single
+    lock-free SELECT on the request's connection. Writes, recency updates
+    and pruning (expired entries, and the least recently used ones beyond
+    maxsize) are handed to this process's shared-cache thread, so they
+    neither add round-trips to nor take row locks in the request.
+
+    A miss also reads the entity's invalidation generation
+    (app_cache_generation, migrations/009); the value computed after it is
+    only stored while that generation is unchanged, so no process caches a
+    result that an invalidation anywhere has overtaken.
+    """
+
+    TOUCH_AFTER = 30  # seconds; hits on younger entries are not recorded as accesses
+    ALL_ENTITIES = '*'  # generation row bumped by clear()
+
+    def __init__(self, namespace, maxsize, ttl):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._touched = set()
+        self._lock = threading.Lock()
+        # Generations read by this thread's misses, until the matching set()
+        self._misses = threading.local()
+        _shared_caches.append(self)
+
+    def get(self, scope):
+        key = repr(scope)
+        row = execute_query("""
+            SELECT c.value, c.accessed_at < now() - make_interval(secs => %s),
+                   (SELECT COALESCE(SUM(generation), 0) FROM app_cache_generation
+                    WHERE namespace = %s AND entity IN (%s, %s))
+            FROM (SELECT 1) one
+            LEFT JOIN app_cache c
+                   ON c.namespace = %s AND c.key = %s AND c.expires_at > now()
+        """, (self.TOUCH_AFTER, self.namespace, scope[0], self.ALL_ENTITIES,
+              self.namespace, key), fetch_one=True)
+        if row[0] is None:
+            if not hasattr(self._misses, 'generations'):
+                self._misses.generations = {}
+            self._misses.generations[key] = row[2]
+            return None
+        if row[1]:
+            with self._lock:
+                self._touched.add(key)
+            start_shared_cache_thread()
+        return pickle.loads(bytes(row[0]))
+
+    def set(self, scope, value):
+        key = repr(scope)
+        generation = getattr(self._misses, 'generations', {}).pop(key, None)
+        if generation is None:
+            # Only values computed after a get() miss can be checked for staleness
+            return
+        item = (self, key, scope[0], pickle.dumps(value), generation)
+        try:
+            _shared_cache_writes.put_nowait(item)
+        except queue.Full:
+            # A cache write may be dropped; the next miss recomputes the value
+            return
+        start_shared_cache_thread()
+
+    def _store(self, key, entity, value, generation):
+        with transaction():
+            # Creating the generation rows waits for a concurrent first
+            # invalidation of the entity; FOR SHARE below waits for any
+            # later one to commit, and then sees its new generation
+            execute_query("""
+                INSERT INTO app_cache_generation (namespace, entity)
+                VALUES (%s, %s), (%s, %s)
+                ON CONFLICT (namespace, entity) DO NOTHING
+            """, (self.namespace, entity, self.namespace, self.ALL_ENTITIES), commit=True)
+            execute_query("""
+                INSERT INTO app_cache (namespace, key, entity, value, expires_at)
+                SELECT %s, %s, %s, %s, now() + make_interval(secs => %s)
+                WHERE (SELECT COALESCE(SUM(generation), 0)
+                       FROM (SELECT generation FROM app_cache_generation
+                             WHERE namespace = %s AND entity IN (%s, %s)
+                             FOR SHARE) current) = %s
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET entity = EXCLUDED.entity, value = EXCLUDED.value,
+                    expires_at = EXCLUDED.expires_at, accessed_at = now()
+            """, (self.namespace, key, entity, psycopg2.Binary(value), self.ttl,
+                  self.namespace, entity, self.ALL_ENTITIES, generation), commit=True)
+
+    def _flush_touches(self):
+        with self._lock:
+            keys, self._touched = list(self._touched), set()
+        if keys:
+            execute_query(
+                "UPDATE app_cache SET accessed_at = now() WHERE namespace = %s AND key = ANY(%s)",
+                (self.namespace, keys),
+                commit=True
+            )
+
+    def prune(self):
+        """Delete expired entries and the least recently used beyond maxsize"""
+        execute_query("""
+            DELETE FROM app_cache
+            WHERE namespace = %s
+              AND (expires_at <= now()
+                   OR key IN (SELECT key FROM app_cache WHERE namespace = %s
+                              ORDER BY accessed_at DESC OFFSET %s))
+        """, (self.namespace, self.namespace, self.maxsize), commit=True)
+
+    def _bump(self, entities):
+        execute_query("""
+            INSERT INTO app_cache_generation (namespace, entity, generation)
+            SELECT %s, entity, 1 FROM unnest(%s::text[]) AS entity
+            ON CONFLICT (namespace, entity)
+            DO UPDATE SET generation = app_cache_generation.generation + 1
+        """, (self.namespace, sorted(set(entities))), commit=True)
+
+    def invalidate(self, *entities):
+        """Drop every cached entry belonging to the given entities.
+
+        Runs in the caller's transaction: the generation bump and the
+        DELETE take effect together when the write commits.
+        """
+        self._bump(entities)
+        execute_query(
+            "DELETE FROM app_cache WHERE namespace = %s AND entity = ANY(%s)",
+            (self.namespace, list(entities)),
+            commit=True
+        )
+
+    def clear(self):
+        self._bump([self.ALL_ENTITIES])
+        execute_query("DELETE FROM app_cache WHERE namespace = %s", (self.namespace,), commit=True)
+
+SHARED_CACHE_PRUNE_INTERVAL = 60  # seconds
+SHARED_CACHE_FLUSH_INTERVAL = 1  # seconds between recency updates
+SHARED_CACHE_WRITE_QUEUE_SIZE = 1000  # pending writes; further ones are dropped
+
+_shared_caches = []
+_shared_cache_writes = queue.Queue(SHARED_CACHE_WRITE_QUEUE_SIZE)
+_shared_cache_lock = threading.Lock()
+_shared_cache_thread = None
+
+def _shared_cache_maintainer():
+    next_prune = time.monotonic() + SHARED_CACHE_PRUNE_INTERVAL
+    while True:
+        try:
+            item = _shared_cache_writes.get(timeout=SHARED_CACHE_FLUSH_INTERVAL)
+        except queue.Empty:
+            item = None
+        try:
+            if item is not None:
+                cache, key, entity, value, generation = item
+                cache._store(key, entity, value, generation)
+            for cache in _shared_caches:
+                cache._flush_touches()
+            if time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + SHARED_CACHE_PRUNE_INTERVAL
+                for cache in _shared_caches:
+                    cache.prune()
+        except Exception as e:
+            logger.error(f"Shared cache maintenance failed: {e}")
+
+def start_shared_cache_thread():
+    """Start this process's shared-cache writer/pruner once"""
+    global _shared_cache_thread
+    if _shared_cache_thread is not None:
+        return
+    with _shared_cache_lock:
+        if _shared_cache_thread is None:
+            _shared_cache_thread = threading.Thread(target=_shared_cache_maintainer,
+                                                    name='shared-cache', daemon=True)
+            _shared_cache_thread.start()
+
+list_count_cache = SharedCache('list_count', LIST_COUNT_CACHE_SIZE, LIST_COUNT_CACHE_TTL)
+
+def list_count_scope(entity, search=''):
+    """Cache scope of a list total: entity, normalized search and the user's trigram"""
+    trigram = None
+    if session.get('role') != 0:
+        trigram = normalize_trigram(session.get('trigram'))
+    return (entity, (search or '').strip().lower(), trigram)
+
+def invalidate_list_counts(entity):
+    """Forget cached totals of an entity's list and of the lists that join it"""
+    list_count_cache.invalidate(entity, *LIST_COUNT_DEPENDENTS.get(entity, ()))
+
+# Unfiltered lists estimated above this many rows show a planner estimate
+# instead of running COUNT(*) over the whole table
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+def wants_exact_count():
+    """True when the user asked for an exact list total (?exact=1)"""
+    return has_request_context() and request.args.get('exact') == '1'
+
+def estimate_list_rows(from_clause):
+    """Planner row estimate for an unfiltered list, or None if unavailable"""
+    result = execute_query(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {from_clause}", fetch_one=True)
+    try:
+        plan = result[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (TypeError, KeyError, IndexError, ValueError):
+        return None
+
+def _list_total_estimate(from_clause, where, exact_count):
+    """Estimated total for a large unfiltered list, or None when an exact count is due"""
+    if exact_count is None:
+        exact_count = wants_exact_count()
+    if exact_count or any(where or []) or current_perwakilan_scope() is not None:
+        return None
+    estimate = estimate_list_rows(from_clause)
+    if estimate is None or estimate < ESTIMATED_COUNT_THRESHOLD:
+        return None
+    return estimate
+
+def fetch_list_page(select, from_clause, where=None, params=None, order_by=None,
+                    page=1, per_page=20, exact_count=None, count_scope=None):
+    """Run a paginated list query and return (rows, total, total_estimated).
+
+    The page rows and the total number of matching rows come back from a
+    single statement: COUNT(*) OVER() is evaluated over the whole filtered
+    set before LIMIT/OFFSET is applied, so no separate COUNT query is needed.
+    For large unfiltered lists the total is the planner's estimate instead
+    (total_estimated is True) unless exact_count or ?exact=1 asks otherwise.
+    Exact totals are kept in list_count_cache under count_scope, if given.
+    """
+    page = max(page, 1)
+    params = list(params or [])
+    where_clause = build_where(where)
+    cached = list_count_cache.get(count_scope) if count_scope else None
+    estimate = None
+    if cached is None:
+        estimate = _list_total_estimate(from_clause, where, exact_count)
+
+    window_total = cached is None and estimate is None
+    total_column = ", COUNT(*) OVER() AS total_count" if window_total else ""
+    query = f"SELECT {select}{total_column} FROM {from_clause}{where_clause}"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    query += " LIMIT %s OFFSET %s"
+
+    rows = execute_query(query, params + [per_page, (page - 1) * per_page], fetch=True) or []
+    if cached is not None:
+        return rows, cached, False
+    if estimate is not None:
+        return rows, estimate, True
+
+    if rows:
+        total = rows[0][-1]
+        rows = [row[:-1] for row in rows]
+    elif page == 1:
+        total = 0
+    else:
+        # Past the last page there are no rows to carry the window total
+        total = count_list_rows(from_clause, where, params)
+
+    if count_scope:
+        list_count_cache.set(count_scope, total)
+    return rows, total, False
+
+def count_list_rows(from_clause, where=None, params=None):
+    """Exact number of rows matching a list filter"""
+    result = execute_query(
+        f"SELECT COUNT(*) FROM {from_clause}{build_where(where)}",
+        list(params or []),
+        fetch_one=True
+    )
+    return result[0] if result else 0
+
+def encode_cursor(sort_name, sort_value, key_value):
+    """Encode a row's position in a sort order as a URL-safe cursor"""
+    payload = json.dumps([sort_name, sort_value, key_value], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_name):
+    """Decode a cursor; returns (sort_value, key_value) or None if invalid or stale"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        name, sort_value, key_value = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    # A cursor taken under a different sort order can't be seeked from
+    if name != sort_name:
+        return None
+    return sort_value, key_value
+
+def _seek_predicate(sort_expr, key_expr, direction, sort_value, key_value):
+    """Predicate selecting rows after (sort_value, key_value) in the given order.
+
+    Matches PostgreSQL's default NULL placement: last for ASC, first for DESC.
+    """
+    op = '>' if direction == 'ASC' else '<'
+    if sort_expr == key_expr:
+        return f"{key_expr} {op} %s", [key_value]
+    if sort_value is None:
+        if direction == 'ASC':
+            return f"{sort_expr} IS NULL AND {key_expr} > %s", [key_value]
+        return f"({sort_expr} IS NULL AND {key_expr} < %s) OR {sort_expr} IS NOT NULL", [key_value]
+    predicate = f"{sort_expr} {op} %s OR ({sort_expr} = %s AND {key_expr} {op} %s)"
+    if direction == 'ASC':
+        predicate += f" OR {sort_expr} IS NULL"
+    return predicate, [sort_value, sort_value, key_value]
+
+def fetch_keyset_page(select, from_clause, where=None, params=None, sort_expr=None,
+                      key_expr=None, direction='ASC', page=1, per_page=20,
+                      after=None, before=None, exact_count=None, count_scope=None):
+    """Fetch a list page by seeking from a cursor instead of skipping with OFFSET.
+
+    Rows are ordered by (sort_expr, key_expr), where key_expr is the table's
+    primary key. after/before are cursors returned for a neighbouring page;
+    seeking from them costs the same on page 500 as on page 1. Without a
+    cursor the page is located with OFFSET and the total comes back with it.
+    Totals of large unfiltered lists are estimated, and exact totals cached
+    under count_scope, as in fetch_list_page().
+
+    Returns (rows, total, total_estimated, next_cursor, prev_cursor).
+    """
+    page = max(page, 1)
+    sort_expr = sort_expr or key_expr
+    sort_name = f"{sort_expr} {direction}"
+    base_where = list(where or [])
+    base_params = list(params or [])
+    cached = list_count_cache.get(count_scope) if count_scope else None
+    estimate = None
+    if cached is None:
+        estimate = _list_total_estimate(from_clause, base_where, exact_count)
+
+    cursor = after or before
+    seek = decode_cursor(cursor, sort_name) if cursor else None
+    backwards = seek is not None and not after
+
+    where = list(base_where)
+    params = list(base_params)
+    order_dir = direction
+    offset = (page - 1) * per_page
+    if seek is not None:
+        if backwards:
+            order_dir = 'DESC' if direction == 'ASC' else 'ASC'
+        predicate, seek_params = _seek_predicate(sort_expr, key_expr, order_dir, *seek)
+        where.append(predicate)
+        params.extend(seek_params)
+        offset = 0
+
+    if sort_expr == key_expr:
+        order_by = f"{key_expr} {order_dir}"
+    else:
+        order_by = f"{sort_expr} {order_dir}, {key_expr} {order_dir}"
+
+    # The window total is only meaningful when no seek predicate narrows the set
+    window_total = seek is None and cached is None and estimate is None
+    total_column = ", COUNT(*) OVER() AS total_count" if window_total else ""
+    query = f"""
+        SELECT {select}, {sort_expr} AS sort_value, {key_expr} AS key_value{total_column}
+        FROM {from_clause}{build_where(where)}
+        ORDER BY {order_by}
+        LIMIT %s OFFSET %s
+    """
+    rows = execute_query(query, params + [per_page + 1, offset], fetch=True) or []
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if cached is not None:
+        total = cached
+    elif estimate is not None:
+        total = estimate
+    else:
+        if window_total and rows:
+            total = rows[0][-1]
+        elif window_total and page == 1:
+            total = 0
+        else:
+            total = count_list_rows(from_clause, base_where, base_params)
+        if count_scope:
+            list_count_cache.set(count_scope, total)
+
+    extra = 3 if window_total else 2
+    positions = [(row[-extra], row[-extra + 1]) for row in rows]
+    rows = [row[:-extra] for row in rows]
+
+    next_cursor = prev_cursor = None
+    if positions:
+        if backwards:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, seek is not None or page > 1
+        if has_next:
+            next_cursor = encode_cursor(sort_name, *positions[-1])
+        if has_prev:
+            prev_cursor = encode_cursor(sort_name, *positions[0])
+
+    return rows, total, estimate is not None, next_cursor, prev_cursor
+
+# ==============================================
+# REFERENCE DATA CACHE
+# ==============================================
+
+# Dropdown options read by nearly every create/edit form. They change rarely,
+# so they are kept in process and reloaded only after a write to the table.
+REFERENCE_QUERIES = {
+    'perwakilan': "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
+    'jabatan': "SELECT no, nama FROM tabel_jabatan ORDER BY nama",
+    'jenis_pendidikan': "SELECT no, jenis_pend FROM tabel_jenis_pendidikan ORDER BY jenis_pend",
+    'jenis_fungsional': "SELECT no, nama_fungsional FROM tabel_jenis_fungsional ORDER BY nama_fungsional",
+    'tipe_palsan': "SELECT id_tipe, nama FROM tipe_palsan ORDER BY nama",
+    'kategori_sistem': "SELECT kategori FROM ref_kategori_sistem ORDER BY kategori",
+}
+# Upper bound on staleness for writes made outside this process
+REFERENCE_CACHE_TTL = 300  # seconds
+
+# Entries are keyed by (entity, version). Invalidation bumps the version, so
+# a load that raced with a write is stored under the old version and never
+# served; the LRU bound evicts such entries.
+reference_cache = TTLCache(4 * len(REFERENCE_QUERIES), REFERENCE_CACHE_TTL)
+_reference_versions = {entity: 0 for entity in REFERENCE_QUERIES}
+_reference_lock = threading.Lock()
+
+def get_reference(entity):
+    """Return the (cached) option rows of a reference table"""
+    with _reference_lock:
+        key = (entity, _reference_versions[entity])
+    rows = reference_cache.get(key)
+    if rows is None:
+        rows = execute_query(REFERENCE_QUERIES[entity], fetch=True) or []
+        reference_cache.set(key, rows)
+    return list(rows)
+
+def invalidate_reference(entity):
+    """Drop the cached options of a reference table after a write to it"""
+    with _reference_lock:
+        _reference_versions[entity] += 1
+    reference_cache.invalidate(entity)
+
+def perwakilan_options():
+    """Perwakilan dropdown rows: all for admin, only the user's own otherwise"""
+    rows = get_reference('perwakilan')
+    if session.get('role') == 0:
+        return rows
+    trigram = normalize_trigram(session.get('trigram'))
+    return [row for row in rows if row[0] == trigram]
+
+# ==============================================
+# CACHE INVALIDATION BUS
+# ==============================================
+
+# Shared caches (app_cache) are cleared once by the writer, in its own
+# transaction. Per-process caches are evicted locally once that transaction
+# has committed (so a concurrent reader cannot cache the old rows under the
+# new version), and the entity is published on a NOTIFY channel; the
+# notification is delivered on commit too, and each other worker's listener
+# thread evicts its copies in turn.
+CACHE_INVALIDATION_CHANNEL = 'cache_invalidation'
+CACHE_INVALIDATION_POLL = 30  # seconds between liveness checks of the listener
+CACHE_INVALIDATION_MAX_BACKOFF = 60  # seconds between reconnect attempts, at most
+
+# Lets a worker recognise (and skip) its own notifications
+CACHE_INVALIDATION_ORIGIN = uuid4().hex
+
+# Entities whose writes change the dashboard figures
+DASHBOARD_ENTITIES = ('pengguna', 'perwakilan', 'jenis_sistem', 'sistem')
+
+_invalidation_lock = threading.Lock()
+_invalidation_thread = None
+
+def evict_local_caches(entity):
+    """Drop this process's cached data derived from an entity's table"""
+    if entity in REFERENCE_QUERIES:
+        invalidate_reference(entity)
+
+def evict_all_local_caches():
+    """Drop every cache of this process (after missing notifications)"""
+    for entity in REFERENCE_QUERIES:
+        invalidate_reference(entity)
+
+def publish_invalidation(entity):
+    """Tell the other workers to evict an entity; sent when the write commits"""
+    payload = json.dumps({'entity': entity, 'origin': CACHE_INVALIDATION_ORIGIN})
+    execute_query("SELECT pg_notify(%s, %s)", (CACHE_INVALIDATION_CHANNEL, payload), commit=True)
+
+def invalidate_entity(entity):
+    """Drop everything cached from an entity's table after a write to it"""
+    invalidate_list_counts(entity)
+    if entity in DASHBOARD_ENTITIES:
+        invalidate_dashboard_stats()
+    after_commit(lambda: evict_local_caches(entity))
+    if entity in SCORECARD_ENTITIES:
+        after_commit(mark_scorecard_stale)
+    publish_invalidation(entity)
+
+def _handle_invalidation(notify):
+    try:
+        message = json.loads(notify.payload)
+    except ValueError:
+        logger.warning(f"Ignoring malformed cache invalidation: {notify.payload!r}")
+        return
+    if message.get('origin') != CACHE_INVALIDATION_ORIGIN:
+        evict_local_caches(message.get('entity'))
+
+def _invalidation_listener():
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            # LISTEN is bound to its session, so the listener owns a
+            # dedicated connection outside the pool
+            conn = psycopg2.connect(**DB_CONFIG)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CACHE_INVALIDATION_CHANNEL}")
+            # Anything published while we were not listening was missed
+            evict_all_local_caches()
+            backoff = 1
+            while True:
+                if select.select([conn], [], [], CACHE_INVALIDATION_POLL) == ([], [], []):
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                conn.poll()
+                while conn.notifies:
+                    _handle_invalidation(conn.notifies.pop(0))
+        except Exception as e:
+            logger.error(f"Cache invalidation listener error: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+        time.sleep(backoff)
+        backoff = min(backoff * 2, CACHE_INVALIDATION_MAX_BACKOFF)
+
+def start_invalidation_listener():
+    """Start this process's listener thread once"""
+    global _invalidation_thread
+    with _invalidation_lock:
+        if _invalidation_thread is None:
+            _invalidation_thread = threading.Thread(target=_invalidation_listener,
+                                                    name='cache-invalidation', daemon=True)
+            _invalidation_thread.start()
+
+@app.before_request
+def ensure_invalidation_listener():
+    start_invalidation_listener()
+
+# ==============================================
+# EXPORT ENGINE
+# ==============================================
+
+# Every PDF/Excel export is described by a spec dict:
+#   title, sheet, filename  report title, worksheet name, download file prefix
+#   list_endpoint           where to return to when the export fails
+#   pagesize                reportlab page size of the PDF (default A4)
+#   query                   SELECT ... FROM ... JOIN ... without WHERE/ORDER BY
+#   search                  predicates ORed together, one %s each, applied
+#                           when a search term is given
+#   search_date             optional date column also matched for equality
+#                           when the search term is a date (search_date())
+#   sort, default_sort      request 'sort' values mapped to SQL expressions
+#   group                   optional {'key': SQL, 'index': row index,
+#                           'columns': n}: consecutive rows of one key share
+#                           the first n columns (and one row number)
+#   columns                 export_column() specs, after the implicit "No"
+# Perwakilan scoping comes from row-level security, as in the list views.
+
+EXPORT_MAX_COLUMN_WIDTH = 50  # characters, Excel
+
+# Exports read their rows from a server-side cursor in batches and write the
+# workbook row by row (xlsxwriter constant_memory), so a worker holds one
+# batch rather than the whole table. Finished files stay in memory up to
+# EXPORT_SPOOL_THRESHOLD and are spooled to a temp file beyond it.
+EXPORT_FETCH_SIZE = 2000  # rows per round-trip
+EXPORT_SPOOL_THRESHOLD = 8 * 1024 * 1024  # bytes
+EXPORT_CHUNK_SIZE = 64 * 1024  # bytes per response chunk
+
+EXPORT_HIGHLIGHTS = {
+    'good': {'bg_color': '#C6EFCE', 'font_color': '#006100'},
+    'bad': {'bg_color': '#FFC7CE', 'font_color': '#9C0006'},
+    'neutral': {'bg_color': '#CCCCCC'},
+}
+
+def export_column(header, value, ratio, min_width, align='LEFT', kind='text',
+                  only=None, admin_only=False, highlight=None):
+    """Describe one export column.
+
+    value is a row index or a function of the row; ratio and min_width size
+    the PDF column (share of the page width, points). kind 'date' writes a
+    real date to Excel. only limits the column to 'pdf' or 'xlsx';
+    highlight(row) may return a key of EXPORT_HIGHLIGHTS for Excel.
+    """
+    if isinstance(value, int):
+        index = value
+        value = lambda row: row[index]
+    return {'header': header, 'value': value, 'ratio': ratio, 'min_width': min_width,
+            'align': align, 'kind': kind, 'only': only, 'admin_only': admin_only,
+            'highlight': highlight}
+
+EXPORT_NUMBER_COLUMN = export_column('No', None, 0.05, 25, align='CENTER')
+
+def export_columns(spec, fmt, is_admin):
+    """Columns of a spec shown in the given format to an admin or a scoped user"""
+    return [EXPORT_NUMBER_COLUMN] + [
+        c for c in spec['columns']
+        if c['only'] in (None, fmt) and (is_admin or not c['admin_only'])
+    ]
+
+def export_query(spec, search, sort, direction):
+    """Build the (query, params) of an export from the request's search and sort"""
+    sort_column = spec['sort'].get(sort, spec['sort'][spec['default_sort']])
+    direction = 'DESC' if (direction or '').lower() == 'desc' else 'ASC'
+
+    where, params = [], []
+    if search:
+        predicates = list(spec['search'])
+        params.extend([f'%{search}%'] * len(predicates))
+        date = search_date(search) if spec.get('search_date') else None
+        if date:
+            predicates.append(f"{spec['search_date']} = %s")
+            params.append(date)
+        where.append(" OR ".join(predicates))
+
+    group = spec.get('group')
+    if group:
+        # Keep each group's rows together, groups ordered by their first row
+        first = 'MAX' if direction == 'DESC' else 'MIN'
+        order = (f"{first}({sort_column}) OVER (PARTITION BY {group['key']}) {direction}, "
+                 f"{group['key']}, {sort_column} {direction}")
+    else:
+        order = f"{sort_column} {direction}"
+    return f"{spec['query']}{build_where(where)} ORDER BY {order}", params
+
+def iter_query_rows(query, params=None, batch_size=EXPORT_FETCH_SIZE):
+    """Yield the rows of a SELECT from a server-side cursor, batch_size at a time.
+
+    Runs in the current request's transaction (and row-level security scope)
+    when there is one, otherwise on a pooled connection held until the
+    generator is exhausted or closed.
+    """
+    with transaction() as conn:
+        with conn.cursor(name=f'export_{uuid4().hex}') as cur:
+            cur.execute(query, params or ())
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+
+def _export_text(value, kind):
+    if value is None or value == '':
+        return '-'
+    if kind == 'date':
+        return value.strftime('%d-%m-%Y')
+    return str(value)
+
+def export_table(spec, columns, rows):
+    """Yield (first_in_group, cells) per row; each cell is (text, value, highlight).
+
+    Every value is read and formatted exactly once here; the PDF and Excel
+    writers only place the results.
+    """
+    group = spec.get('group')
+    shared = group['columns'] if group else 0
+    number, last_key = 0, object()
+    for row in rows:
+        first = True
+        if group:
+            key = row[group['index']]
+            first, last_key = key != last_key, key
+        if first:
+            number += 1
+
+        cells = [(str(number), number, None) if first else ('', '', None)]
+        for i, column in enumerate(columns[1:], 1):
+            if i <= shared and not first:
+                cells.append(('', '', None))
+                continue
+            value = column['value'](row)
+            highlight = column['highlight'](row) if column['highlight'] else None
+            cells.append((_export_text(value, column['kind']), value, highlight))
+        yield first, cells
+
+def export_metadata(search):
+    metadata = [f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"]
+    if search:
+        metadata.insert(0, f"Filter: {search}")
+    return metadata
+
+def build_export_pdf(spec, columns, rows, search):
+    """Render an export as a PDF table; returns a BytesIO"""
+    pagesize = spec.get('pagesize', A4)
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer,
+                            pagesize=pagesize,
+                            leftMargin=15,
+                            rightMargin=15,
+                            topMargin=20,
+                            bottomMargin=20)
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('Title', parent=styles['Title'], fontSize=14,
+                                 alignment=TA_CENTER, spaceAfter=12)
+    meta_style = ParagraphStyle('Meta', parent=styles['Normal'], fontSize=9, spaceAfter=6)
+
+    elements = [Paragraph(spec['title'], title_style)]
+    for meta in export_metadata(search):
+        elements.append(Paragraph(meta, meta_style))
+
+    data = [[c['header'] for c in columns]]
+    spans = []
+    shared = spec['group']['columns'] if spec.get('group') else 0
+    group_start = None
+    for first, cells in export_table(spec, columns, rows):
+        if first:
+            if group_start is not None and len(data) - group_start > 1:
+                spans.append((group_start, len(data) - 1))
+            group_start = len(data)
+        data.append([text for text, _, _ in cells])
+    if group_start is not None and len(data) - group_start > 1:
+        spans.append((group_start, len(data) - 1))
+
+    # Share the printable width out by the visible columns' ratios
+    available_width = pagesize[0] - doc.leftMargin - doc.rightMargin
+    total_ratio = sum(c['ratio'] for c in columns)
+    col_widths = [max(available_width * c['ratio'] / total_ratio, c['min_width']) for c in columns]
+
+    table = Table(data, colWidths=col_widths, repeatRows=1, hAlign='LEFT')
+    style = TableStyle([
+        # Header style
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,0), 7),
+        ('BOTTOMPADDING', (0,0), (-1,0), 4),
+
+        # Cell style
+        ('FONTSIZE', (0,1), (-1,-1), 7),
+        ('LEADING', (0,0), (-1,-1), 8),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
+        ('WORDWRAP', (0,0), (-1,-1), True),
+
+        # Alternating row colors
+        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
+    ])
+    for i, column in enumerate(columns):
+        style.add('ALIGN', (i, 1), (i, -1), column['align'])
+    style.add('ALIGN', (0, 0), (-1, 0), 'CENTER')
+    for start, end in spans:
+        for col in range(shared + 1):
+            style.add('SPAN', (col, start), (col, end))
+    table.setStyle(style)
+    elements.append(table)
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+def build_export_xlsx(spec, columns, rows, search):
+    """Render an export as an Excel worksheet; returns a spooled temp file.
+
+    Rows are written in order and flushed as they go (constant_memory), so
+    rows may be any iterator, e.g. iter_query_rows().
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_THRESHOLD)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(spec['sheet'])
+
+    title_format = workbook.add_format({'bold': True, 'font_size': 14, 'align': 'center', 'valign': 'vcenter'})
+    subtitle_format = workbook.add_format({'font_size': 10, 'align': 'left', 'valign': 'vcenter'})
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#4472C4',
+        'font_color': '#FFFFFF',
+        'border': 1,
+        'align': 'center',
+        'valign': 'vcenter',
+        'text_wrap': True
+    })
+    # One cell format per (alignment, highlight, date) combination in use
+    cell_formats = {}
+
+    def cell_format(align, highlight, is_date):
+        key = (align, highlight, is_date)
+        if key not in cell_formats:
+            props = {'border': 1, 'text_wrap': True, 'valign': 'top', 'align': align.lower()}
+            props.update(EXPORT_HIGHLIGHTS.get(highlight, {}))
+            if is_date:
+                props['num_format'] = 'dd-mm-yyyy'
+            cell_formats[key] = workbook.add_format(props)
+        return cell_formats[key]
+
+    if len(columns) > 1:
+        worksheet.merge_range(0, 0, 0, len(columns) - 1, spec['title'], title_format)
+    else:
+        worksheet.write(0, 0, spec['title'], title_format)
+    current_row = 1
+    for meta in export_metadata(search):
+        worksheet.write(current_row, 0, meta, subtitle_format)
+        current_row += 1
+    current_row += 1
+
+    for col, column in enumerate(columns):
+        worksheet.write(current_row, col, column['header'], header_format)
+    worksheet.freeze_panes(current_row + 1, 0)
+    current_row += 1
+
+    # Column widths are measured on the already formatted text as rows are written
+    widths = [len(c['header']) for c in columns]
+    for _, cells in export_table(spec, columns, rows):
+        for col, (column, (text, value, highlight)) in enumerate(zip(columns, cells)):
+            is_date = column['kind'] == 'date' and text not in ('', '-')
+            fmt = cell_format(column['align'], highlight, is_date)
+            if is_date:
+                worksheet.write_datetime(current_row, col, value, fmt)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and text != '-':
+                worksheet.write_number(current_row, col, value, fmt)
+            else:
+                worksheet.write_string(current_row, col, text, fmt)
+            if len(text) > widths[col]:
+                widths[col] = len(text)
+        current_row += 1
+
+    for col, width in enumerate(widths):
+        worksheet.set_column(col, col, min(width + 2, EXPORT_MAX_COLUMN_WIDTH))
+
+    workbook.close()
+    output.seek(0)
+    return output
+
+EXPORT_FORMATS = {
+    'pdf': ('PDF', build_export_pdf, 'pdf', 'application/pdf'),
+    'xlsx': ('Excel', build_export_xlsx, 'xlsx',
+             'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+def stream_export_file(fileobj, download_name, mimetype):
+    """Send a finished export in EXPORT_CHUNK_SIZE pieces, closing it afterwards"""
+    size = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(0)
+
+    def generate():
+        try:
+            while True:
+                chunk = fileobj.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            fileobj.close()
+
+    response = Response(generate(), mimetype=mimetype, direct_passthrough=True)
+    response.headers['Content-Length'] = str(size)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
+
+def export_response(spec, fmt):
+    """Run an export for the current request and send it as a download"""
+    label, build, extension, mimetype = EXPORT_FORMATS[fmt]
+    try:
+        search = request.args.get('search', '').strip()
+        query, params = export_query(spec, search, request.args.get('sort'), request.args.get('dir', 'asc'))
+        with closing(iter_query_rows(query, params)) as rows:
+            output = build(spec, export_columns(spec, fmt, session.get('role') == 0), rows, search)
+
+        return stream_export_file(
+            output,
+            f"{spec['filename']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mimetype
+        )
+    except Exception as e:
+        logger.error(f"{label} Export Error: {str(e)}")
+        flash(f'Gagal membuat {label}: ' + str(e), 'error')
+        return redirect(url_for(spec['list_endpoint']))
+
+# CSV exports stream the raw query result of an export spec straight from
+# COPY ... TO STDOUT. COPY runs in a helper thread on its own pooled
+# connection (the request's one is released before the body is sent) and
+# hands its output to the response through a bounded queue.
+CSV_EXPORT_QUEUE_SIZE = 64  # COPY chunks buffered ahead of the client
+CSV_EXPORT_TIMEOUT = 60  # seconds either side waits for the other before giving up
+
+class _CopyPipe:
+    """File-like target for copy_expert() feeding a bounded queue.
+
+    The queue ends with None after a complete COPY, or with the exception
+    that stopped it.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+
+    def _put(self, item):
+        deadline = time.monotonic() + CSV_EXPORT_TIMEOUT
+        while not self.cancelled.is_set() and time.monotonic() < deadline:
+            try:
+                self.queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write(self, data):
+        if not self._put(data):
+            raise IOError('CSV export cancelled or not read by the client')
+        return len(data)
+
+    def finish(self, error=None):
+        self._put(error)
+
+    def get(self):
+        """Next chunk, None at the end; raises the COPY's error or on timeout"""
+        try:
+            item = self.queue.get(timeout=CSV_EXPORT_TIMEOUT)
+        except queue.Empty:
+            self.cancelled.set()
+            raise TimeoutError('CSV export timed out waiting for the database')
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+def _copy_to_pipe(query, params, scope, pipe):
+    conn = None
+    discard = False
+    error = None
+    try:
+        conn = get_db_connection()
+        if scope is not None:
+            set_connection_scope(conn, scope)
+        with conn.cursor() as cur:
+            sql = cur.mogrify(f"COPY ({query}) TO STDOUT WITH CSV HEADER", params or None)
+            cur.copy_expert(sql.decode(psycopg2.extensions.encodings[conn.encoding]), pipe)
+        conn.rollback()
+        if scope is not None:
+            set_connection_scope(conn, None)
+    except Exception as e:
+        # An interrupted COPY leaves the connection unusable
+        error = e
+        discard = True
+    finally:
+        if conn is not None:
+            release_db_connection(conn, discard=discard or conn.closed != 0)
+        pipe.finish(error)
+
+def csv_export_response(spec):
+    """Stream an export's rows as CSV, with the list view's search, sort and scope"""
+    search = request.args.get('search', '').strip()
+    query, params = export_query(spec, search, request.args.get('sort'), request.args.get('dir', 'asc'))
+
+    pipe = _CopyPipe(CSV_EXPORT_QUEUE_SIZE)
+    threading.Thread(target=_copy_to_pipe, args=(query, params, current_perwakilan_scope(), pipe),
+                     name='csv-export', daemon=True).start()
+
+    # Wait for the header line so a failing query can still be reported
+    try:
+        first = pipe.get()
+    except Exception as e:
+        pipe.cancelled.set()
+        logger.error(f"CSV Export Error: {str(e)}")
+        flash(f'Gagal membuat CSV: {str(e)}', 'error')
+        return redirect(url_for(spec['list_endpoint']))
+
+    def generate():
+        chunk = first
+        try:
+            while chunk is not None:
+                yield chunk
+                chunk = pipe.get()
+        except Exception as e:
+            logger.error(f"CSV Export Error: {str(e)}")
+
+    response = Response(generate(), mimetype='text/csv')
+    # Stops the COPY even when the body is never iterated (HEAD, early disconnect)
+    response.call_on_close(pipe.cancelled.set)
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=f"{spec['filename']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    return response
+
+# Parquet exports keep the database types of the export query's columns
+# (dates as dates, integers as nullable integers) for analysis tools.
+# Result types are PostgreSQL OIDs; anything not listed is written as text.
+PARQUET_NUMERIC_OID = 1700
+PARQUET_TYPES = {
+    16: lambda pa: pa.bool_(),
+    20: lambda pa: pa.int64(),
+    21: lambda pa: pa.int16(),
+    23: lambda pa: pa.int32(),
+    700: lambda pa: pa.float32(),
+    701: lambda pa: pa.float64(),
+    PARQUET_NUMERIC_OID: lambda pa: pa.float64(),
+    1082: lambda pa: pa.date32(),
+    1114: lambda pa: pa.timestamp('us'),
+    1184: lambda pa: pa.timestamp('us', tz='UTC'),
+}
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+def import_pyarrow():
+    """Return (pyarrow, pyarrow.parquet); only Parquet exports need them"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Export Parquet membutuhkan paket pyarrow, yang belum terpasang') from None
+    return pyarrow, pyarrow.parquet
+
+def write_parquet(query, params, output, batch_size=EXPORT_FETCH_SIZE):
+    """Write the rows of a SELECT to output as Parquet, one row group per batch.
+
+    Rows come from a server-side cursor in the current transaction, so only
+    one batch is held in memory and row-level security applies.
+    """
+    pa, pq = import_pyarrow()
+    with transaction() as conn:
+        with conn.cursor(name=f'export_{uuid4().hex}') as cur:
+            cur.execute(query, params or ())
+            rows = cur.fetchmany(batch_size)
+            schema = pa.schema([(c.name, PARQUET_TYPES.get(c.type_code, lambda pa: pa.string())(pa))
+                                for c in cur.description])
+            decimals = [c.name for c in cur.description if c.type_code == PARQUET_NUMERIC_OID]
+
+            with pq.ParquetWriter(output, schema) as writer:
+                while True:
+                    frame = pd.DataFrame.from_records(rows, columns=schema.names)
+                    for name in decimals:
+                        frame[name] = frame[name].astype('float64')
+                    writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+
+def parquet_export_response(spec):
+    """Send an export's rows as a typed Parquet file, with the list view's search and sort"""
+    try:
+        search = request.args.get('search', '').strip()
+        query, params = export_query(spec, search, request.args.get('sort'), request.args.get('dir', 'asc'))
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_THRESHOLD)
+        write_parquet(query, params, output)
+
+        return stream_export_file(
+            output,
+            f"{spec['filename']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+            PARQUET_MIMETYPE
+        )
+    except Exception as e:
+        logger.error(f"Parquet Export Error: {str(e)}")
+        flash('Gagal membuat Parquet: ' + str(e), 'error')
+        return redirect(url_for(spec['list_endpoint']))
+
 # ==============================================
 # AUTHENTICATION ROUTES
 # ==============================================
@@ -301,7 +1873,7 @@ def login():
             session['user_id'] = user[0]
             session['username'] = user[1]
             session['role'] = user[3]
-            session['trigram'] = user[4].upper() if user[4] else None  # Ensure uppercase
+            session['trigram'] = normalize_trigram(user[4]) or None
             flash('Login berhasil', 'success')
             return redirect(url_for('dashboard'))
         else:
@@ -319,31 +1891,116 @@ def logout():
 # DASHBOARD
 # ==============================================
 
+# Per-perwakilan counts live in the mv_perwakilan_scorecard materialized view
+# (migrations/006). Writes to a counted table mark it stale; a background
+# thread refreshes it shortly afterwards, so a burst of writes costs a single
+# refresh, and on a fixed schedule as a safety net.
+SCORECARD_ENTITIES = ('perwakilan', 'personel', 'pegawai_setempat', 'pendidikan', 'fungsional',
+                      'aks', 'alkom', 'palsan', 'jenis_sistem', 'sistem')
+SCORECARD_REFRESH_INTERVAL = 600  # seconds between scheduled refreshes
+SCORECARD_REFRESH_DELAY = 5  # seconds to collect further writes before refreshing
+
+_scorecard_stale = threading.Event()
+_scorecard_lock = threading.Lock()
+_scorecard_thread = None
+
+def refresh_scorecard():
+    """Rebuild the scorecard view; readers keep the old rows until it is done"""
+    execute_query("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_perwakilan_scorecard", commit=True)
+
+def _scorecard_refresher():
+    while True:
+        if _scorecard_stale.wait(SCORECARD_REFRESH_INTERVAL):
+            time.sleep(SCORECARD_REFRESH_DELAY)
+        _scorecard_stale.clear()
+        try:
+            refresh_scorecard()
+            invalidate_dashboard_stats()
+        except psycopg2.Error as e:
+            logger.error(f"Scorecard refresh failed: {e}")
+
+def start_scorecard_refresher():
+    """Start the background refresher once per process"""
+    global _scorecard_thread
+    with _scorecard_lock:
+        if _scorecard_thread is None:
+            _scorecard_thread = threading.Thread(target=_scorecard_refresher,
+                                                 name='scorecard-refresher', daemon=True)
+            _scorecard_thread.start()
+
+def mark_scorecard_stale():
+    """Ask for a scorecard refresh after the current writes"""
+    start_scorecard_refresher()
+    _scorecard_stale.set()
+
+def get_scorecard():
+    """Return the scorecard rows, one per perwakilan (scoped users only see their own)"""
+    start_scorecard_refresher()
+    return execute_query("""
+        SELECT trigram, nama_perwakilan, personel, pegawai_setempat, pendidikan,
+               fungsional, aks, alkom, palsan, palsan_dipinjamkan,
+               sistem_belum_berlaku, sistem_sedang_berlaku, sistem_tidak_berlaku,
+               refreshed_at
+        FROM v_perwakilan_scorecard
+        ORDER BY nama_perwakilan
+    """, fetch=True) or []
+
+# Dashboard figures are read after every login; they are cached briefly per
+# perwakilan scope and dropped by writes to the counted tables
+DASHBOARD_CACHE_TTL = 30  # seconds
+dashboard_cache = SharedCache('dashboard', 256, DASHBOARD_CACHE_TTL)
+
+def get_dashboard_stats():
+    """Return (stats, recent_systems), computing them on a cache miss"""
+    key = ('dashboard', current_perwakilan_scope())
+    cached = dashboard_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Exact table counts and the scorecard totals in one round-trip. Sistem
+    # is counted from its table: the scorecard only holds sistem that map to
+    # a perwakilan with a known status, and lags until its next refresh.
+    counts = execute_query("""
+        SELECT (SELECT COUNT(*) FROM TABEL_PENGGUNA),
+               (SELECT COUNT(*) FROM REF_PERWAKILAN),
+               (SELECT COUNT(*) FROM REF_JENIS_SISTEM),
+               (SELECT COUNT(*) FROM TABEL_SISTEM),
+               s.*
+        FROM (SELECT SUM(personel), SUM(pegawai_setempat), SUM(pendidikan), SUM(fungsional),
+                     SUM(aks), SUM(alkom), SUM(palsan), SUM(palsan_dipinjamkan)
+              FROM v_perwakilan_scorecard) s
+    """, fetch_one=True) or (0,) * 12
+    keys = ('users', 'perwakilan', 'jenis_sistem', 'sistem', 'personel', 'pegawai_setempat',
+            'pendidikan', 'fungsional', 'aks', 'alkom', 'palsan', 'palsan_dipinjamkan')
+    stats = {k: v or 0 for k, v in zip(keys, counts)}
+
+    # Sistem terbaru (limit 5 untuk dashboard)
+    recent_systems = execute_query("""
+        SELECT s.ID_SISTEM, s.TAHUN, s.ID_JENIS, s.NO_SISTEM, 
+               s.NAMA_SISTEM, s.JML_LEMBAR, s.STATUS,
+               j.JENIS, p.NAMA_PERWAKILAN
+        FROM TABEL_SISTEM s
+        JOIN REF_JENIS_SISTEM j ON s.ID_JENIS = j.ID_JENIS
+        LEFT JOIN REF_PERWAKILAN p ON j.TRIGRAM_PWK = p.TRIGRAM
+        ORDER BY s.DATE_INPUT DESC
+        LIMIT 5
+    """, fetch=True) or []
+
+    result = (stats, recent_systems)
+    dashboard_cache.set(key, result)
+    return result
+
+def invalidate_dashboard_stats():
+    """Forget the cached dashboard figures after a write to a counted table"""
+    dashboard_cache.clear()
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        # Data untuk dashboard
-        stats = {
-            'users': execute_query("SELECT COUNT(*) FROM TABEL_PENGGUNA", fetch_one=True)[0] or 0,
-            'perwakilan': execute_query("SELECT COUNT(*) FROM REF_PERWAKILAN", fetch_one=True)[0] or 0,
-            'jenis_sistem': execute_query("SELECT COUNT(*) FROM REF_JENIS_SISTEM", fetch_one=True)[0] or 0,
-            'sistem': execute_query("SELECT COUNT(*) FROM TABEL_SISTEM", fetch_one=True)[0] or 0
-        }
-        
-        # Sistem terbaru (limit 5 untuk dashboard)
-        recent_systems = execute_query("""
-            SELECT s.ID_SISTEM, s.TAHUN, s.ID_JENIS, s.NO_SISTEM, 
-                   s.NAMA_SISTEM, s.JML_LEMBAR, s.STATUS,
-                   j.JENIS, p.NAMA_PERWAKILAN
-            FROM TABEL_SISTEM s
-            LEFT JOIN REF_JENIS_SISTEM j ON s.ID_JENIS = j.ID_JENIS
-            LEFT JOIN REF_PERWAKILAN p ON j.TRIGRAM_PWK = p.TRIGRAM
-            ORDER BY s.DATE_INPUT DESC
-            LIMIT 5
-        """, fetch=True) or []
+        stats, recent_systems = get_dashboard_stats()
         
         return render_template('dashboard.html', 
                             stats=stats, 
@@ -353,361 +2010,261 @@ def dashboard():
         logger.error(f"Dashboard error: {str(e)}")
         flash('Terjadi kesalahan saat memuat dashboard', 'error')
         return render_template('dashboard.html', stats={}, recent_systems=[], is_dashboard=True)
-    
-# ==============================================
-# PENGGUNA CRUD ROUTES
-# ==============================================
 
-@app.route('/pengguna/export/pdf')
-def export_pengguna_pdf():
-    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+@app.route('/dashboard/perwakilan')
+def dashboard_perwakilan():
+    if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_pengguna')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_pengguna': 'id_pengguna',
-            'nama_pengguna': 'nama_pengguna',
-            'username': 'username',
-            'role': 'role',
-            'id_pwk': 'id_pwk',
-            'date_input': 'date_input'
-        }
-        sort_column = valid_columns.get(sort_column, 'id_pengguna')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with join to get perwakilan name
-        query = f"""
-            SELECT p.id_pengguna, p.nama_pengguna, p.username, p.role, 
-                   p.id_pwk, r.NAMA_PERWAKILAN,
-                   p.date_input
-            FROM tabel_pengguna p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM
-            WHERE p.nama_pengguna ILIKE %s OR 
-                  p.username ILIKE %s OR
-                  r.NAMA_PERWAKILAN ILIKE %s OR
-                  p.id_pengguna ILIKE %s
-            ORDER BY {sort_column} {sort_direction}
-        """
 
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(4)]
-
-        # Execute query to get all data
-        pengguna_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PENGGUNA", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No",
-            "ID Pengguna",
-            "Nama Pengguna",
-            "Username",
-            "Role",
-            "Perwakilan",
-            "Tanggal Input"
-        ]
-        data.append(headers)
-        
-        for idx, item in enumerate(pengguna_list, 1):
-            row = [
-                str(idx),
-                item[0] or '-',  # ID Pengguna
-                item[1] or '-',  # Nama Pengguna
-                item[2] or '-',  # Username
-                'Admin' if item[3] == 0 else 'User',  # Role
-                item[5] or '-',  # Perwakilan
-                item[6].strftime('%d-%m-%Y') if item[6] else '-'  # Tanggal Input
-            ]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution
-        col_ratios = [0.05, 0.1, 0.2, 0.15, 0.1, 0.25, 0.15]
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [25, 50, 70, 60, 40, 80, 60]
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),
-            ('LEADING', (0,0), (-1,-1), 8),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),
-            ('ALIGN', (4,0), (4,-1), 'CENTER'),
-            ('ALIGN', (-1,0), (-1,-1), 'CENTER')
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_pengguna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
+    try:
+        scorecard = get_scorecard()
     except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_pengguna'))
-    
-@app.route('/pengguna/export/excel')
-def export_pengguna_excel():
+        logger.error(f"Scorecard error: {str(e)}")
+        flash('Terjadi kesalahan saat memuat rekap perwakilan', 'error')
+        scorecard = []
+
+    refreshed_at = max((row[13] for row in scorecard), default=None)
+    return render_template('dashboard/perwakilan.html',
+                           scorecard=scorecard,
+                           refreshed_at=refreshed_at)
+
+@app.route('/dashboard/db-pool')
+def db_pool_stats():
     if 'user_id' not in session or session.get('role') != 0:  # Admin only
         return redirect(url_for('login'))
+
+    return jsonify(db_pool.stats())
     
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_pengguna')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_pengguna': 'id_pengguna',
-            'nama_pengguna': 'nama_pengguna',
-            'username': 'username',
-            'role': 'role',
-            'id_pwk': 'id_pwk',
-            'date_input': 'date_input'
-        }
-        sort_column = valid_columns.get(sort_column, 'id_pengguna')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with join to get perwakilan name
-        query = f"""
-            SELECT p.id_pengguna, p.nama_pengguna, p.username, p.role, 
-                   p.id_pwk, r.NAMA_PERWAKILAN,
-                   p.date_input
-            FROM tabel_pengguna p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM
-            WHERE p.nama_pengguna ILIKE %s OR 
-                  p.username ILIKE %s OR
-                  r.NAMA_PERWAKILAN ILIKE %s OR
-                  p.id_pengguna ILIKE %s
-            ORDER BY {sort_column} {sort_direction}
-        """
+# ==============================================
+# GLOBAL SEARCH
+# ==============================================
 
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(4)]
+SEARCH_RESULTS_PER_ENTITY = 10
+
+# Entities covered by /search. {q} stands for the tsquery; 'match' may also
+# reach rows through their personel's search_vector. Perwakilan scoping for
+# non-admin users comes from row-level security, as on the list pages.
+SEARCH_ENTITIES = [
+    {
+        'entity': 'personel', 'label': 'Personel',
+        'from': "tabel_personel p",
+        'key': "p.no", 'title': "p.nama",
+        'detail': "concat_ws(' · ', p.nip, p.pangkat_gol, p.id_pwk)",
+        'vector': "p.search_vector",
+        'match': "p.search_vector @@ {q}",
+        'endpoint': 'edit_personel', 'link': "p.no", 'arg': 'no',
+    },
+    {
+        'entity': 'pegawai_setempat', 'label': 'Pegawai Setempat',
+        'from': "tabel_pegawai_setempat p",
+        'key': "p.no", 'title': "p.nama",
+        'detail': "concat_ws(' · ', p.nik, p.telp, p.id_pwk)",
+        'vector': "p.search_vector",
+        'match': "p.search_vector @@ {q}",
+        'endpoint': 'edit_pegawai_setempat', 'link': "p.no", 'arg': 'no',
+    },
+    {
+        'entity': 'pendidikan', 'label': 'Pendidikan',
+        'from': "tabel_pendidikan p LEFT JOIN tabel_personel per ON p.id_personel = per.no",
+        'key': "p.no", 'title': "p.nama_pend",
+        'detail': "concat_ws(' · ', per.nama, p.tahun, per.id_pwk)",
+        'vector': "p.search_vector || coalesce(per.search_vector, ''::tsvector)",
+        'match': """p.search_vector @@ {q} OR
+                    p.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE search_vector @@ {q}))""",
+        'endpoint': 'edit_pendidikan', 'link': "p.id_personel", 'arg': 'personel_id',
+    },
+    {
+        'entity': 'fungsional', 'label': 'Fungsional',
+        'from': """tabel_fungsional f
+            LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
+            LEFT JOIN tabel_personel per ON f.id_personel = per.no""",
+        'key': "f.no", 'title': "jf.nama_fungsional",
+        'detail': "concat_ws(' · ', per.nama, f.jenjang, f.no_sk, per.id_pwk)",
+        'vector': "f.search_vector || coalesce(per.search_vector, ''::tsvector)",
+        'match': """f.search_vector @@ {q} OR
+                    f.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE search_vector @@ {q}))""",
+        'endpoint': 'edit_fungsional', 'link': "f.no", 'arg': 'no',
+    },
+    {
+        'entity': 'aks', 'label': 'AKS',
+        'from': "tabel_aks a LEFT JOIN tabel_personel p ON a.id_personel = p.no",
+        'key': "a.no", 'title': "a.aks",
+        'detail': "concat_ws(' · ', p.nama, a.no_berita, a.id_pwk)",
+        'vector': "a.search_vector || coalesce(p.search_vector, ''::tsvector)",
+        'match': """a.search_vector @@ {q} OR
+                    a.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE search_vector @@ {q}))""",
+        'endpoint': 'edit_aks', 'link': "a.no", 'arg': 'no',
+    },
+    {
+        'entity': 'alkom', 'label': 'Alkom',
+        'from': "tabel_Alkom a",
+        'key': "a.no", 'title': "concat_ws(' ', a.provider, a.nomor_telp_satelit)",
+        'detail': "concat_ws(' · ', a.jenis_telpon_satelit, a.no_bmn, a.perwakilan)",
+        'vector': "a.search_vector",
+        'match': "a.search_vector @@ {q}",
+        'endpoint': 'edit_alkom', 'link': "a.no", 'arg': 'no',
+    },
+    {
+        'entity': 'palsan', 'label': 'Palsan',
+        'from': "tabel_palsan p",
+        'key': "p.id_palsan", 'title': "p.id_palsan",
+        'detail': "concat_ws(' · ', p.serial_number, p.status, p.id_pwk)",
+        'vector': "p.search_vector",
+        'match': "p.search_vector @@ {q}",
+        'endpoint': 'edit_palsan', 'link': "p.id_palsan", 'arg': 'id_palsan',
+    },
+    {
+        'entity': 'sistem', 'label': 'Sistem',
+        'from': "tabel_sistem s",
+        'key': "s.id_sistem", 'title': "s.nama_sistem",
+        'detail': "concat_ws(' · ', s.id_sistem, s.no_sistem, s.tahun)",
+        'vector': "s.search_vector",
+        'match': "s.search_vector @@ {q}",
+        'endpoint': 'edit_sistem', 'link': "s.id_sistem", 'arg': 'id_sistem',
+    },
+    {
+        'entity': 'kepri', 'label': 'Kepri',
+        'from': "tabel_kepri k",
+        'key': "k.no", 'title': "k.nama",
+        'detail': "concat_ws(' · ', k.tahun, k.id_pwk, k.status)",
+        'vector': "k.search_vector",
+        'match': "k.search_vector @@ {q}",
+        'endpoint': 'edit_kepri', 'link': "k.no", 'arg': 'no',
+    },
+]
 
-        # Execute query to get all data
-        pengguna_list = execute_query(query, params, fetch=True) or []
+def build_tsquery(text):
+    """Prefix-matching tsquery text for free-form input ('' if nothing to search)"""
+    return ' & '.join(f"{term}:*" for term in re.findall(r'\w+', text.lower()))
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Pengguna")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter'
+def global_search(text, per_entity=SEARCH_RESULTS_PER_ENTITY):
+    """Search every entity in SEARCH_ENTITIES with one UNION ALL statement.
+
+    Each branch is served by its table's search_vector GIN index. Returns
+    groups of {'entity', 'label', 'hits'} ordered by their best hit, hits
+    ordered by rank.
+    """
+    tsquery = build_tsquery(text)
+    if not tsquery:
+        return []
+
+    q = "to_tsquery('simple', %s)"
+    branches = []
+    params = []
+    for spec in SEARCH_ENTITIES:
+        where = [spec['match'].format(q=q)]
+        params.append(tsquery)  # ts_rank() in the select list
+        params.extend([tsquery] * spec['match'].count('{q}'))
+        params.append(per_entity)
+        branches.append(f"""(
+            SELECT '{spec['entity']}' AS entity, {spec['key']}::text AS key,
+                   {spec['link']}::text AS link_key, {spec['title']} AS title,
+                   {spec['detail']} AS detail, ts_rank({spec['vector']}, {q}) AS rank
+            FROM {spec['from']}{build_where(where)}
+            ORDER BY rank DESC
+            LIMIT %s
+        )""")
+
+    rows = execute_query(" UNION ALL ".join(branches), params, fetch=True) or []
+
+    specs = {spec['entity']: spec for spec in SEARCH_ENTITIES}
+    groups = {}
+    for entity, key, link_key, title, detail, rank in rows:
+        spec = specs[entity]
+        group = groups.setdefault(entity, {'entity': entity, 'label': spec['label'], 'hits': []})
+        group['hits'].append({
+            'key': key,
+            'title': title,
+            'detail': detail,
+            'rank': float(rank),
+            'url': url_for(spec['endpoint'], **{spec['arg']: link_key}) if link_key else None,
         })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA PENGGUNA', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No",
-            "ID Pengguna",
-            "Nama Pengguna",
-            "Username",
-            "Role",
-            "Perwakilan",
-            "Tanggal Input"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(pengguna_list, 1):
-            worksheet.write(current_row, 0, idx, center_format)  # No
-            worksheet.write(current_row, 1, item[0] or '-', data_format)  # ID Pengguna
-            worksheet.write(current_row, 2, item[1] or '-', data_format)  # Nama Pengguna
-            worksheet.write(current_row, 3, item[2] or '-', data_format)  # Username
-            worksheet.write(current_row, 4, 'Admin' if item[3] == 0 else 'User', center_format)  # Role
-            worksheet.write(current_row, 5, item[5] or '-', data_format)  # Perwakilan
-            worksheet.write(current_row, 6, item[6].strftime('%d-%m-%Y') if item[6] else '-', center_format)  # Tanggal Input
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [
-            ("No", 5),
-            ("ID Pengguna", 15),
-            ("Nama Pengguna", 25),
-            ("Username", 20),
-            ("Role", 12),
-            ("Perwakilan", 30),
-            ("Tanggal Input", 15)
-        ]
-        
-        for i, (header, default_width) in enumerate(col_widths):
-            max_length = len(header)
-            for row in pengguna_list:
-                if i == 0:  # No column
-                    val_length = len(str(idx))
-                elif i == 1:  # ID Pengguna
-                    val_length = len(str(row[0] or ''))
-                elif i == 2:  # Nama Pengguna
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # Username
-                    val_length = len(str(row[2] or ''))
-                elif i == 4:  # Role
-                    val_length = len('Admin' if row[3] == 0 else 'User')
-                elif i == 5:  # Perwakilan
-                    val_length = len(str(row[5] or ''))
-                elif i == 6:  # Tanggal Input
-                    val_length = len(row[6].strftime('%d-%m-%Y') if row[6] else '-')
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_pengguna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
+    return sorted(groups.values(), key=lambda group: -group['hits'][0]['rank'])
+
+@app.route('/search')
+def search():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    query = request.args.get('q', '').strip()
+
+    try:
+        results = global_search(query) if query else []
     except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_pengguna'))
+        logger.error(f"Error in global search: {str(e)}")
+        flash('Terjadi kesalahan saat melakukan pencarian', 'error')
+        results = []
+
+    if request.args.get('format') == 'json':
+        return jsonify({'query': query, 'results': results})
+
+    return render_template('search/results.html',
+                           query=query,
+                           results=results,
+                           total=sum(len(group['hits']) for group in results))
+
+# ==============================================
+# PENGGUNA CRUD ROUTES
+# ==============================================
+
+PENGGUNA_EXPORT = {
+    'title': 'LAPORAN DATA PENGGUNA',
+    'sheet': 'Data Pengguna',
+    'filename': 'data_pengguna',
+    'list_endpoint': 'list_pengguna',
+    'query': """
+        SELECT p.id_pengguna, p.nama_pengguna, p.username, p.role,
+               p.id_pwk, r.NAMA_PERWAKILAN, p.date_input
+        FROM tabel_pengguna p
+        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM""",
+    'search': [
+        "p.nama_pengguna ILIKE %s",
+        "p.username ILIKE %s",
+        "p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+        "p.id_pengguna ILIKE %s",
+    ],
+    'sort': {
+        'id_pengguna': 'p.id_pengguna',
+        'nama_pengguna': 'p.nama_pengguna',
+        'username': 'p.username',
+        'role': 'p.role',
+        'id_pwk': 'p.id_pwk',
+        'date_input': 'p.date_input'
+    },
+    'default_sort': 'id_pengguna',
+    'columns': [
+        export_column("ID Pengguna", 0, 0.1, 50),
+        export_column("Nama Pengguna", 1, 0.2, 70),
+        export_column("Username", 2, 0.15, 60),
+        export_column("Role", lambda row: 'Admin' if row[3] == 0 else 'User', 0.1, 40, align='CENTER'),
+        export_column("Perwakilan", 5, 0.25, 80),
+        export_column("Tanggal Input", 6, 0.15, 60, align='CENTER', kind='date'),
+    ],
+}
+
+@app.route('/pengguna/export/pdf')
+def export_pengguna_pdf():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return export_response(PENGGUNA_EXPORT, 'pdf')
+
+@app.route('/pengguna/export/excel')
+def export_pengguna_excel():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return export_response(PENGGUNA_EXPORT, 'xlsx')
+
+@app.route('/pengguna/export/csv')
+def export_pengguna_csv():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return csv_export_response(PENGGUNA_EXPORT)
+
+@app.route('/pengguna/export/parquet')
+def export_pengguna_parquet():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return parquet_export_response(PENGGUNA_EXPORT)
 
 @app.route('/pengguna')
 def list_pengguna():
@@ -742,53 +2299,35 @@ def list_pengguna():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with join to get perwakilan name
-    query = f"""
-        SELECT p.id_pengguna, p.nama_pengguna, p.username, p.role, 
-               p.id_pwk, r.NAMA_PERWAKILAN,
-               p.user_input, p.date_input, p.user_update, p.date_update
-        FROM tabel_pengguna p
-        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM
-        WHERE p.nama_pengguna ILIKE %s OR 
-              p.username ILIKE %s OR
-              r.NAMA_PERWAKILAN ILIKE %s OR
-              p.id_pengguna ILIKE %s
-        ORDER BY {sort_column} {sort_direction}
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM tabel_pengguna p
-        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM
-        WHERE p.nama_pengguna ILIKE %s OR 
-              p.username ILIKE %s OR
-              r.NAMA_PERWAKILAN ILIKE %s OR
-              p.id_pengguna ILIKE %s
-    """
-
-    search_param = f'%{search}%'
-    
-    # Get total count
-    total = execute_query(count_query, 
-                         (search_param, search_param, search_param, search_param), 
-                         fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    pengguna_list = execute_query(paginated_query, 
-                                (search_param, search_param, search_param, search_param), 
-                                fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""p.nama_pengguna ILIKE %s OR 
+                      p.username ILIKE %s OR
+                      p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s)) OR
+                      p.id_pengguna ILIKE %s""")
+        params.extend([search_param] * 4)
+
+    # Fetch the page and the total in one round-trip
+    pengguna_list, total, total_estimated = fetch_list_page(
+        select="""p.id_pengguna, p.nama_pengguna, p.username, p.role, 
+                  p.id_pwk, r.NAMA_PERWAKILAN,
+                  p.user_input, p.date_input, p.user_update, p.date_update""",
+        from_clause="tabel_pengguna p LEFT JOIN ref_perwakilan r ON p.id_pwk = r.TRIGRAM",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('pengguna', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
     # Get list of perwakilan for filter
-    perwakilan_list = execute_query(
-        "SELECT TRIGRAM, NAMA_PERWAKILAN FROM ref_perwakilan ORDER BY NAMA_PERWAKILAN",
-        fetch=True
-    ) or []
+    perwakilan_list = get_reference('perwakilan')
     
     return render_template('pengguna/list.html', 
                          pengguna_list=pengguna_list,
@@ -797,6 +2336,7 @@ def list_pengguna():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -810,27 +2350,16 @@ def create_pengguna():
         flash('Anda tidak memiliki akses ke halaman ini', 'error')
         return redirect(url_for('dashboard'))
     
-    perwakilan_list = execute_query(
-        "SELECT TRIGRAM, NAMA_PERWAKILAN FROM ref_perwakilan ORDER BY NAMA_PERWAKILAN",
-        fetch=True
-    ) or []
+    perwakilan_list = get_reference('perwakilan')
     
     if request.method == 'POST':
         try:
-            # Generate user ID (U0001 format)
-            max_id_result = execute_query(
-                "SELECT MAX(CAST(SUBSTRING(id_pengguna, 2) AS INTEGER)) FROM tabel_pengguna",
-                fetch_one=True
-            )
-            max_id = max_id_result[0] if max_id_result and max_id_result[0] else 0
-            user_id = f'U{max_id + 1:04}'
-            
             # Get form data
             nama_pengguna = request.form.get('nama_pengguna', '').strip()
             username = request.form.get('username', '').strip()
             password = request.form.get('password', '').strip()
             role = request.form.get('role', '1').strip()  # Default to 1 (regular user)
-            id_pwk = request.form.get('id_pwk', '').strip() or None
+            id_pwk = normalize_trigram(request.form.get('id_pwk')) or None
             
             # Validate required fields
             if not all([nama_pengguna, username, password]):
@@ -855,7 +2384,6 @@ def create_pengguna():
             
             # Prepare data
             data = (
-                user_id,
                 nama_pengguna,
                 username,
                 hashed_password,
@@ -865,13 +2393,15 @@ def create_pengguna():
                 datetime.now()
             )
             
-            success = execute_query("""
+            # The user ID (U0001 format) is allocated by the INSERT
+            success = execute_query(f"""
                 INSERT INTO tabel_pengguna 
                 (id_pengguna, nama_pengguna, username, password, role, id_pwk, user_input, date_input)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES ({next_id_sql('pengguna')}, %s, %s, %s, %s, %s, %s, %s)
             """, data, commit=True)
             
             if success:
+                invalidate_entity('pengguna')
                 flash('Pengguna berhasil ditambahkan', 'success')
                 return redirect(url_for('list_pengguna'))
             else:
@@ -907,10 +2437,7 @@ def edit_pengguna(user_id):
         flash('Data pengguna tidak ditemukan', 'error')
         return redirect(url_for('list_pengguna'))
     
-    perwakilan_list = execute_query(
-        "SELECT TRIGRAM, NAMA_PERWAKILAN FROM ref_perwakilan ORDER BY NAMA_PERWAKILAN",
-        fetch=True
-    ) or []
+    perwakilan_list = get_reference('perwakilan')
     
     if request.method == 'POST':
         try:
@@ -918,7 +2445,7 @@ def edit_pengguna(user_id):
             username = request.form.get('username', '').strip()
             password = request.form.get('password', '').strip()
             role = request.form.get('role', '1').strip()
-            id_pwk = request.form.get('id_pwk', '').strip() or None
+            id_pwk = normalize_trigram(request.form.get('id_pwk')) or None
             
             if not all([nama_pengguna, username]):
                 flash('Nama Pengguna dan Username wajib diisi', 'error')
@@ -974,6 +2501,7 @@ def edit_pengguna(user_id):
             success = execute_query(update_query, tuple(update_data), commit=True)
             
             if success:
+                invalidate_entity('pengguna')
                 flash('Pengguna berhasil diperbarui', 'success')
                 return redirect(url_for('list_pengguna'))
             else:
@@ -1011,6 +2539,7 @@ def delete_pengguna(user_id):
         )
         
         if success:
+            invalidate_entity('pengguna')
             flash('Pengguna berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus pengguna', 'error')
@@ -1025,345 +2554,62 @@ def delete_pengguna(user_id):
 # PERWAKILAN CRUD (IMPROVED VERSION)
 # ==============================================
 
+PERWAKILAN_EXPORT = {
+    'title': 'LAPORAN DATA PERWAKILAN',
+    'sheet': 'Data Perwakilan',
+    'filename': 'data_perwakilan',
+    'list_endpoint': 'list_perwakilan',
+    'query': """
+        SELECT TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK, NO_URUTAN
+        FROM REF_PERWAKILAN""",
+    'search': [
+        "NAMA_PERWAKILAN ILIKE %s",
+        "NEGARA ILIKE %s",
+        "TRIGRAM ILIKE %s",
+        "BIGRAM ILIKE %s",
+        "JENIS_PWK ILIKE %s",
+    ],
+    'sort': {
+        'TRIGRAM': 'TRIGRAM',
+        'BIGRAM': 'BIGRAM',
+        'NAMA_PERWAKILAN': 'NAMA_PERWAKILAN',
+        'NEGARA': 'NEGARA',
+        'JENIS_PWK': 'JENIS_PWK',
+        'NO_URUTAN': 'NO_URUTAN'
+    },
+    'default_sort': 'NO_URUTAN',
+    'columns': [
+        export_column("Trigram", 0, 0.1, 40, align='CENTER'),
+        export_column("Bigram", 1, 0.1, 40, align='CENTER'),
+        export_column("Nama Perwakilan", 2, 0.25, 70),
+        export_column("Negara", 3, 0.4, 120),
+        export_column("Jenis PWK", 4, 0.02, 50, align='CENTER'),
+    ],
+}
+
 @app.route('/perwakilan/export/pdf')
 def export_perwakilan_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'NO_URUTAN')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'TRIGRAM': 'TRIGRAM',
-            'BIGRAM': 'BIGRAM',
-            'NAMA_PERWAKILAN': 'NAMA_PERWAKILAN',
-            'NEGARA': 'NEGARA',
-            'JENIS_PWK': 'JENIS_PWK',
-            'NO_URUTAN': 'NO_URUTAN'
-        }
-        sort_column = valid_columns.get(sort_column, 'NO_URUTAN')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query
-        query = """
-            SELECT TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK, NO_URUTAN
-            FROM REF_PERWAKILAN 
-            WHERE NAMA_PERWAKILAN ILIKE %s OR 
-                  NEGARA ILIKE %s OR 
-                  TRIGRAM ILIKE %s OR
-                  BIGRAM ILIKE %s OR
-                  JENIS_PWK ILIKE %s
-            ORDER BY {} {}
-        """.format(sort_column, sort_direction)
-        
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Execute query to get all data
-        perwakilan_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PERWAKILAN", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No",
-            "Trigram",
-            "Bigram",
-            "Nama Perwakilan",
-            "Negara",
-            "Jenis PWK",
-        ]
-        data.append(headers)
-        
-        for idx, item in enumerate(perwakilan_list, 1):
-            row = [
-                str(idx),
-                item[0] or '-',  # Trigram
-                item[1] or '-',  # Bigram
-                item[2] or '-',  # Nama Perwakilan
-                item[3] or '-',  # Negara
-                item[4] or '-',  # Jenis PWK
-            ]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution
-        col_ratios = [0.05, 0.1, 0.1, 0.25, 0.4, 0.02]
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [25, 40, 40, 70, 120, 50]
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),
-            ('LEADING', (0,0), (-1,-1), 8),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),
-            ('ALIGN', (1,0), (2,-1), 'CENTER'),
-            ('ALIGN', (-1,0), (-1,-1), 'CENTER')
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_perwakilan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_perwakilan'))
+    return export_response(PERWAKILAN_EXPORT, 'pdf')
 
 @app.route('/perwakilan/export/excel')
 def export_perwakilan_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'NO_URUTAN')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'TRIGRAM': 'TRIGRAM',
-            'BIGRAM': 'BIGRAM',
-            'NAMA_PERWAKILAN': 'NAMA_PERWAKILAN',
-            'NEGARA': 'NEGARA',
-            'JENIS_PWK': 'JENIS_PWK',
-            'NO_URUTAN': 'NO_URUTAN'
-        }
-        sort_column = valid_columns.get(sort_column, 'NO_URUTAN')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query
-        query = """
-            SELECT TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK, NO_URUTAN
-            FROM REF_PERWAKILAN 
-            WHERE NAMA_PERWAKILAN ILIKE %s OR 
-                  NEGARA ILIKE %s OR 
-                  TRIGRAM ILIKE %s OR
-                  BIGRAM ILIKE %s OR
-                  JENIS_PWK ILIKE %s
-            ORDER BY {} {}
-        """.format(sort_column, sort_direction)
-        
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
+    return export_response(PERWAKILAN_EXPORT, 'xlsx')
 
-        # Execute query to get all data
-        perwakilan_list = execute_query(query, params, fetch=True) or []
+@app.route('/perwakilan/export/csv')
+def export_perwakilan_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(PERWAKILAN_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Perwakilan")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA PERWAKILAN', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No",
-            "Trigram",
-            "Bigram",
-            "Nama Perwakilan",
-            "Negara",
-            "Jenis PWK",
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(perwakilan_list, 1):
-            worksheet.write(current_row, 0, idx, center_format)  # No
-            worksheet.write(current_row, 1, item[0] or '-', center_format)  # Trigram
-            worksheet.write(current_row, 2, item[1] or '-', center_format)  # Bigram
-            worksheet.write(current_row, 3, item[2] or '-', data_format)  # Nama Perwakilan
-            worksheet.write(current_row, 4, item[3] or '-', data_format)  # Negara
-            worksheet.write(current_row, 5, item[4] or '-', center_format)  # Jenis PWK
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [
-            ("No", 5),
-            ("Trigram", 10),
-            ("Bigram", 10),
-            ("Nama Perwakilan", 30),
-            ("Negara", 20),
-            ("Jenis PWK", 15),
-        ]
-        
-        for i, (header, default_width) in enumerate(col_widths):
-            max_length = len(header)
-            for row in perwakilan_list:
-                if i == 0:  # No column
-                    val_length = len(str(idx))
-                elif i == 1:  # Trigram
-                    val_length = len(str(row[0] or ''))
-                elif i == 2:  # Bigram
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # Nama Perwakilan
-                    val_length = len(str(row[2] or ''))
-                elif i == 4:  # Negara
-                    val_length = len(str(row[3] or ''))
-                elif i == 5:  # Jenis PWK
-                    val_length = len(str(row[4] or ''))
-                elif i == 6:  # No Urut
-                    val_length = len(str(row[5] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_perwakilan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_perwakilan'))
+@app.route('/perwakilan/export/parquet')
+def export_perwakilan_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(PERWAKILAN_EXPORT)
 
 @app.route('/perwakilan')
 def list_perwakilan():
@@ -1390,40 +2636,29 @@ def list_perwakilan():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query
-    query = """
-        SELECT TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK
-        FROM REF_PERWAKILAN 
-        WHERE NAMA_PERWAKILAN ILIKE %s OR 
-              NEGARA ILIKE %s OR 
-              TRIGRAM ILIKE %s OR
-              BIGRAM ILIKE %s OR
-              JENIS_PWK ILIKE %s
-        ORDER BY {} {}
-    """.format(sort_column, sort_direction)
-    
-    search_param = f'%{search}%'
-    
-    # Get total count
-    count_query = """
-        SELECT COUNT(*) FROM REF_PERWAKILAN 
-        WHERE NAMA_PERWAKILAN ILIKE %s OR 
-              NEGARA ILIKE %s OR 
-              TRIGRAM ILIKE %s OR
-              BIGRAM ILIKE %s OR
-              JENIS_PWK ILIKE %s
-    """
-    total = execute_query(count_query, 
-                         (search_param, search_param, search_param, 
-                          search_param, search_param), 
-                         fetch_one=True)[0] or 0
-    
-    # Add pagination
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    perwakilan_list = execute_query(paginated_query, 
-                                  (search_param, search_param, search_param, 
-                                   search_param, search_param), 
-                                  fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""NAMA_PERWAKILAN ILIKE %s OR 
+                      NEGARA ILIKE %s OR 
+                      TRIGRAM ILIKE %s OR
+                      BIGRAM ILIKE %s OR
+                      JENIS_PWK ILIKE %s""")
+        params.extend([search_param] * 5)
+
+    # Fetch the page and the total in one round-trip
+    perwakilan_list, total, total_estimated = fetch_list_page(
+        select="TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK",
+        from_clause="REF_PERWAKILAN",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('perwakilan', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -1433,6 +2668,7 @@ def list_perwakilan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -1450,18 +2686,12 @@ def create_perwakilan():
             return redirect(url_for('create_perwakilan'))
         
         try:
-            # Get auto-increment numbers
-            next_urutan = get_next_urutan()
-            next_no_perwakilan = get_next_no_perwakilan()
-            
             data = (
-                request.form.get('trigram', '').strip().upper(),
+                normalize_trigram(request.form.get('trigram')),
                 request.form.get('bigram', '').strip().upper(),
                 request.form.get('nama_perwakilan', '').strip().upper(),
                 request.form.get('negara', '').strip(),
                 jenis_pwk,
-                next_no_perwakilan,
-                next_urutan,
                 session.get('username', 'system'),
                 datetime.now(),
                 session.get('username', 'system'),
@@ -1478,10 +2708,13 @@ def create_perwakilan():
                 (TRIGRAM, BIGRAM, NAMA_PERWAKILAN, NEGARA, JENIS_PWK, 
                  NO_PERWAKILAN, NO_URUTAN, USER_INPUT, DATE_INPUT, 
                  USER_UPDATE, DATE_UPDATE)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s,
+                        nextval('seq_perwakilan_no'), nextval('seq_perwakilan_urutan'),
+                        %s, %s, %s, %s)
             """, data, commit=True)
             
             if success:
+                invalidate_entity('perwakilan')
                 flash('Data perwakilan berhasil ditambahkan', 'success')
                 return redirect(url_for('list_perwakilan'))
             else:
@@ -1492,11 +2725,7 @@ def create_perwakilan():
             flash('Terjadi kesalahan saat menambahkan data', 'error')
     
     # For GET request
-    next_urutan = get_next_urutan()
-    next_no_perwakilan = get_next_no_perwakilan()
     return render_template('perwakilan/create.html', 
-                         next_urutan=next_urutan,
-                         next_no_perwakilan=next_no_perwakilan,
                          jenis_pwk_options=VALID_JENIS_PWK)
 
 @app.route('/perwakilan/edit/<trigram>', methods=['GET', 'POST'])
@@ -1519,7 +2748,7 @@ def edit_perwakilan(trigram):
             no_perwakilan = 0
         
         data = (
-            request.form.get('trigram', '').strip().upper(),  # Uppercase
+            normalize_trigram(request.form.get('trigram')),  # Uppercase
             request.form.get('bigram', '').strip().upper(),   # Uppercase
             request.form.get('nama_perwakilan', '').strip().upper(),  # Uppercase
             request.form.get('negara', '').strip(),
@@ -1546,6 +2775,7 @@ def edit_perwakilan(trigram):
         """, data, commit=True)
         
         if success:
+            invalidate_entity('perwakilan')
             flash('Data perwakilan berhasil diperbarui', 'success')
             return redirect(url_for('list_perwakilan'))
         else:
@@ -1577,6 +2807,7 @@ def delete_perwakilan(trigram):
     )
     
     if success:
+        invalidate_entity('perwakilan')
         flash('Data perwakilan berhasil dihapus', 'success')
     else:
         flash('Gagal menghapus data perwakilan', 'error')
@@ -1587,367 +2818,62 @@ def delete_perwakilan(trigram):
 # KEPRI CRUD ROUTES
 # ==============================================
 
+KEPRI_EXPORT = {
+    'title': 'LAPORAN DATA KEPRI',
+    'sheet': 'Data KEPRI',
+    'filename': 'data_kepri',
+    'list_endpoint': 'list_kepri',
+    'pagesize': landscape(letter),
+    'query': """
+        SELECT k.no, k.nama, k.tahun, k.id_pwk, r.nama_perwakilan, k.status, k.keterangan
+        FROM tabel_kepri k
+        LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram""",
+    'search': [
+        "k.nama ILIKE %s",
+        "k.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+        "k.id_pwk ILIKE %s",
+        "k.tahun::text ILIKE %s",
+    ],
+    'sort': {
+        'no': 'k.no',
+        'nama': 'k.nama',
+        'tahun': 'k.tahun',
+        'perwakilan': 'r.nama_perwakilan'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 4, 0.25, 80),
+        export_column("Nama", 1, 0.25, 80),
+        export_column("Tahun", 2, 0.1, 40, align='CENTER'),
+        export_column("Status", lambda row: "Aktif" if row[5] == 1 else "Tidak Aktif", 0.15, 60, align='CENTER'),
+        # Keterangan only applies to inactive kepri
+        export_column("Keterangan", lambda row: row[6] if row[5] == 0 else None, 0.2, 80),
+    ],
+}
+
 @app.route('/kepri/export/pdf')
 def export_kepri_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'k.no',
-            'nama': 'k.nama',
-            'tahun': 'k.tahun',
-            'perwakilan': 'r.nama_perwakilan'
-        }
-        sort_column = valid_columns.get(sort_column, 'k.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT k.no, k.nama, k.tahun, k.id_pwk, r.nama_perwakilan, k.status, k.keterangan
-            FROM tabel_kepri k
-            LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram
-            WHERE (k.nama ILIKE %s OR 
-                  r.nama_perwakilan ILIKE %s OR
-                  k.id_pwk ILIKE %s OR
-                  k.tahun::text ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(4)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND k.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        kepri_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with landscape orientation
-        buffer = BytesIO()
-        doc_width, doc_height = landscape(letter)
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=landscape(letter),
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA KEPRI", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Nama", 
-            "Tahun", 
-            "Status",
-            "Keterangan"
-        ]
-        data.append(headers)
-        
-        for idx, item in enumerate(kepri_list, 1):
-            status = "Aktif" if item[5] == 1 else "Tidak Aktif"
-            row = [
-                str(idx),
-                item[4] or '-',  # nama_perwakilan
-                item[1] or '-',  # nama
-                str(item[2]) if item[2] else '-',  # tahun
-                status,
-                item[6] or '-' if item[5] == 0 else '-'  # keterangan only if not active
-            ]
-            data.append(row)
-        
-        # Calculate available width (subtract margins)
-        available_width = doc_width - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution
-        col_ratios = [0.05, 0.25, 0.25, 0.1, 0.15, 0.2]  # Sum should be 1.0
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [30, 80, 80, 40, 60, 80]  # Minimum widths in points
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 8),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 8),
-            ('LEADING', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Nama left-aligned
-            ('ALIGN', (3,0), (3,-1), 'CENTER'),    # Tahun centered
-            ('ALIGN', (4,0), (4,-1), 'CENTER'),    # Status centered
-            ('ALIGN', (5,0), (5,-1), 'LEFT')       # Keterangan left-aligned
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_kepri_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_kepri'))
+    return export_response(KEPRI_EXPORT, 'pdf')
 
 @app.route('/kepri/export/excel')
 def export_kepri_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'k.no',
-            'nama': 'k.nama',
-            'tahun': 'k.tahun',
-            'perwakilan': 'r.nama_perwakilan'
-        }
-        sort_column = valid_columns.get(sort_column, 'k.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT k.no, k.nama, k.tahun, k.id_pwk, r.nama_perwakilan, k.status, k.keterangan
-            FROM tabel_kepri k
-            LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram
-            WHERE (k.nama ILIKE %s OR 
-                  r.nama_perwakilan ILIKE %s OR
-                  k.id_pwk ILIKE %s OR
-                  k.tahun::text ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(4)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND k.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
+    return export_response(KEPRI_EXPORT, 'xlsx')
 
-        # Execute query to get all data
-        kepri_list = execute_query(query, params, fetch=True) or []
+@app.route('/kepri/export/csv')
+def export_kepri_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(KEPRI_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data KEPRI")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'align': 'center'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:F1', 'LAPORAN DATA KEPRI', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Nama", 
-            "Tahun", 
-            "Status",
-            "Keterangan"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(kepri_list, 1):
-            status = "Aktif" if item[5] == 1 else "Tidak Aktif"
-            keterangan = item[6] if item[5] == 0 else '-'
-            
-            row = [
-                idx,
-                item[4] or '-',  # nama_perwakilan
-                item[1] or '-',  # nama
-                item[2] or '-',  # tahun
-                status,
-                keterangan
-            ]
-            
-            # Apply different formats based on column
-            worksheet.write(current_row, 0, row[0], center_format)  # No - centered
-            worksheet.write(current_row, 1, row[1], data_format)     # Perwakilan
-            worksheet.write(current_row, 2, row[2], data_format)     # Nama
-            worksheet.write(current_row, 3, row[3], center_format)  # Tahun - centered
-            worksheet.write(current_row, 4, row[4], center_format)  # Status - centered
-            worksheet.write(current_row, 5, row[5], data_format)     # Keterangan
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in kepri_list:
-                if i == 0:  # No column
-                    val_length = len(str(row[0]))
-                elif i == 1:  # Perwakilan
-                    val_length = len(str(row[4] or ''))
-                elif i == 2:  # Nama
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # Tahun
-                    val_length = len(str(row[2] or ''))
-                elif i == 4:  # Status
-                    val_length = 6  # "Aktif" or "Tidak Aktif"
-                elif i == 5:  # Keterangan
-                    val_length = len(str(row[6] or '')) if row[5] == 0 else 0
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_kepri_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_kepri'))
+@app.route('/kepri/export/parquet')
+def export_kepri_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(KEPRI_EXPORT)
 
 @app.route('/kepri')
 def list_kepri():
@@ -1958,7 +2884,7 @@ def list_kepri():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'no')
+    sort_by = request.args.get('sort', 'no')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -1968,58 +2894,36 @@ def list_kepri():
         'tahun': 'k.tahun',
         'perwakilan': 'r.nama_perwakilan'
     }
-    sort_column = valid_columns.get(sort_column, 'k.no')
+    if sort_by not in valid_columns:
+        sort_by = 'no'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with join to get perwakilan name
-    query = """
-        SELECT k.no, k.nama, k.tahun, k.id_pwk, r.nama_perwakilan, k.status, k.keterangan
-        FROM tabel_kepri k
-        LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram
-        WHERE (k.nama ILIKE %s OR 
-              r.nama_perwakilan ILIKE %s OR
-              k.id_pwk ILIKE %s OR
-              k.tahun::text ILIKE %s)
-    """
-
-    # Parameters for the query
-    params = [f'%{search}%' for _ in range(4)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND k.id_pwk = %s"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination - simplified to just count rows
-    count_query = """
-        SELECT COUNT(*) 
-        FROM tabel_kepri k
-        LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram
-        WHERE (k.nama ILIKE %s OR 
-              r.nama_perwakilan ILIKE %s OR
-              k.id_pwk ILIKE %s OR
-              k.tahun::text ILIKE %s)
-    """
-    
-    # Add perwakilan filter to count query if needed
-    if session.get('role') != 0 and session.get('trigram'):
-        count_query += " AND k.id_pwk = %s"
-
-    # Get total count
-    total = execute_query(count_query, params, fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    kepri_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""k.nama ILIKE %s OR 
+                   k.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s)) OR
+                   k.id_pwk ILIKE %s OR
+                   k.tahun::text ILIKE %s""")
+        params.extend([search_param] * 4)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page and the total in one round-trip
+    kepri_list, total, total_estimated = fetch_list_page(
+        select="k.no, k.nama, k.tahun, k.id_pwk, r.nama_perwakilan, k.status, k.keterangan",
+        from_clause="tabel_kepri k LEFT JOIN ref_perwakilan r ON k.id_pwk = r.trigram",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('kepri', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -2029,8 +2933,9 @@ def list_kepri():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('k.', ''),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/kepri/create', methods=['GET', 'POST'])
@@ -2039,23 +2944,12 @@ def create_kepri():
         return redirect(url_for('login'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        user_trigram = session.get('trigram')
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (user_trigram,),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         nama = request.form.get('nama', '').strip()
         tahun = request.form.get('tahun', '').strip()
-        id_pwk = request.form.get('id_pwk', '').strip().upper()
+        id_pwk = normalize_trigram(request.form.get('id_pwk'))
         status = int(request.form.get('status', 1))  # Default aktif
         keterangan = request.form.get('keterangan', '').strip() if status == 0 else None
 
@@ -2082,6 +2976,7 @@ def create_kepri():
             )
             
             if success:
+                invalidate_entity('kepri')
                 flash('Data KEPRI berhasil ditambahkan', 'success')
                 return redirect(url_for('list_kepri'))
             else:
@@ -2119,22 +3014,12 @@ def edit_kepri(no):
             return redirect(url_for('list_kepri'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         nama = request.form.get('nama', '').strip()
         tahun = request.form.get('tahun', '').strip()
-        id_pwk = request.form.get('id_pwk', '').strip().upper()
+        id_pwk = normalize_trigram(request.form.get('id_pwk'))
         status = int(request.form.get('status', 1))
         keterangan = request.form.get('keterangan', '').strip() if status == 0 else ''
 
@@ -2184,6 +3069,7 @@ def edit_kepri(no):
             )
             
             if success:
+                invalidate_entity('kepri')
                 flash('Data KEPRI berhasil diperbarui', 'success')
                 # Redirect dengan menyertakan parameter sorting/pagination yang sama
                 return redirect(url_for('list_kepri', 
@@ -2211,6 +3097,7 @@ def delete_kepri(no):
         )
         
         if success:
+            invalidate_entity('kepri')
             flash('Data KEPRI berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data KEPRI', 'error')
@@ -2242,42 +3129,30 @@ def list_jabatan():
         'nama': 'nama',
         'singkatan': 'singkatan'
     }
-    sort_column = valid_columns.get(sort_column, 'no')
-    
-    # Validate sort direction
-    sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-    # Base query
-    query = f"""
-        SELECT no, nama, singkatan 
-        FROM tabel_jabatan
-        WHERE nama ILIKE %s OR 
-              singkatan ILIKE %s
-        ORDER BY {sort_column} {sort_direction}
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM tabel_jabatan
-        WHERE nama ILIKE %s OR 
-              singkatan ILIKE %s
-    """
-
-    search_param = f'%{search}%'
-    
-    # Get total count
-    total = execute_query(count_query, 
-                        (search_param, search_param), 
-                        fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
+    sort_column = valid_columns.get(sort_column, 'no')
     
-    # Execute query
-    jabatan_list = execute_query(paginated_query, 
-                               (search_param, search_param), 
-                               fetch=True) or []
+    # Validate sort direction
+    sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
+
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("nama ILIKE %s OR singkatan ILIKE %s")
+        params.extend([search_param] * 2)
+
+    # Fetch the page and the total in one round-trip
+    jabatan_list, total, total_estimated = fetch_list_page(
+        select="no, nama, singkatan",
+        from_clause="tabel_jabatan",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('jabatan', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -2287,6 +3162,7 @@ def list_jabatan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -2314,6 +3190,7 @@ def create_jabatan():
             )
             
             if success:
+                invalidate_entity('jabatan')
                 flash('Data jabatan berhasil ditambahkan', 'success')
                 return redirect(url_for('list_jabatan'))
             else:
@@ -2358,6 +3235,7 @@ def edit_jabatan(no):
             )
             
             if success:
+                invalidate_entity('jabatan')
                 flash('Data jabatan berhasil diperbarui', 'success')
                 return redirect(url_for('list_jabatan'))
             else:
@@ -2381,6 +3259,7 @@ def delete_jabatan(no):
         )
         
         if success:
+            invalidate_entity('jabatan')
             flash('Data jabatan berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data jabatan', 'error')
@@ -2413,370 +3292,68 @@ PANGKAT_GOLONGAN = [
 
 PENEMPATAN_OPTIONS = list(range(1, 8))  # 1-7
 
+PERSONEL_EXPORT = {
+    'title': 'LAPORAN DATA PERSONEL',
+    'sheet': 'Data Personel',
+    'filename': 'data_personel',
+    'list_endpoint': 'list_personel',
+    'pagesize': landscape(letter),
+    'query': """
+        SELECT p.no, p.nama, p.nip, p.pangkat_gol, p.tmt_pangkat,
+               p.id_jabatan, j.nama as nama_jabatan, p.tmt_jabatan,
+               p.penempatan, p.tmt_penempatan, p.id_pwk, r.nama_perwakilan
+        FROM tabel_personel p
+        LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
+        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram""",
+    'search': [
+        "p.nama ILIKE %s",
+        "p.nip ILIKE %s",
+        "p.pangkat_gol ILIKE %s",
+        "p.id_jabatan = ANY(ARRAY(SELECT no FROM tabel_jabatan WHERE nama ILIKE %s))",
+        "p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+    ],
+    'sort': {
+        'no': 'p.no',
+        'nama': 'p.nama',
+        'nip': 'p.nip',
+        'pangkat_gol': 'p.pangkat_gol',
+        'jabatan': 'j.nama',
+        'perwakilan': 'r.nama_perwakilan'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 11, 0.2, 60),
+        export_column("Nama", 1, 0.15, 60),
+        export_column("NIP", 2, 0.15, 60),
+        export_column("Pangkat/Gol", 3, 0.2, 80),
+        export_column("Jabatan", 6, 0.15, 60),
+        export_column("Penempatan Ke-", 8, 0.1, 40, align='CENTER'),
+    ],
+}
+
 @app.route('/personel/export/pdf')
 def export_personel_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'nama': 'p.nama',
-            'nip': 'p.nip',
-            'pangkat_gol': 'p.pangkat_gol',
-            'jabatan': 'j.nama',
-            'perwakilan': 'r.nama_perwakilan'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.nama, p.nip, p.pangkat_gol, p.tmt_pangkat, 
-                   p.id_jabatan, j.nama as nama_jabatan, p.tmt_jabatan,
-                   p.penempatan, p.tmt_penempatan, p.id_pwk, r.nama_perwakilan
-            FROM tabel_personel p
-            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            WHERE (p.nama ILIKE %s OR 
-                  p.nip ILIKE %s OR
-                  p.pangkat_gol ILIKE %s OR
-                  j.nama ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        personel_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with landscape orientation
-        buffer = BytesIO()
-        doc_width, doc_height = landscape(letter)
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=landscape(letter),
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PERSONEL", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Nama", 
-            "NIP", 
-            "Pangkat/Gol", 
-            "Jabatan", 
-            "Penempatan Ke-"
-        ]
-        data.append(headers)
-        
-        for idx, item in enumerate(personel_list, 1):
-            row = [
-                str(idx),
-                item[11] or '-',
-                item[1] or '-',
-                item[2] or '-',
-                item[3] or '-',
-                item[6] or '-',
-                str(item[8]) if item[8] is not None else '-'
-            ]
-            data.append(row)
-        
-        # Calculate available width (subtract margins)
-        available_width = doc_width - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution (adjust these ratios as needed)
-        col_ratios = [0.05, 0.2, 0.15, 0.15, 0.2, 0.15, 0.1]  # Sum should be 1.0
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [30, 60, 60, 60, 80, 60, 40]  # Minimum widths in points
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 8),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 8),
-            ('LEADING', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Nama left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # NIP left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # Pangkat/Gol left-aligned
-            ('ALIGN', (5,0), (5,-1), 'LEFT'),      # Jabatan left-aligned
-            ('ALIGN', (6,0), (6,-1), 'CENTER')     # Penempatan centered
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_personel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_personel'))
+    return export_response(PERSONEL_EXPORT, 'pdf')
 
 @app.route('/personel/export/excel')
 def export_personel_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'nama': 'p.nama',
-            'nip': 'p.nip',
-            'pangkat_gol': 'p.pangkat_gol',
-            'jabatan': 'j.nama',
-            'perwakilan': 'r.nama_perwakilan'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.nama, p.nip, p.pangkat_gol, p.tmt_pangkat, 
-                   p.id_jabatan, j.nama as nama_jabatan, p.tmt_jabatan,
-                   p.penempatan, p.tmt_penempatan, p.id_pwk, r.nama_perwakilan
-            FROM tabel_personel p
-            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            WHERE (p.nama ILIKE %s OR 
-                  p.nip ILIKE %s OR
-                  p.pangkat_gol ILIKE %s OR
-                  j.nama ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
+    return export_response(PERSONEL_EXPORT, 'xlsx')
 
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        personel_list = execute_query(query, params, fetch=True) or []
+@app.route('/personel/export/csv')
+def export_personel_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(PERSONEL_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Personel")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA PERSONEL', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Nama", 
-            "NIP", 
-            "Pangkat/Gol", 
-            "Jabatan", 
-            "Penempatan Ke-"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(personel_list, 1):
-            row = [
-                idx,
-                item[11] or '-',
-                item[1] or '-',
-                item[2] or '-',
-                item[3] or '-',
-                item[6] or '-',
-                item[8] or '-'
-            ]
-            
-            for col, value in enumerate(row):
-                worksheet.write(current_row, col, value, data_format)
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in personel_list:
-                if i == 0:  # No column
-                    val_length = len(str(row[0]))
-                elif i == 1:  # Perwakilan
-                    val_length = len(str(row[11] or ''))
-                elif i == 2:  # Nama
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # NIP
-                    val_length = len(str(row[2] or ''))
-                elif i == 4:  # Pangkat/Gol
-                    val_length = len(str(row[3] or ''))
-                elif i == 5:  # Jabatan
-                    val_length = len(str(row[6] or ''))
-                elif i == 6:  # Penempatan
-                    val_length = len(str(row[8] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_personel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_personel'))
+@app.route('/personel/export/parquet')
+def export_personel_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(PERSONEL_EXPORT)
 
 @app.route('/personel')
 def list_personel():
@@ -2789,49 +3366,38 @@ def list_personel():
         page = request.args.get('page', 1, type=int)
         per_page = 20
 
-        # Base query
-        query = """
-            SELECT p.no, p.nama, p.nip, p.pangkat_gol, p.tmt_pangkat, 
-                   p.id_jabatan, j.nama as nama_jabatan, p.tmt_jabatan,
-                   p.penempatan, p.tmt_penempatan, p.id_pwk,pwk.nama_perwakilan
-            FROM tabel_personel p
-            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-            LEFT JOIN ref_perwakilan pwk ON pwk.trigram = p.id_pwk
-        """
+        where = []
         params = []
 
         # Add search filter if exists
         if search:
-            query += """
-                WHERE (p.nama ILIKE %s OR 
-                      p.nip ILIKE %s OR
-                      p.pangkat_gol ILIKE %s OR
-                      j.nama ILIKE %s OR
-                      p.id_pwk ILIKE %s)
-            """
+            where.append("""p.nama ILIKE %s OR 
+                           p.nip ILIKE %s OR
+                           p.pangkat_gol ILIKE %s OR
+                           p.id_jabatan = ANY(ARRAY(SELECT no FROM tabel_jabatan WHERE nama ILIKE %s)) OR
+                           p.id_pwk ILIKE %s""")
             search_param = f'%{search}%'
             params.extend([search_param]*5)
 
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                if search:
-                    query += " AND UPPER(TRIM(p.id_pwk)) = UPPER(TRIM(%s))"
-                else:
-                    query += " WHERE UPPER(TRIM(p.id_pwk)) = UPPER(TRIM(%s))"
-                params.append(user_trigram.strip().upper())
-
-        # Count total records
-        count_query = "SELECT COUNT(*) FROM (" + query + ") AS subquery"
-        total = execute_query(count_query, params, fetch_one=True)[0] or 0
-
-        # Add pagination
-        query += " ORDER BY p.no LIMIT %s OFFSET %s"
-        params.extend([per_page, (page - 1) * per_page])
-        
-        # Execute query
-        personel_list = execute_query(query, params, fetch=True) or []
+        # Non-admin users only see their perwakilan's rows (row-level security)
+        # Fetch the page, seeking from the cursor when one is given
+        personel_list, total, total_estimated, next_cursor, prev_cursor = fetch_keyset_page(
+            select="""p.no, p.nama, p.nip, p.pangkat_gol, p.tmt_pangkat, 
+                      p.id_jabatan, j.nama as nama_jabatan, p.tmt_jabatan,
+                      p.penempatan, p.tmt_penempatan, p.id_pwk, pwk.nama_perwakilan""",
+            from_clause="""tabel_personel p
+                LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
+                LEFT JOIN ref_perwakilan pwk ON pwk.trigram = p.id_pwk""",
+            where=where,
+            params=params,
+            sort_expr="p.no",
+            key_expr="p.no",
+            page=page,
+            per_page=per_page,
+            count_scope=list_count_scope('personel', search),
+            after=request.args.get('after'),
+            before=request.args.get('before')
+        )
 
         total_pages = (total + per_page - 1) // per_page if total > 0 else 1
 
@@ -2841,7 +3407,10 @@ def list_personel():
                             page=page,
                             per_page=per_page,
                             total=total,
-                            total_pages=total_pages)
+                            total_estimated=total_estimated,
+                            total_pages=total_pages,
+                            next_cursor=next_cursor,
+                            prev_cursor=prev_cursor)
 
     except Exception as e:
         logger.error(f"Error in list_personel: {str(e)}")
@@ -2860,25 +3429,10 @@ def create_personel():
         return redirect(url_for('login'))
 
     # Get list of jabatan for dropdown
-    jabatan_list = execute_query(
-        "SELECT no, nama FROM tabel_jabatan ORDER BY nama",
-        fetch=True
-    ) or []
+    jabatan_list = get_reference('jabatan')
 
     # Get perwakilan list based on user role
-    # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        user_trigram = session.get('trigram')
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (user_trigram,),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -2901,7 +3455,7 @@ def create_personel():
                 form_data.get('telp', '').strip() or None,
                 form_data.get('email', '').strip() or None,
                 form_data.get('tmt_selesai_penempatan') or None,  # Date field
-                form_data.get('id_pwk', '').strip().upper() or None
+                normalize_trigram(form_data.get('id_pwk')) or None
             )
 
             # Validate required fields
@@ -2935,6 +3489,7 @@ def create_personel():
             """, data, commit=True)
             
             if success:
+                invalidate_entity('personel')
                 flash('Data personel berhasil ditambahkan', 'success')
                 return redirect(url_for('list_personel'))
             else:
@@ -2982,23 +3537,10 @@ def edit_personel(no):
             return redirect(url_for('list_personel'))
 
     # Get list of jabatan for dropdown
-    jabatan_list = execute_query(
-        "SELECT no, nama FROM tabel_jabatan ORDER BY nama",
-        fetch=True
-    ) or []
+    jabatan_list = get_reference('jabatan')
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -3021,7 +3563,7 @@ def edit_personel(no):
                 form_data.get('telp', '').strip() or None,
                 form_data.get('email', '').strip() or None,
                 form_data.get('tmt_selesai_penempatan') or None,  # Date field
-                form_data.get('id_pwk', '').strip().upper() or None,
+                normalize_trigram(form_data.get('id_pwk')) or None,
                 no
             )
 
@@ -3064,6 +3606,7 @@ def edit_personel(no):
             """, data, commit=True)
             
             if success:
+                invalidate_entity('personel')
                 flash('Data personel berhasil diperbarui', 'success')
                 return redirect(url_for('list_personel'))
             else:
@@ -3095,6 +3638,7 @@ def delete_personel(no):
         )
         
         if success:
+            invalidate_entity('personel')
             flash('Data personel berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data personel', 'error')
@@ -3108,406 +3652,68 @@ def delete_personel(no):
 # PEGAWAI SETEMPAT CRUD ROUTES
 # ==============================================
 
+PEGAWAI_SETEMPAT_EXPORT = {
+    'title': 'LAPORAN DATA PEGAWAI SETEMPAT',
+    'sheet': 'Data Pegawai Setempat',
+    'filename': 'data_pegawai_setempat',
+    'list_endpoint': 'list_pegawai_setempat',
+    'query': """
+        SELECT p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email,
+               p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan
+        FROM tabel_pegawai_setempat p
+        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram""",
+    'search': [
+        "p.nama ILIKE %s",
+        "p.nik ILIKE %s",
+        "p.telp ILIKE %s",
+        "p.email ILIKE %s",
+        "p.id_pwk ILIKE %s",
+        "p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+    ],
+    'sort': {
+        'no': 'p.no',
+        'nama': 'p.nama',
+        'nik': 'p.nik',
+        'tmt_penempatan': 'p.tmt_penempatan',
+        'perwakilan': 'p.id_pwk'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 10, 0.15, 50, admin_only=True),
+        export_column("Nama", 1, 0.2, 60),
+        export_column("Tempat/Tgl Lahir",
+                      lambda row: f"{row[2] or '-'}, {row[3].strftime('%d-%m-%Y') if row[3] else '-'}",
+                      0.15, 60),
+        export_column("NIK", 4, 0.2, 80),
+        export_column("Telp/Email", lambda row: f"{row[5] or '-'} / {row[6] or '-'}", 0.25, 80),
+        export_column("TMT Penempatan", 7, 0.1, 50, align='CENTER', kind='date', only='xlsx'),
+        export_column("TMT Selesai", 8, 0.1, 50, align='CENTER', kind='date', only='xlsx'),
+    ],
+}
+
 @app.route('/pegawai-setempat/export/pdf')
 def export_pegawai_setempat_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'nama': 'p.nama',
-            'nik': 'p.nik',
-            'tmt_penempatan': 'p.tmt_penempatan',
-            'perwakilan': 'p.id_pwk'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email, 
-                   p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan
-            FROM tabel_pegawai_setempat p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            WHERE (p.nama ILIKE %s OR 
-                  p.nik ILIKE %s OR
-                  p.telp ILIKE %s OR
-                  p.email ILIKE %s OR
-                  p.id_pwk ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(6)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        pegawai_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PEGAWAI SETEMPAT", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan" if session.get('role') == 0 else None,  # Only show for admin
-            "Nama", 
-            "Tempat/Tgl Lahir", 
-            "NIK", 
-            "Telp/Email",
-        ]
-        # Filter out None values (for non-admin users)
-        headers = [h for h in headers if h is not None]
-        data.append(headers)
-        
-        for idx, item in enumerate(pegawai_list, 1):
-            tempat_tgl_lahir = f"{item[2] if item[2] else '-'}, {item[3].strftime('%d-%m-%Y') if item[3] else '-'}"
-            telp_email = f"{item[5] if item[5] else '-'} / {item[6] if item[6] else '-'}"
-            
-            row = [
-                str(idx),
-                item[10] or '-' if session.get('role') == 0 else None,  # Perwakilan (only for admin)
-                item[1] or '-',   # Nama
-                tempat_tgl_lahir,
-                item[4] or '-',   # NIK
-                telp_email,
-            ]
-            # Filter out None values (for non-admin users)
-            row = [r for r in row if r is not None]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution - adjusted for A4 portrait
-        if session.get('role') == 0:  # Admin
-            col_ratios = [0.05, 0.15, 0.2, 0.15, 0.2, 0.25]
-        else:  # Non-admin
-            col_ratios = [0.05, 0.2, 0.15, 0.25, 0.35]
-        
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        if session.get('role') == 0:  # Admin
-            min_widths = [25, 50, 60, 60, 80, 80]
-        else:  # Non-admin
-            min_widths = [25, 60, 60, 90, 100]
-            
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),  # Reduced font size
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),  # Reduced padding
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),  # Reduced font size
-            ('LEADING', (0,0), (-1,-1), 8),   # Reduced leading
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Nama left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Tempat/Tgl Lahir left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # NIK left-aligned
-            ('ALIGN', (5,0), (5,-1), 'LEFT'),      # Telp/Email left-aligned
-            ('ALIGN', (-2,0), (-2,-1), 'CENTER'),  # TMT Penempatan centered
-            ('ALIGN', (-1,0), (-1,-1), 'CENTER')   # TMT Selesai centered
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_pegawai_setempat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_pegawai_setempat'))
+    return export_response(PEGAWAI_SETEMPAT_EXPORT, 'pdf')
 
 @app.route('/pegawai-setempat/export/excel')
 def export_pegawai_setempat_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'nama': 'p.nama',
-            'nik': 'p.nik',
-            'tmt_penempatan': 'p.tmt_penempatan',
-            'perwakilan': 'p.id_pwk'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email, 
-                   p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan
-            FROM tabel_pegawai_setempat p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            WHERE (p.nama ILIKE %s OR 
-                  p.nik ILIKE %s OR
-                  p.telp ILIKE %s OR
-                  p.email ILIKE %s OR
-                  p.id_pwk ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(6)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
+    return export_response(PEGAWAI_SETEMPAT_EXPORT, 'xlsx')
 
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        pegawai_list = execute_query(query, params, fetch=True) or []
+@app.route('/pegawai-setempat/export/csv')
+def export_pegawai_setempat_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(PEGAWAI_SETEMPAT_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Pegawai Setempat")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        date_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'num_format': 'dd-mm-yyyy'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:H1', 'LAPORAN DATA PEGAWAI SETEMPAT', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Nama", 
-            "Tempat/Tgl Lahir", 
-            "NIK", 
-            "Telp/Email",
-            "TMT Penempatan",
-            "TMT Selesai"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(pegawai_list, 1):
-            tempat_tgl_lahir = f"{item[2] if item[2] else '-'}, {item[3].strftime('%d-%m-%Y') if item[3] else '-'}"
-            telp_email = f"{item[5] if item[5] else '-'} / {item[6] if item[6] else '-'}"
-            
-            row = [
-                idx,
-                item[10] or '-',  # Perwakilan
-                item[1] or '-',   # Nama
-                tempat_tgl_lahir,
-                item[4] or '-',   # NIK
-                telp_email,
-                item[7],  # TMT Penempatan (date object)
-                item[8]   # TMT Selesai (date object)
-            ]
-            
-            for col, value in enumerate(row):
-                if col in [6, 7]:  # Date columns
-                    if value:  # Only write if date exists
-                        worksheet.write_datetime(current_row, col, value, date_format)
-                    else:
-                        worksheet.write(current_row, col, '-', data_format)
-                else:
-                    worksheet.write(current_row, col, value, data_format)
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in pegawai_list:
-                if i == 0:  # No column
-                    val_length = len(str(row[0]))
-                elif i == 1:  # Perwakilan
-                    val_length = len(str(row[10] or ''))
-                elif i == 2:  # Nama
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # Tempat/Tgl Lahir
-                    tempat = str(row[2] or '')
-                    tgl = row[3].strftime('%d-%m-%Y') if row[3] else ''
-                    val_length = len(f"{tempat}, {tgl}")
-                elif i == 4:  # NIK
-                    val_length = len(str(row[4] or ''))
-                elif i == 5:  # Telp/Email
-                    telp = str(row[5] or '')
-                    email = str(row[6] or '')
-                    val_length = len(f"{telp} / {email}")
-                elif i == 6:  # TMT Penempatan
-                    val_length = 10  # Fixed length for date format
-                elif i == 7:  # TMT Selesai
-                    val_length = 10  # Fixed length for date format
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        # Freeze header row
-        worksheet.freeze_panes(1, 0)
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_pegawai_setempat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_pegawai_setempat'))
+@app.route('/pegawai-setempat/export/parquet')
+def export_pegawai_setempat_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(PEGAWAI_SETEMPAT_EXPORT)
 
 @app.route('/pegawai-setempat')
 def list_pegawai_setempat():
@@ -3518,7 +3724,7 @@ def list_pegawai_setempat():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'no')
+    sort_by = request.args.get('sort', 'no')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -3529,55 +3735,39 @@ def list_pegawai_setempat():
         'tmt_penempatan': 'p.tmt_penempatan',
         'perwakilan': 'p.id_pwk'
     }
-    sort_column = valid_columns.get(sort_column, 'p.no')
+    if sort_by not in valid_columns:
+        sort_by = 'no'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query
-    query = """
-        SELECT p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email, 
-               p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan
-        FROM tabel_pegawai_setempat p
-        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-        WHERE (p.nama ILIKE %s OR 
-              p.nik ILIKE %s OR
-              p.telp ILIKE %s OR
-              p.email ILIKE %s OR
-              p.id_pwk ILIKE %s OR
-              r.nama_perwakilan ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(6)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND p.id_pwk = %s"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email, " +
-        "p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count - handle None result safely
-    count_result = execute_query(count_query, params, fetch_one=True)
-    total = count_result[0] if count_result else 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    pegawai_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""p.nama ILIKE %s OR 
+                   p.nik ILIKE %s OR
+                   p.telp ILIKE %s OR
+                   p.email ILIKE %s OR
+                   p.id_pwk ILIKE %s OR
+                   p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))""")
+        params.extend([search_param] * 6)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page and the total in one round-trip
+    pegawai_list, total, total_estimated = fetch_list_page(
+        select="""p.no, p.nama, p.t_lahir, p.tgl_lahir, p.nik, p.telp, p.email, 
+                  p.tmt_penempatan, p.tmt_selesai_penempatan, p.id_pwk, r.nama_perwakilan""",
+        from_clause="tabel_pegawai_setempat p LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('pegawai_setempat', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -3587,8 +3777,9 @@ def list_pegawai_setempat():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('p.', ''),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/pegawai-setempat/create', methods=['GET', 'POST'])
@@ -3597,18 +3788,7 @@ def create_pegawai_setempat():
         return redirect(url_for('login'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        user_trigram = session.get('trigram')
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (user_trigram,),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -3621,7 +3801,7 @@ def create_pegawai_setempat():
                 request.form.get('email', '').strip(),
                 request.form.get('tmt_penempatan'),
                 request.form.get('tmt_selesai_penempatan'),
-                request.form.get('id_pwk', '').strip().upper()
+                normalize_trigram(request.form.get('id_pwk'))
             )
 
             # Validate required fields
@@ -3653,6 +3833,7 @@ def create_pegawai_setempat():
             """, tuple(data), commit=True)
             
             if success:
+                invalidate_entity('pegawai_setempat')
                 flash('Data pegawai setempat berhasil ditambahkan', 'success')
                 return redirect(url_for('list_pegawai_setempat'))
             else:
@@ -3692,17 +3873,7 @@ def edit_pegawai_setempat(no):
             return redirect(url_for('list_pegawai_setempat'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -3715,7 +3886,7 @@ def edit_pegawai_setempat(no):
                 request.form.get('email', '').strip(),
                 request.form.get('tmt_penempatan'),
                 request.form.get('tmt_selesai_penempatan'),
-                request.form.get('id_pwk', '').strip().upper(),
+                normalize_trigram(request.form.get('id_pwk')),
                 no
             )
 
@@ -3757,6 +3928,7 @@ def edit_pegawai_setempat(no):
             """, tuple(data), commit=True)
             
             if success:
+                invalidate_entity('pegawai_setempat')
                 flash('Data pegawai setempat berhasil diperbarui', 'success')
                 return redirect(url_for('list_pegawai_setempat'))
             else:
@@ -3793,6 +3965,7 @@ def delete_pegawai_setempat(no):
         )
         
         if success:
+            invalidate_entity('pegawai_setempat')
             flash('Data pegawai setempat berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data pegawai setempat', 'error')
@@ -3827,32 +4000,26 @@ def list_jenis_pendidikan():
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-    # Base query
-    query = f"""
-        SELECT no, jenis_pend
-        FROM tabel_jenis_pendidikan
-        WHERE jenis_pend ILIKE %s
-        ORDER BY {sort_column} {sort_direction}
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM tabel_jenis_pendidikan
-        WHERE jenis_pend ILIKE %s
-    """
-
-    search_param = f'%{search}%'
-    
-    # Get total count
-    total = execute_query(count_query, (search_param,), fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    jenis_pendidikan_list = execute_query(paginated_query, (search_param,), fetch=True) or []
+
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("jenis_pend ILIKE %s")
+        params.append(search_param)
+
+    # Fetch the page and the total in one round-trip
+    jenis_pendidikan_list, total, total_estimated = fetch_list_page(
+        select="no, jenis_pend",
+        from_clause="tabel_jenis_pendidikan",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('jenis_pendidikan', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -3862,6 +4029,7 @@ def list_jenis_pendidikan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -3898,6 +4066,7 @@ def create_jenis_pendidikan():
             """, (next_no, jenis_pend), commit=True)
             
             if success:
+                invalidate_entity('jenis_pendidikan')
                 flash('Data jenis pendidikan berhasil ditambahkan', 'success')
                 return redirect(url_for('list_jenis_pendidikan'))
             else:
@@ -3944,6 +4113,7 @@ def edit_jenis_pendidikan(no):
             """, (jenis_pend, no), commit=True)
             
             if success:
+                invalidate_entity('jenis_pendidikan')
                 flash('Data jenis pendidikan berhasil diperbarui', 'success')
                 return redirect(url_for('list_jenis_pendidikan'))
             else:
@@ -3969,6 +4139,7 @@ def delete_jenis_pendidikan(no):
         )
         
         if success:
+            invalidate_entity('jenis_pendidikan')
             flash('Data jenis pendidikan berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data jenis pendidikan', 'error')
@@ -3982,433 +4153,74 @@ def delete_jenis_pendidikan(no):
 # PENDIDIKAN CRUD ROUTES
 # ==============================================
 
+PENDIDIKAN_EXPORT = {
+    'title': 'LAPORAN DATA PENDIDIKAN',
+    'sheet': 'Data Pendidikan',
+    'filename': 'data_pendidikan',
+    'list_endpoint': 'list_pendidikan',
+    'pagesize': landscape(letter),
+    'query': """
+        SELECT p.no, p.tahun, p.nama_pend,
+               per.no as id_personel, per.nama as nama_personel,
+               j.nama as nama_jabatan,
+               jp.jenis_pend,
+               r.nama_perwakilan as pwk
+        FROM tabel_pendidikan p
+        LEFT JOIN tabel_personel per ON p.id_personel = per.no
+        LEFT JOIN ref_perwakilan r ON per.id_pwk = r.TRIGRAM
+        LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
+        LEFT JOIN tabel_jenis_pendidikan jp ON p.id_jenis_pendidikan = jp.no""",
+    'search': [
+        "p.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s))",
+        "p.id_jabatan = ANY(ARRAY(SELECT no FROM tabel_jabatan WHERE nama ILIKE %s))",
+        "p.id_jenis_pendidikan = ANY(ARRAY(SELECT no FROM tabel_jenis_pendidikan WHERE jenis_pend ILIKE %s))",
+        "p.tahun::text ILIKE %s",
+        "p.nama_pend ILIKE %s",
+    ],
+    'sort': {
+        'no': 'p.no',
+        'personel': 'per.nama',
+        'jabatan': 'j.nama',
+        'jenis': 'jp.jenis_pend',
+        'tahun': 'p.tahun',
+        'nama_pend': 'p.nama_pend'
+    },
+    'default_sort': 'no',
+    # One block per personel: perwakilan, personel and jabatan are shown once
+    'group': {'key': 'p.id_personel', 'index': 3, 'columns': 3},
+    'columns': [
+        export_column("Perwakilan", 7, 0.15, 60),
+        export_column("Personel", 4, 0.15, 80),
+        export_column("Jabatan", 5, 0.15, 60),
+        export_column("Jenis Pendidikan", 6, 0.15, 60),
+        export_column("Tahun", 1, 0.1, 40, align='CENTER'),
+        export_column("Nama Pendidikan", 2, 0.25, 80),
+    ],
+}
+
 @app.route('/pendidikan/export/pdf')
 def export_pendidikan_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'personel': 'per.nama',
-            'jabatan': 'j.nama',
-            'jenis': 'jp.jenis_pend',
-            'tahun': 'p.tahun',
-            'nama_pend': 'p.nama_pend'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.tahun, p.nama_pend,
-                   per.no as id_personel, per.nama as nama_personel,
-                   j.nama as nama_jabatan,
-                   jp.jenis_pend,
-                   r.nama_perwakilan as pwk
-            FROM tabel_pendidikan p
-            LEFT JOIN tabel_personel per ON p.id_personel = per.no
-            LEFT JOIN ref_perwakilan r ON per.id_pwk = r.TRIGRAM
-            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-            LEFT JOIN tabel_jenis_pendidikan jp ON p.id_jenis_pendidikan = jp.no
-            WHERE (per.nama ILIKE %s OR 
-                  j.nama ILIKE %s OR
-                  jp.jenis_pend ILIKE %s OR
-                  p.tahun::text ILIKE %s OR
-                  p.nama_pend ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND per.id_pwk = %s"
-                params.append(user_trigram.strip().upper())
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        pendidikan_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with landscape orientation
-        buffer = BytesIO()
-        doc_width, doc_height = landscape(letter)
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=landscape(letter),
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PENDIDIKAN", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Personel", 
-            "Jabatan", 
-            "Jenis Pendidikan", 
-            "Tahun", 
-            "Nama Pendidikan"
-        ]
-        data.append(headers)
-        
-        # Group data by personel
-        grouped_data = {}
-        for item in pendidikan_list:
-            personel_id = item[3]  # id_personel
-            if personel_id not in grouped_data:
-                grouped_data[personel_id] = {
-                    'pwk': item[7],        # nama_perwakilan
-                    'personel': item[4],   # nama_personel
-                    'jabatan': item[5],    # nama_jabatan
-                    'pendidikan': []
-                }
-            grouped_data[personel_id]['pendidikan'].append(item)
-        
-        # Add rows to table
-        row_num = 1
-        for personel_id, personel_data in grouped_data.items():
-            first_row = True
-            for pendidikan in personel_data['pendidikan']:
-                row = [
-                    str(row_num) if first_row else '',
-                    personel_data['pwk'] if first_row else '',
-                    personel_data['personel'] if first_row else '',
-                    personel_data['jabatan'] if first_row else '',
-                    pendidikan[6],  # jenis_pend
-                    str(pendidikan[1]),  # tahun
-                    pendidikan[2]   # nama_pend
-                ]
-                data.append(row)
-                if first_row:
-                    first_row = False
-                    row_num += 1
-        
-        # Calculate available width (subtract margins)
-        available_width = doc_width - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution
-        col_ratios = [0.05, 0.15, 0.15, 0.15, 0.15, 0.1, 0.25]  # Sum should be 1.0
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [30, 60, 80, 60, 60, 40, 80]  # Minimum widths in points
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 8),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 8),
-            ('LEADING', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Personel left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Jabatan left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # Jenis Pendidikan left-aligned
-            ('ALIGN', (5,0), (5,-1), 'CENTER'),    # Tahun centered
-            ('ALIGN', (6,0), (6,-1), 'LEFT')       # Nama Pendidikan left-aligned
-        ])
-        
-        # Add span for grouped rows
-        row_idx = 1  # Start after header
-        for personel_id, personel_data in grouped_data.items():
-            span_count = len(personel_data['pendidikan'])
-            if span_count > 1:
-                # Span No, Perwakilan, Personel, and Jabatan columns
-                for col in [0, 1, 2, 3]:
-                    style.add('SPAN', (col, row_idx), (col, row_idx + span_count - 1))
-            row_idx += span_count
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_pendidikan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_pendidikan'))
+    return export_response(PENDIDIKAN_EXPORT, 'pdf')
 
 @app.route('/pendidikan/export/excel')
 def export_pendidikan_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'p.no',
-            'personel': 'per.nama',
-            'jabatan': 'j.nama',
-            'jenis': 'jp.jenis_pend',
-            'tahun': 'p.tahun',
-            'nama_pend': 'p.nama_pend'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.no, p.tahun, p.nama_pend,
-                   per.no as id_personel, per.nama as nama_personel,
-                   j.nama as nama_jabatan,
-                   jp.jenis_pend,
-                   r.nama_perwakilan as pwk
-            FROM tabel_pendidikan p
-            LEFT JOIN tabel_personel per ON p.id_personel = per.no
-            LEFT JOIN ref_perwakilan r ON per.id_pwk = r.TRIGRAM
-            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-            LEFT JOIN tabel_jenis_pendidikan jp ON p.id_jenis_pendidikan = jp.no
-            WHERE (per.nama ILIKE %s OR 
-                  j.nama ILIKE %s OR
-                  jp.jenis_pend ILIKE %s OR
-                  p.tahun::text ILIKE %s OR
-                  p.nama_pend ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
+    return export_response(PENDIDIKAN_EXPORT, 'xlsx')
 
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND per.id_pwk = %s"
-                params.append(user_trigram.strip().upper())
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        pendidikan_list = execute_query(query, params, fetch=True) or []
+@app.route('/pendidikan/export/csv')
+def export_pendidikan_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(PENDIDIKAN_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Pendidikan")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'align': 'center'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA PENDIDIKAN', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Personel", 
-            "Jabatan", 
-            "Jenis Pendidikan", 
-            "Tahun", 
-            "Nama Pendidikan"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Group data by personel
-        grouped_data = {}
-        for item in pendidikan_list:
-            personel_id = item[3]  # id_personel
-            if personel_id not in grouped_data:
-                grouped_data[personel_id] = {
-                    'pwk': item[7],        # nama_perwakilan
-                    'personel': item[4],   # nama_personel
-                    'jabatan': item[5],    # nama_jabatan
-                    'pendidikan': []
-                }
-            grouped_data[personel_id]['pendidikan'].append(item)
-        
-        # Write data
-        row_num = 1
-        for personel_id, personel_data in grouped_data.items():
-            first_row = True
-            for pendidikan in personel_data['pendidikan']:
-                # Apply different formats based on column
-                worksheet.write(current_row, 0, row_num if first_row else '', center_format)  # No
-                worksheet.write(current_row, 1, personel_data['pwk'] if first_row else '', data_format)  # Perwakilan
-                worksheet.write(current_row, 2, personel_data['personel'] if first_row else '', data_format)  # Personel
-                worksheet.write(current_row, 3, personel_data['jabatan'] if first_row else '', data_format)  # Jabatan
-                worksheet.write(current_row, 4, pendidikan[6], data_format)  # Jenis Pendidikan
-                worksheet.write(current_row, 5, str(pendidikan[1]), center_format)  # Tahun - centered
-                worksheet.write(current_row, 6, pendidikan[2], data_format)  # Nama Pendidikan
-                
-                if first_row:
-                    first_row = False
-                    row_num += 1
-                current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [10, 20, 25, 20, 20, 10, 30]  # Initial widths
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for personel_id, personel_data in grouped_data.items():
-                if i == 0:  # No
-                    val_length = len(str(row_num))
-                elif i == 1:  # Perwakilan
-                    val_length = len(personel_data['pwk'])
-                elif i == 2:  # Personel
-                    val_length = len(personel_data['personel'])
-                elif i == 3:  # Jabatan
-                    val_length = len(personel_data['jabatan'] or '')
-                elif i == 4:  # Jenis Pendidikan
-                    max_pend = max(len(p[6]) for p in personel_data['pendidikan'])
-                    val_length = max_pend if 'max_pend' in locals() else 0
-                elif i == 5:  # Tahun
-                    val_length = 4  # Year length
-                elif i == 6:  # Nama Pendidikan
-                    max_nama = max(len(p[2]) for p in personel_data['pendidikan'])
-                    val_length = max_nama if 'max_nama' in locals() else 0
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_pendidikan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_pendidikan'))
+@app.route('/pendidikan/export/parquet')
+def export_pendidikan_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(PENDIDIKAN_EXPORT)
 
 @app.route('/pendidikan')
 def list_pendidikan():
@@ -4419,7 +4231,7 @@ def list_pendidikan():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'no')
+    sort_by = request.args.get('sort', 'no')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -4431,60 +4243,50 @@ def list_pendidikan():
         'tahun': 'p.tahun',
         'nama_pend': 'p.nama_pend'
     }
-    sort_column = valid_columns.get(sort_column, 'p.no')
+    if sort_by not in valid_columns:
+        sort_by = 'no'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = f"""
-        SELECT p.no, p.tahun, p.nama_pend,
-               per.no as id_personel, per.nama as nama_personel,
-               j.no as id_jabatan, j.nama as nama_jabatan,
-               jp.no as id_jenis_pendidikan, jp.jenis_pend,
-               per.id_pwk as id_pwk, 
-			   r.nama_perwakilan as pwk
-        FROM tabel_pendidikan p
-        LEFT JOIN tabel_personel per ON p.id_personel = per.no
-        LEFT JOIN ref_perwakilan r ON id_pwk = r.TRIGRAM
-        LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
-        LEFT JOIN tabel_jenis_pendidikan jp ON p.id_jenis_pendidikan = jp.no
-        WHERE (per.nama ILIKE %s OR 
-              j.nama ILIKE %s OR
-              jp.jenis_pend ILIKE %s OR
-              p.tahun::text ILIKE %s OR
-              p.nama_pend ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND per.id_pwk = %s"
-            params.append(user_trigram.strip().upper())
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT p.no, p.tahun, p.nama_pend, per.no as id_personel, per.nama as nama_personel, j.no as id_jabatan, j.nama as nama_jabatan, jp.no as id_jenis_pendidikan, jp.jenis_pend",
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count
-    total_result = execute_query(count_query, params, fetch_one=True)
-    total = total_result[0] if total_result else 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    pendidikan_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""p.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s)) OR 
+                   p.id_jabatan = ANY(ARRAY(SELECT no FROM tabel_jabatan WHERE nama ILIKE %s)) OR
+                   p.id_jenis_pendidikan = ANY(ARRAY(SELECT no FROM tabel_jenis_pendidikan WHERE jenis_pend ILIKE %s)) OR
+                   p.tahun::text ILIKE %s OR
+                   p.nama_pend ILIKE %s""")
+        params.extend([search_param] * 5)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page, seeking from the cursor when one is given
+    pendidikan_list, total, total_estimated, next_cursor, prev_cursor = fetch_keyset_page(
+        select="""p.no, p.tahun, p.nama_pend,
+                  per.no as id_personel, per.nama as nama_personel,
+                  j.no as id_jabatan, j.nama as nama_jabatan,
+                  jp.no as id_jenis_pendidikan, jp.jenis_pend,
+                  per.id_pwk as id_pwk, 
+                  r.nama_perwakilan as pwk""",
+        from_clause="""tabel_pendidikan p
+            LEFT JOIN tabel_personel per ON p.id_personel = per.no
+            LEFT JOIN ref_perwakilan r ON per.id_pwk = r.TRIGRAM
+            LEFT JOIN tabel_jabatan j ON p.id_jabatan = j.no
+            LEFT JOIN tabel_jenis_pendidikan jp ON p.id_jenis_pendidikan = jp.no""",
+        where=where,
+        params=params,
+        sort_expr=sort_column,
+        key_expr="p.no",
+        direction=sort_direction,
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('pendidikan', search),
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     total_pages = max(1, (total + per_page - 1) // per_page)
     
@@ -4494,8 +4296,11 @@ def list_pendidikan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('p.', ''),
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/pendidikan/create', methods=['GET', 'POST'])
@@ -4503,25 +4308,12 @@ def create_pendidikan():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    # Get dropdown data - MODIFIED to filter by perwakilan
-    personel_query = "SELECT no, nama FROM tabel_personel"
-    jabatan_query = "SELECT no, nama FROM tabel_jabatan ORDER BY nama"
-    jenis_pend_query = "SELECT no, jenis_pend FROM tabel_jenis_pendidikan ORDER BY jenis_pend"
-    
-    params = []
-    
-    # Filter personel by perwakilan for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            personel_query += " WHERE UPPER(TRIM(id_pwk)) = UPPER(TRIM(%s))"
-            params.append(user_trigram.strip().upper())
-
-    personel_query += " ORDER BY nama"
+    # Get dropdown data (row-level security limits personel to the user's perwakilan)
+    personel_query = "SELECT no, nama FROM tabel_personel ORDER BY nama"
     
-    personel_list = execute_query(personel_query, params, fetch=True) or []
-    jabatan_list = execute_query(jabatan_query, fetch=True) or []
-    jenis_pend_list = execute_query(jenis_pend_query, fetch=True) or []
+    personel_list = execute_query(personel_query, fetch=True) or []
+    jabatan_list = get_reference('jabatan')
+    jenis_pend_list = get_reference('jenis_pendidikan')
 
     if request.method == 'POST':
         try:
@@ -4571,26 +4363,27 @@ def create_pendidikan():
                                     jenis_pend_list=jenis_pend_list,
                                     form_data=request.form)
 
-            # Process all valid entries
-            success_count = 0
+            # Collect all valid entries
+            rows = []
             for i in range(len(jenis_pendidikan_list)):
                 if not all([jenis_pendidikan_list[i], tahun_list[i], nama_pendidikan_list[i]]):
                     continue
 
                 id_jabatan = int(jabatan_list_form[i]) if jabatan_list_form[i] else None
 
-                success = execute_query("""
+                rows.append((int(id_personel), id_jabatan, int(jenis_pendidikan_list[i]), 
+                             tahun_list[i], nama_pendidikan_list[i]))
+
+            # Insert them in a single statement
+            with transaction():
+                success_count = execute_bulk("""
                     INSERT INTO tabel_pendidikan 
                     (id_personel, id_jabatan, id_jenis_pendidikan, tahun, nama_pend)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (int(id_personel), id_jabatan, int(jenis_pendidikan_list[i]), 
-                    tahun_list[i], nama_pendidikan_list[i]), 
-                    commit=True)
-                
-                if success:
-                    success_count += 1
+                    VALUES %s
+                """, rows, commit=True)
 
             if success_count > 0:
+                invalidate_entity('pendidikan')
                 flash(f'Berhasil menambahkan {success_count} data pendidikan', 'success')
                 return redirect(url_for('list_pendidikan'))
             else:
@@ -4622,25 +4415,12 @@ def edit_pendidikan(personel_id):
                 flash('Anda tidak memiliki akses untuk mengedit data ini', 'error')
                 return redirect(url_for('list_pendidikan'))
 
-    # Get dropdown data - MODIFIED to filter by perwakilan
-    personel_query = "SELECT no, nama FROM tabel_personel"
-    jabatan_query = "SELECT no, nama FROM tabel_jabatan ORDER BY nama"
-    jenis_pend_query = "SELECT no, jenis_pend FROM tabel_jenis_pendidikan ORDER BY jenis_pend"
-    
-    params = []
-    
-    # Filter personel by perwakilan for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            personel_query += " WHERE UPPER(TRIM(id_pwk)) = UPPER(TRIM(%s))"
-            params.append(user_trigram.strip().upper())
-
-    personel_query += " ORDER BY nama"
+    # Get dropdown data (row-level security limits personel to the user's perwakilan)
+    personel_query = "SELECT no, nama FROM tabel_personel ORDER BY nama"
     
-    personel_list = execute_query(personel_query, params, fetch=True) or []
-    jabatan_list = execute_query(jabatan_query, fetch=True) or []
-    jenis_pend_list = execute_query(jenis_pend_query, fetch=True) or []
+    personel_list = execute_query(personel_query, fetch=True) or []
+    jabatan_list = get_reference('jabatan')
+    jenis_pend_list = get_reference('jenis_pendidikan')
 
 
     # Get all pendidikan entries for this personel
@@ -4664,89 +4444,109 @@ def edit_pendidikan(personel_id):
         flash('Data pendidikan tidak ditemukan', 'error')
         return redirect(url_for('list_pendidikan'))
 
+    def parse_numbers(data, label):
+        """(id_jabatan, id_jenis_pendidikan, tahun) of a form row, or None after flashing"""
+        try:
+            id_jabatan = int(data['id_jabatan']) if data['id_jabatan'] else None
+            return id_jabatan, int(data['id_jenis_pendidikan']), int(data['tahun'])
+        except (TypeError, ValueError):
+            flash(f'Data {label} tidak valid: tahun, jenis dan jabatan harus berupa angka', 'error')
+            return None
+
     if request.method == 'POST':
         try:
-            # Process updates and deletions
-            updated = 0
-            deleted = 0
-            
-            # Get all existing IDs for this personel
-            existing_ids = [str(p[0]) for p in pendidikan_list]
-            
-            # Process updates for existing entries
+            # Diff the submitted form against the rows loaded above
+            update_rows = []
+            delete_ids = []
+
             for pendidikan in pendidikan_list:
                 pid = str(pendidikan[0])
-                if f"pendidikan_{pid}_update" in request.form:
-                    data = {
-                        'id_jabatan': request.form.get(f"pendidikan_{pid}_jabatan"),
-                        'id_jenis_pendidikan': request.form.get(f"pendidikan_{pid}_jenis"),
-                        'tahun': request.form.get(f"pendidikan_{pid}_tahun"),
-                        'nama_pend': request.form.get(f"pendidikan_{pid}_nama"),
-                        'no': pid
-                    }
+                if f"pendidikan_{pid}_delete" in request.form:
+                    delete_ids.append(pendidikan[0])
+                    continue
 
-                    # Validate required fields
-                    if not all([data['id_jenis_pendidikan'], data['tahun'], data['nama_pend']]):
-                        flash(f'Data tahun {data["tahun"]} tidak lengkap', 'error')
-                        continue
+                if f"pendidikan_{pid}_tahun" not in request.form:
+                    continue
 
-                    # Convert empty jabatan to None
-                    id_jabatan = int(data['id_jabatan']) if data['id_jabatan'] else None
-
-                    success = execute_query("""
-                        UPDATE tabel_pendidikan SET
-                            id_jabatan = %s,
-                            id_jenis_pendidikan = %s,
-                            tahun = %s,
-                            nama_pend = %s
-                        WHERE no = %s
-                    """, (id_jabatan, int(data['id_jenis_pendidikan']), 
-                         data['tahun'], data['nama_pend'], pid),
-                        commit=True)
-                    
-                    if success:
-                        updated += 1
-
-            # Process deletions
-            for pid in existing_ids:
-                if f"pendidikan_{pid}_delete" in request.form:
-                    success = execute_query(
-                        "DELETE FROM tabel_pendidikan WHERE no = %s",
-                        (pid,),
-                        commit=True
-                    )
-                    if success:
-                        deleted += 1
+                data = {
+                    'id_jabatan': request.form.get(f"pendidikan_{pid}_jabatan", ''),
+                    'id_jenis_pendidikan': request.form.get(f"pendidikan_{pid}_jenis", ''),
+                    'tahun': request.form.get(f"pendidikan_{pid}_tahun", '').strip(),
+                    'nama_pend': request.form.get(f"pendidikan_{pid}_nama", '').strip()
+                }
+
+                # Skip rows the user did not touch
+                current = {
+                    'id_jabatan': str(pendidikan[2]) if pendidikan[2] is not None else '',
+                    'id_jenis_pendidikan': str(pendidikan[3]) if pendidikan[3] is not None else '',
+                    'tahun': str(pendidikan[4]) if pendidikan[4] is not None else '',
+                    'nama_pend': pendidikan[5] or ''
+                }
+                if data == current:
+                    continue
+
+                # Validate required fields
+                if not all([data['id_jenis_pendidikan'], data['tahun'], data['nama_pend']]):
+                    flash(f'Data tahun {data["tahun"]} tidak lengkap', 'error')
+                    continue
+
+                numbers = parse_numbers(data, f'tahun {data["tahun"]}')
+                if numbers is None:
+                    continue
+
+                update_rows.append((pendidikan[0], *numbers, data['nama_pend']))
 
-            # Process new entries
+            # Collect new entries
             new_entries = int(request.form.get('new_entry_count', 0))
-            added = 0
+            new_rows = []
             for i in range(1, new_entries + 1):
                 if f"new_{i}_tahun" in request.form:
                     data = {
                         'id_personel': personel_id,
                         'id_jabatan': request.form.get(f"new_{i}_jabatan"),
                         'id_jenis_pendidikan': request.form.get(f"new_{i}_jenis"),
-                        'tahun': request.form.get(f"new_{i}_tahun"),
-                        'nama_pend': request.form.get(f"new_{i}_nama")
+                        'tahun': request.form.get(f"new_{i}_tahun", '').strip(),
+                        'nama_pend': request.form.get(f"new_{i}_nama", '').strip()
                     }
 
                     if not all([data['id_jenis_pendidikan'], data['tahun'], data['nama_pend']]):
                         continue
 
-                    id_jabatan = int(data['id_jabatan']) if data['id_jabatan'] else None
+                    numbers = parse_numbers(data, f'baru tahun {data["tahun"]}')
+                    if numbers is None:
+                        continue
+
+                    new_rows.append((personel_id, *numbers, data['nama_pend']))
+
+            # Apply the diff as three batched statements in one transaction
+            with transaction():
+                updated = execute_bulk("""
+                    UPDATE tabel_pendidikan AS p SET
+                        id_jabatan = v.id_jabatan,
+                        id_jenis_pendidikan = v.id_jenis_pendidikan,
+                        tahun = v.tahun,
+                        nama_pend = v.nama_pend
+                    FROM (VALUES %s) AS v(no, id_jabatan, id_jenis_pendidikan, tahun, nama_pend)
+                    WHERE p.no = v.no
+                """, update_rows, template="(%s::int, %s::int, %s::int, %s::int, %s)", commit=True)
+
+                deleted = 0
+                if delete_ids:
+                    execute_query(
+                        "DELETE FROM tabel_pendidikan WHERE no = ANY(%s) AND id_personel = %s",
+                        (delete_ids, personel_id),
+                        commit=True
+                    )
+                    deleted = len(delete_ids)
 
-                    success = execute_query("""
-                        INSERT INTO tabel_pendidikan 
-                        (id_personel, id_jabatan, id_jenis_pendidikan, tahun, nama_pend)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (personel_id, id_jabatan, int(data['id_jenis_pendidikan']), 
-                        data['tahun'], data['nama_pend']), 
-                        commit=True)
-                    
-                    if success:
-                        added += 1
+                added = execute_bulk("""
+                    INSERT INTO tabel_pendidikan 
+                    (id_personel, id_jabatan, id_jenis_pendidikan, tahun, nama_pend)
+                    VALUES %s
+                """, new_rows, commit=True)
 
+            if updated or deleted or added:
+                invalidate_entity('pendidikan')
             flash(f'Berhasil: {updated} data diperbarui, {deleted} data dihapus, {added} data baru ditambahkan', 'success')
             return redirect(url_for('list_pendidikan'))
 
@@ -4774,6 +4574,7 @@ def delete_pendidikan(no):
         )
         
         if success:
+            invalidate_entity('pendidikan')
             flash('Data pendidikan berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data pendidikan', 'error')
@@ -4809,31 +4610,25 @@ def list_jenis_fungsional():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query
-    query = f"""
-        SELECT no, nama_fungsional
-        FROM tabel_jenis_fungsional
-        WHERE nama_fungsional ILIKE %s
-        ORDER BY {sort_column} {sort_direction}
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM tabel_jenis_fungsional
-        WHERE nama_fungsional ILIKE %s
-    """
-
-    search_param = f'%{search}%'
-    
-    # Get total count
-    total = execute_query(count_query, (search_param,), fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    jenis_fungsional_list = execute_query(paginated_query, (search_param,), fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("nama_fungsional ILIKE %s")
+        params.append(search_param)
+
+    # Fetch the page and the total in one round-trip
+    jenis_fungsional_list, total, total_estimated = fetch_list_page(
+        select="no, nama_fungsional",
+        from_clause="tabel_jenis_fungsional",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('jenis_fungsional', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -4843,6 +4638,7 @@ def list_jenis_fungsional():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -4875,6 +4671,7 @@ def create_jenis_fungsional():
             """, (next_no, nama_fungsional), commit=True)
             
             if success:
+                invalidate_entity('jenis_fungsional')
                 flash('Data jenis fungsional berhasil ditambahkan', 'success')
                 return redirect(url_for('list_jenis_fungsional'))
             else:
@@ -4917,6 +4714,7 @@ def edit_jenis_fungsional(no):
             """, (nama_fungsional, no), commit=True)
             
             if success:
+                invalidate_entity('jenis_fungsional')
                 flash('Data jenis fungsional berhasil diperbarui', 'success')
                 return redirect(url_for('list_jenis_fungsional'))
             else:
@@ -4941,6 +4739,7 @@ def delete_jenis_fungsional(no):
         )
         
         if success:
+            invalidate_entity('jenis_fungsional')
             flash('Data jenis fungsional berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data jenis fungsional', 'error')
@@ -4954,416 +4753,69 @@ def delete_jenis_fungsional(no):
 # FUNGSIONAL CRUD ROUTES
 # ==============================================
 
+FUNGSIONAL_EXPORT = {
+    'title': 'LAPORAN DATA FUNGSIONAL',
+    'sheet': 'Data Fungsional',
+    'filename': 'data_fungsional',
+    'list_endpoint': 'list_fungsional',
+    'query': """
+        SELECT f.no, jf.nama_fungsional, p.nama_pend, p.tahun,
+               f.jenjang, f.tmt_jenjang, f.no_sk, per.nama as nama_personel,
+               per.id_pwk as id_pwk, pwk.nama_perwakilan
+        FROM tabel_fungsional f
+        LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
+        LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
+        LEFT JOIN tabel_personel per ON f.id_personel = per.no
+        LEFT JOIN ref_perwakilan pwk ON pwk.trigram = per.id_pwk""",
+    'search': [
+        "f.nama_fungsional = ANY(ARRAY(SELECT no FROM tabel_jenis_fungsional WHERE nama_fungsional ILIKE %s))",
+        "f.nama_pendidikan = ANY(ARRAY(SELECT no FROM tabel_pendidikan WHERE nama_pend ILIKE %s))",
+        "f.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s))",
+    ],
+    'sort': {
+        'no': 'f.no',
+        'nama_fungsional': 'jf.nama_fungsional',
+        'nama_pendidikan': 'p.nama_pend',
+        'tahun_pendidikan': 'p.tahun',
+        'jenjang': 'f.jenjang',
+        'tmt_jenjang': 'f.tmt_jenjang'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 9, 0.15, 50, admin_only=True),
+        export_column("Personel", 7, 0.15, 60),
+        export_column("Fungsional", 1, 0.18, 70),
+        export_column("Pendidikan", 2, 0.15, 40),
+        export_column("Tahun", 3, 0.08, 40, align='CENTER'),
+        export_column("Jenjang", 4, 0.1, 50, align='CENTER'),
+        export_column("TMT Jenjang", 5, 0.1, 50, align='CENTER', kind='date', only='xlsx'),
+        export_column("No. SK", 6, 0.15, 40, align='CENTER'),
+    ],
+}
+
 @app.route('/fungsional/export/pdf')
 def export_fungsional_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'f.no',
-            'nama_fungsional': 'jf.nama_fungsional',
-            'nama_pendidikan': 'p.nama_pend',
-            'tahun_pendidikan': 'p.tahun',
-            'jenjang': 'f.jenjang',
-            'tmt_jenjang': 'f.tmt_jenjang'
-        }
-        sort_column = valid_columns.get(sort_column, 'f.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT f.no, jf.nama_fungsional, p.nama_pend, p.tahun, 
-                   f.jenjang, f.tmt_jenjang, f.no_sk, per.nama as nama_personel, 
-                   per.id_pwk as id_pwk, pwk.nama_perwakilan
-            FROM tabel_fungsional f
-            LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
-            LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
-            LEFT JOIN tabel_personel per ON f.id_personel = per.no
-            LEFT JOIN ref_perwakilan pwk ON pwk.trigram = per.id_pwk
-            WHERE (jf.nama_fungsional ILIKE %s OR p.nama_pend ILIKE %s OR per.nama ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(3)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND UPPER(TRIM(per.id_pwk)) = UPPER(TRIM(%s))"
-                params.append(user_trigram.strip().upper())
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        fungsional_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA FUNGSIONAL", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan" if session.get('role') == 0 else None,  # Only show for admin
-            "Personel", 
-            "Fungsional", 
-            "Pendidikan", 
-            "Tahun", 
-            "Jenjang",
-            "No. SK"
-        ]
-        # Filter out None values (for non-admin users)
-        headers = [h for h in headers if h is not None]
-        data.append(headers)
-        
-        for idx, item in enumerate(fungsional_list, 1):
-            tmt_jenjang = item[5].strftime('%d-%m-%Y') if item[5] else '-'
-            row = [
-                str(idx),
-                item[9] or '-' if session.get('role') == 0 else None,  # Perwakilan (only for admin)
-                item[7] or '-',  # Personel
-                item[1] or '-',  # Fungsional
-                item[2] or '-',  # Pendidikan
-                str(item[3]) if item[3] else '-',  # Tahun
-                item[4] or '-',  # Jenjang
-                item[6] or '-'   # No. SK
-            ]
-            # Filter out None values (for non-admin users)
-            row = [r for r in row if r is not None]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution - adjusted for A4 portrait
-        if session.get('role') == 0:  # Admin
-            col_ratios = [0.05, 0.15, 0.15, 0.18, 0.15, 0.08, 0.1, 0.15]
-        else:  # Non-admin
-
-            col_ratios = [0.05, 0.25, 0.2, 0.18, 0.08, 0.1, 0.15]
-        
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        if session.get('role') == 0:  # Admin
-            min_widths = [25, 50, 60, 70, 40, 40, 50, 40]
-        else:  # Non-admin
-            min_widths = [25, 80, 70, 40, 40, 50, 40]
-            
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),  # Reduced font size
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),  # Reduced padding
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),  # Reduced font size
-            ('LEADING', (0,0), (-1,-1), 8),   # Reduced leading
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Personel left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Fungsional left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # Pendidikan left-aligned
-            ('ALIGN', (5,0), (5,-1), 'CENTER'),    # Tahun centered
-            ('ALIGN', (6,0), (6,-1), 'CENTER'),    # Jenjang centered
-            ('ALIGN', (7,0), (7,-1), 'CENTER'),    # TMT Jenjang centered
-            ('ALIGN', (8,0), (8,-1), 'CENTER')     # No. SK centered
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_fungsional_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_fungsional'))
+    return export_response(FUNGSIONAL_EXPORT, 'pdf')
 
 @app.route('/fungsional/export/excel')
 def export_fungsional_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'f.no',
-            'nama_fungsional': 'jf.nama_fungsional',
-            'nama_pendidikan': 'p.nama_pend',
-            'tahun_pendidikan': 'p.tahun',
-            'jenjang': 'f.jenjang',
-            'tmt_jenjang': 'f.tmt_jenjang'
-        }
-        sort_column = valid_columns.get(sort_column, 'f.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT f.no, jf.nama_fungsional, p.nama_pend, p.tahun, 
-                   f.jenjang, f.tmt_jenjang, f.no_sk, per.nama as nama_personel, 
-                   per.id_pwk as id_pwk, pwk.nama_perwakilan
-            FROM tabel_fungsional f
-            LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
-            LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
-            LEFT JOIN tabel_personel per ON f.id_personel = per.no
-            LEFT JOIN ref_perwakilan pwk ON pwk.trigram = per.id_pwk
-            WHERE (jf.nama_fungsional ILIKE %s OR p.nama_pend ILIKE %s OR per.nama ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(3)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND UPPER(TRIM(per.id_pwk)) = UPPER(TRIM(%s))"
-                params.append(user_trigram.strip().upper())
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
+    return export_response(FUNGSIONAL_EXPORT, 'xlsx')
 
-        # Execute query to get all data
-        fungsional_list = execute_query(query, params, fetch=True) or []
+@app.route('/fungsional/export/csv')
+def export_fungsional_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(FUNGSIONAL_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Fungsional")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'align': 'center'
-        })
-        
-        date_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'align': 'center',
-            'num_format': 'dd-mm-yyyy'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:I1', 'LAPORAN DATA FUNGSIONAL', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Personel", 
-            "Fungsional", 
-            "Pendidikan", 
-            "Tahun", 
-            "Jenjang",
-            "TMT Jenjang",
-            "No. SK"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(fungsional_list, 1):
-            tmt_jenjang = item[5] if item[5] else None
-            row = [
-                idx,
-                item[9] or '-',  # perwakilan
-                item[7] or '-',  # personel
-                item[1] or '-',  # fungsional
-                item[2] or '-',  # pendidikan
-                item[3] or '-',  # tahun
-                item[4] or '-',  # jenjang
-                tmt_jenjang,     # tmt_jenjang
-                item[6] or '-'   # no_sk
-            ]
-            
-            # Apply different formats based on column
-            worksheet.write(current_row, 0, row[0], center_format)  # No - centered
-            worksheet.write(current_row, 1, row[1], data_format)    # Perwakilan
-            worksheet.write(current_row, 2, row[2], data_format)    # Personel
-            worksheet.write(current_row, 3, row[3], data_format)    # Fungsional
-            worksheet.write(current_row, 4, row[4], data_format)    # Pendidikan
-            worksheet.write(current_row, 5, row[5], center_format)  # Tahun - centered
-            worksheet.write(current_row, 6, row[6], center_format)  # Jenjang - centered
-            worksheet.write(current_row, 7, row[7], date_format if row[7] else center_format)  # TMT Jenjang - date format
-            worksheet.write(current_row, 8, row[8], center_format)  # No. SK - centered
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [5, 15, 20, 20, 20, 8, 10, 12, 10]  # Initial widths
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in fungsional_list:
-                if i == 0:  # No
-                    val_length = len(str(row[0]))
-                elif i == 1:  # Perwakilan
-                    val_length = len(str(row[9] or ''))
-                elif i == 2:  # Personel
-                    val_length = len(str(row[7] or ''))
-                elif i == 3:  # Fungsional
-                    val_length = len(str(row[1] or ''))
-                elif i == 4:  # Pendidikan
-                    val_length = len(str(row[2] or ''))
-                elif i == 5:  # Tahun
-                    val_length = len(str(row[3] or ''))
-                elif i == 6:  # Jenjang
-                    val_length = len(str(row[4] or ''))
-                elif i == 7:  # TMT Jenjang
-                    val_length = 10  # Date format length
-                elif i == 8:  # No. SK
-                    val_length = len(str(row[6] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_fungsional_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_fungsional'))
+@app.route('/fungsional/export/parquet')
+def export_fungsional_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(FUNGSIONAL_EXPORT)
 
 @app.route('/fungsional')
 def list_fungsional():
@@ -5391,58 +4843,34 @@ def list_fungsional():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = f"""
-        SELECT f.no, jf.nama_fungsional, p.nama_pend, p.tahun, 
-               f.jenjang, f.tmt_jenjang, f.no_sk, per.nama as nama_personel, 
-               per.id_pwk as id_pwk, pwk.nama_perwakilan
-        FROM tabel_fungsional f
-        LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
-        LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
-        LEFT JOIN tabel_personel per ON f.id_personel = per.no
-        LEFT JOIN ref_perwakilan pwk ON pwk.trigram = id_pwk
-        WHERE (jf.nama_fungsional ILIKE %s OR p.nama_pend ILIKE %s OR per.nama ILIKE %s)
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM tabel_fungsional f
-        LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
-        LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
-        LEFT JOIN tabel_personel per ON f.id_personel = per.no
-        WHERE (jf.nama_fungsional ILIKE %s OR p.nama_pend ILIKE %s OR per.nama ILIKE %s)
-    """
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND UPPER(TRIM(per.id_pwk)) = UPPER(TRIM(%s))"
-            count_query += " AND UPPER(TRIM(per.id_pwk)) = UPPER(TRIM(%s))"
-
-    # Complete the query with sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-    
-    search_param = f'%{search}%'
-    
-    # Prepare parameters for query
-    query_params = [search_param, search_param, search_param]
-    count_params = [search_param, search_param, search_param]
-    
-    # Add trigram parameter if needed
-    if session.get('role') != 0 and session.get('trigram'):
-        query_params.append(user_trigram.strip().upper())
-        count_params.append(user_trigram.strip().upper())
-    
-    # Get total count
-    total = execute_query(count_query, count_params, fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    fungsional_list = execute_query(paginated_query, query_params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""f.nama_fungsional = ANY(ARRAY(SELECT no FROM tabel_jenis_fungsional WHERE nama_fungsional ILIKE %s)) OR
+                        f.nama_pendidikan = ANY(ARRAY(SELECT no FROM tabel_pendidikan WHERE nama_pend ILIKE %s)) OR
+                        f.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s))""")
+        params.extend([search_param] * 3)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page and the total in one round-trip
+    fungsional_list, total, total_estimated = fetch_list_page(
+        select="""f.no, jf.nama_fungsional, p.nama_pend, p.tahun, 
+                  f.jenjang, f.tmt_jenjang, f.no_sk, per.nama as nama_personel, 
+                  per.id_pwk as id_pwk, pwk.nama_perwakilan""",
+        from_clause="""tabel_fungsional f
+            LEFT JOIN tabel_jenis_fungsional jf ON f.nama_fungsional = jf.no
+            LEFT JOIN tabel_pendidikan p ON f.nama_pendidikan = p.no
+            LEFT JOIN tabel_personel per ON f.id_personel = per.no
+            LEFT JOIN ref_perwakilan pwk ON pwk.trigram = per.id_pwk""",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('fungsional', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -5452,6 +4880,7 @@ def list_fungsional():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -5461,25 +4890,13 @@ def create_fungsional():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    # Get dropdown data - MODIFIED to filter by perwakilan
-    jenis_fungsional_query = "SELECT no, nama_fungsional FROM tabel_jenis_fungsional ORDER BY nama_fungsional"
+    # Get dropdown data (row-level security limits personel to the user's perwakilan)
     pendidikan_query = "SELECT no, nama_pend, tahun FROM tabel_pendidikan ORDER BY nama_pend"
-    personel_query = "SELECT no, nama FROM tabel_personel"
-    
-    params = []
+    personel_query = "SELECT no, nama FROM tabel_personel ORDER BY nama"
     
-    # Filter personel by perwakilan for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            personel_query += " WHERE UPPER(TRIM(id_pwk)) = UPPER(TRIM(%s))"
-            params.append(user_trigram.strip().upper())
-
-    personel_query += " ORDER BY nama"
-    
-    jenis_fungsional_list = execute_query(jenis_fungsional_query, fetch=True) or []
+    jenis_fungsional_list = get_reference('jenis_fungsional')
     pendidikan_list = execute_query(pendidikan_query, fetch=True) or []
-    personel_list = execute_query(personel_query, params, fetch=True) or []
+    personel_list = execute_query(personel_query, fetch=True) or []
 
     if request.method == 'POST':
         try:
@@ -5562,6 +4979,7 @@ def create_fungsional():
             )
             
             if success:
+                invalidate_entity('fungsional')
                 flash('Data fungsional berhasil ditambahkan', 'success')
                 return redirect(url_for('list_fungsional'))
             else:
@@ -5597,25 +5015,13 @@ def edit_fungsional(no):
                 flash('Anda tidak memiliki akses untuk mengedit data ini', 'error')
                 return redirect(url_for('list_fungsional'))
 
-    # Get dropdown data - MODIFIED to filter by perwakilan
-    jenis_fungsional_query = "SELECT no, nama_fungsional FROM tabel_jenis_fungsional ORDER BY nama_fungsional"
+    # Get dropdown data (row-level security limits personel to the user's perwakilan)
     pendidikan_query = "SELECT no, nama_pend, tahun FROM tabel_pendidikan ORDER BY nama_pend"
-    personel_query = "SELECT no, nama FROM tabel_personel"
-    
-    params = []
-    
-    # Filter personel by perwakilan for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            personel_query += " WHERE UPPER(TRIM(id_pwk)) = UPPER(TRIM(%s))"
-            params.append(user_trigram.strip().upper())
-
-    personel_query += " ORDER BY nama"
+    personel_query = "SELECT no, nama FROM tabel_personel ORDER BY nama"
     
-    jenis_fungsional_list = execute_query(jenis_fungsional_query, fetch=True) or []
+    jenis_fungsional_list = get_reference('jenis_fungsional')
     pendidikan_list = execute_query(pendidikan_query, fetch=True) or []
-    personel_list = execute_query(personel_query, params, fetch=True) or []
+    personel_list = execute_query(personel_query, fetch=True) or []
 
     # Get existing data
     fungsional = execute_query(
@@ -5673,6 +5079,7 @@ def edit_fungsional(no):
                   jenjang, tmt_jenjang, no_sk, id_personel, no), commit=True)
             
             if success:
+                invalidate_entity('fungsional')
                 flash('Data fungsional berhasil diperbarui', 'success')
                 return redirect(url_for('list_fungsional'))
             else:
@@ -5716,6 +5123,7 @@ def delete_fungsional(no):
         )
         
         if success:
+            invalidate_entity('fungsional')
             flash('Data fungsional berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data fungsional', 'error')
@@ -5728,408 +5136,69 @@ def delete_fungsional(no):
 # AKS CRUD ROUTES
 # ==============================================
 
+AKS_EXPORT = {
+    'title': 'LAPORAN DATA AKS',
+    'sheet': 'Data AKS',
+    'filename': 'data_aks',
+    'list_endpoint': 'list_aks',
+    'query': """
+        SELECT a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita,
+               p.no as id_personel, p.nama as nama_personel,
+               r.trigram as id_pwk, r.nama_perwakilan
+        FROM tabel_aks a
+        LEFT JOIN tabel_personel p ON a.id_personel = p.no
+        LEFT JOIN ref_perwakilan r ON a.id_pwk = r.trigram""",
+    'search': [
+        "a.aks ILIKE %s",
+        "a.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s))",
+        "a.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+        "a.no_berita ILIKE %s",
+    ],
+    'search_date': 'a.tgl_penggantian',
+    'sort': {
+        'no': 'a.no',
+        'nama_personel': 'p.nama',
+        'perwakilan': 'r.nama_perwakilan',
+        'aks': 'a.aks',
+        'tgl_penggantian': 'a.tgl_penggantian',
+        'status': 'a.status',
+        'no_berita': 'a.no_berita'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 8, 0.15, 50, admin_only=True),
+        export_column("Personel", 6, 0.2, 70),
+        export_column("Jenis AKS", 1, 0.15, 50),
+        export_column("Tgl Penggantian", 2, 0.15, 50, align='CENTER', kind='date'),
+        export_column("Status", lambda row: 'Aktif' if row[3] else 'Non-Aktif', 0.1, 40, align='CENTER',
+                      highlight=lambda row: 'good' if row[3] else 'bad'),
+        export_column("No. Berita", 4, 0.2, 70),
+    ],
+}
+
 @app.route('/aks/export/pdf')
 def export_aks_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'a.no',
-            'nama_personel': 'p.nama',
-            'perwakilan': 'r.nama_perwakilan',
-            'aks': 'a.aks',
-            'tgl_penggantian': 'a.tgl_penggantian',
-            'status': 'a.status',
-            'no_berita': 'a.no_berita'
-        }
-        sort_column = valid_columns.get(sort_column, 'a.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita,
-                   p.no as id_personel, p.nama as nama_personel,
-                   r.trigram as id_pwk, r.nama_perwakilan
-            FROM tabel_aks a
-            LEFT JOIN tabel_personel p ON a.id_personel = p.no
-            LEFT JOIN ref_perwakilan r ON a.id_pwk = r.trigram
-            WHERE (a.aks ILIKE %s OR
-                  p.nama ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  a.no_berita ILIKE %s OR
-                  a.tgl_penggantian::text ILIKE %s)
-        """
+    return export_response(AKS_EXPORT, 'pdf')
 
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND a.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        aks_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA AKS", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "Perwakilan" if session.get('role') == 0 else None,  # Only show for admin
-            "Personel", 
-            "Jenis AKS", 
-            "Tgl Penggantian", 
-            "Status", 
-            "No. Berita"
-        ]
-        # Filter out None values (for non-admin users)
-        headers = [h for h in headers if h is not None]
-        data.append(headers)
-        
-        for idx, item in enumerate(aks_list, 1):
-            row = [
-                str(idx),
-                item[8] or '-' if session.get('role') == 0 else None,  # Perwakilan (only for admin)
-                item[6] or '-',  # Personel
-                item[1] or '-',   # AKS
-                item[2].strftime('%d-%m-%Y') if item[2] else '-',  # Tgl Penggantian
-                'Aktif' if item[3] else 'Non-Aktif',  # Status
-                item[4] or '-'    # No. Berita
-            ]
-            # Filter out None values (for non-admin users)
-            row = [r for r in row if r is not None]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution - adjusted for A4 portrait
-        if session.get('role') == 0:  # Admin
-            col_ratios = [0.05, 0.15, 0.2, 0.15, 0.15, 0.1, 0.2]
-        else:  # Non-admin
-            col_ratios = [0.05, 0.25, 0.15, 0.15, 0.1, 0.3]
-        
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        if session.get('role') == 0:  # Admin
-            min_widths = [25, 50, 70, 50, 50, 40, 70]
-        else:  # Non-admin
-            min_widths = [25, 80, 50, 50, 40, 90]
-            
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),  # Reduced font size
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),  # Reduced padding
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),  # Reduced font size
-            ('LEADING', (0,0), (-1,-1), 8),   # Reduced leading
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Personel left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Jenis AKS left-aligned
-            ('ALIGN', (4,0), (4,-1), 'CENTER'),    # Tgl Penggantian centered
-            ('ALIGN', (5,0), (5,-1), 'CENTER'),    # Status centered
-            ('ALIGN', (6,0), (6,-1), 'LEFT')       # No. Berita left-aligned
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_aks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_aks'))
-    
 @app.route('/aks/export/excel')
 def export_aks_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'a.no',
-            'nama_personel': 'p.nama',
-            'perwakilan': 'r.nama_perwakilan',
-            'aks': 'a.aks',
-            'tgl_penggantian': 'a.tgl_penggantian',
-            'status': 'a.status',
-            'no_berita': 'a.no_berita'
-        }
-        sort_column = valid_columns.get(sort_column, 'a.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita,
-                   p.no as id_personel, p.nama as nama_personel,
-                   r.trigram as id_pwk, r.nama_perwakilan
-            FROM tabel_aks a
-            LEFT JOIN tabel_personel p ON a.id_personel = p.no
-            LEFT JOIN ref_perwakilan r ON a.id_pwk = r.trigram
-            WHERE (a.aks ILIKE %s OR
-                  p.nama ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  a.no_berita ILIKE %s OR
-                  a.tgl_penggantian::text ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND a.id_pwk = %s"
-                params.append(user_trigram)
+    return export_response(AKS_EXPORT, 'xlsx')
 
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        aks_list = execute_query(query, params, fetch=True) or []
+@app.route('/aks/export/csv')
+def export_aks_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(AKS_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data AKS")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        status_active_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'bg_color': '#C6EFCE',  # Light green
-            'font_color': '#006100'  # Dark green
-        })
-        
-        status_inactive_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'bg_color': '#FFC7CE',  # Light red
-            'font_color': '#9C0006'  # Dark red
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA AKS', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "Perwakilan", 
-            "Personel", 
-            "Jenis AKS", 
-            "Tgl Penggantian", 
-            "Status", 
-            "No. Berita"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(aks_list, 1):
-            row = [
-                idx,
-                item[8] or '-',  # Perwakilan
-                item[6] or '-',  # Personel
-                item[1] or '-',  # Jenis AKS
-                item[2].strftime('%d-%m-%Y') if item[2] else '-',  # Tgl Penggantian
-                'Aktif' if item[3] else 'Non-Aktif',  # Status
-                item[4] or '-'    # No. Berita
-            ]
-            
-            for col, value in enumerate(row):
-                if col == 5:  # Status column
-                    if item[3]:  # Active
-                        worksheet.write(current_row, col, value, status_active_format)
-                    else:  # Inactive
-                        worksheet.write(current_row, col, value, status_inactive_format)
-                else:
-                    worksheet.write(current_row, col, value, data_format)
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in aks_list:
-                if i == 0:  # No column
-                    val_length = len(str(row[0]))
-                elif i == 1:  # Perwakilan
-                    val_length = len(str(row[8] or ''))
-                elif i == 2:  # Personel
-                    val_length = len(str(row[6] or ''))
-                elif i == 3:  # Jenis AKS
-                    val_length = len(str(row[1] or ''))
-                elif i == 4:  # Tgl Penggantian
-                    val_length = 10  # Fixed length for date format
-                elif i == 5:  # Status
-                    val_length = 6 if row[3] else 9  # "Aktif" or "Non-Aktif"
-                elif i == 6:  # No. Berita
-                    val_length = len(str(row[4] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        # Freeze header row
-        worksheet.freeze_panes(1, 0)
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_aks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_aks'))
+@app.route('/aks/export/parquet')
+def export_aks_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(AKS_EXPORT)
 
 @app.route('/aks')
 def list_aks():
@@ -6140,7 +5209,7 @@ def list_aks():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'no')
+    sort_by = request.args.get('sort', 'no')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -6153,57 +5222,45 @@ def list_aks():
         'status': 'a.status',
         'no_berita': 'a.no_berita'
     }
-    sort_column = valid_columns.get(sort_column, 'a.no')
+    if sort_by not in valid_columns:
+        sort_by = 'no'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = """
-        SELECT a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita,
-               p.no as id_personel, p.nama as nama_personel,
-               r.trigram as id_pwk, r.nama_perwakilan
-        FROM tabel_aks a
-        LEFT JOIN tabel_personel p ON a.id_personel = p.no
-        LEFT JOIN ref_perwakilan r ON a.id_pwk = r.trigram
-        WHERE (a.aks ILIKE %s OR
-              p.nama ILIKE %s OR
-              r.nama_perwakilan ILIKE %s OR
-              a.no_berita ILIKE %s OR
-              a.tgl_penggantian::text ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND a.id_pwk = %s"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita, " +
-        "p.no as id_personel, p.nama as nama_personel, " +
-        "r.trigram as id_pwk, r.nama_perwakilan", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count - PERBAIKAN DI SINI
-    count_result = execute_query(count_query, params, fetch_one=True)
-    total = count_result[0] if count_result else 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    aks_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        predicates = """a.aks ILIKE %s OR
+                   a.id_personel = ANY(ARRAY(SELECT no FROM tabel_personel WHERE nama ILIKE %s)) OR
+                   a.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s)) OR
+                   a.no_berita ILIKE %s"""
+        params.extend([search_param] * 4)
+        date = search_date(search)
+        if date:
+            predicates += " OR a.tgl_penggantian = %s"
+            params.append(date)
+        where.append(predicates)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page and the total in one round-trip
+    aks_list, total, total_estimated = fetch_list_page(
+        select="""a.no, a.aks, a.tgl_penggantian, a.status, a.no_berita,
+                  p.no as id_personel, p.nama as nama_personel,
+                  r.trigram as id_pwk, r.nama_perwakilan""",
+        from_clause="""tabel_aks a
+            LEFT JOIN tabel_personel p ON a.id_personel = p.no
+            LEFT JOIN ref_perwakilan r ON a.id_pwk = r.trigram""",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('aks', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -6213,8 +5270,9 @@ def list_aks():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('a.', ''),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/aks/create', methods=['GET', 'POST'])
@@ -6222,39 +5280,17 @@ def create_aks():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    # Get personel list based on user role
-    if session.get('role') == 0:  # Admin
-        personel_list = execute_query(
-            """SELECT p.no, p.nama, r.nama_perwakilan 
-               FROM tabel_personel p
-               LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-               ORDER BY p.nama""",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        user_trigram = session.get('trigram')
-        personel_list = execute_query(
-            """SELECT p.no, p.nama, r.nama_perwakilan 
-               FROM tabel_personel p
-               LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-               WHERE p.id_pwk = %s
-               ORDER BY p.nama""",
-            (user_trigram,),
-            fetch=True
-        ) or []
+    # Personel list (row-level security limits it to the user's perwakilan)
+    personel_list = execute_query(
+        """SELECT p.no, p.nama, r.nama_perwakilan 
+           FROM tabel_personel p
+           LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
+           ORDER BY p.nama""",
+        fetch=True
+    ) or []
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -6263,7 +5299,7 @@ def create_aks():
             
             # Prepare data tuple with proper null handling
             data = (
-                form_data.get('id_pwk', '').strip().upper() or None,
+                normalize_trigram(form_data.get('id_pwk')) or None,
                 int(form_data.get('id_personel')) if form_data.get('id_personel') else None,
                 form_data.get('aks', '').strip() or None,
                 form_data.get('tgl_penggantian') or None,
@@ -6326,6 +5362,7 @@ def create_aks():
             """, data, commit=True)
             
             if success:
+                invalidate_entity('aks')
                 flash('Data Akses berhasil ditambahkan', 'success')
                 return redirect(url_for('list_aks'))
             else:
@@ -6370,38 +5407,17 @@ def edit_aks(no):
             flash('Anda tidak memiliki akses untuk mengedit data ini', 'error')
             return redirect(url_for('list_aks'))
 
-    # Get personel list based on user role
-    if session.get('role') == 0:  # Admin
-        personel_list = execute_query(
-            """SELECT p.no, p.nama, r.nama_perwakilan 
-               FROM tabel_personel p
-               LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-               ORDER BY p.nama""",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        personel_list = execute_query(
-            """SELECT p.no, p.nama, r.nama_perwakilan 
-               FROM tabel_personel p
-               LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-               WHERE p.id_pwk = %s
-               ORDER BY p.nama""",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    # Personel list (row-level security limits it to the user's perwakilan)
+    personel_list = execute_query(
+        """SELECT p.no, p.nama, r.nama_perwakilan 
+           FROM tabel_personel p
+           LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
+           ORDER BY p.nama""",
+        fetch=True
+    ) or []
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -6410,7 +5426,7 @@ def edit_aks(no):
             
             # Prepare data tuple with proper null handling
             data = (
-                form_data.get('id_pwk', '').strip().upper() or None,
+                normalize_trigram(form_data.get('id_pwk')) or None,
                 int(form_data.get('id_personel')) if form_data.get('id_personel') else None,
                 form_data.get('aks', '').strip() or None,
                 form_data.get('tgl_penggantian') or None,
@@ -6464,6 +5480,7 @@ def edit_aks(no):
             """, data, commit=True)
             
             if success:
+                invalidate_entity('aks')
                 flash('Data Akses berhasil diperbarui', 'success')
                 return redirect(url_for('list_aks'))
             else:
@@ -6505,6 +5522,7 @@ def delete_aks(no):
         )
         
         if success:
+            invalidate_entity('aks')
             flash('Data Akses berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data Akses', 'error')
@@ -6527,7 +5545,7 @@ def list_jenis_sistem():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'id_jenis')
+    sort_by = request.args.get('sort', 'id_jenis')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -6535,62 +5553,42 @@ def list_jenis_sistem():
         'id_jenis': 'j.ID_JENIS',
         'jenis': 'j.JENIS',
         'kategori': 'j.KATEGORI',
-        'lembar': 'j.LEMBAR',
-        'format_nomor': 'j.FORMAT_NOMOR',
-        'perwakilan': 'COALESCE(r.nama_perwakilan, \'ALL PERWAKILAN\')'
-    }
-    sort_column = valid_columns.get(sort_column, 'j.ID_JENIS')
-    
-    # Validate sort direction
-    sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-    # Base query with joins and COALESCE for perwakilan name
-    query = """
-        SELECT j.ID_JENIS, j.JENIS, j.KATEGORI, j.LEMBAR, j.FORMAT_NOMOR,
-               j.TRIGRAM_PWK, 
-               COALESCE(r.nama_perwakilan, 'ALL PERWAKILAN') as nama_perwakilan
-        FROM ref_jenis_sistem j
-        LEFT JOIN ref_perwakilan r ON j.TRIGRAM_PWK = r.trigram
-        WHERE (j.ID_JENIS ILIKE %s OR
-              j.JENIS ILIKE %s OR
-              j.KATEGORI ILIKE %s OR
-              j.FORMAT_NOMOR ILIKE %s OR
-              COALESCE(r.nama_perwakilan, 'ALL PERWAKILAN') ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND (j.TRIGRAM_PWK = %s OR j.TRIGRAM_PWK IS NULL)"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT j.ID_JENIS, j.JENIS, j.KATEGORI, j.LEMBAR, j.FORMAT_NOMOR, " +
-        "j.TRIGRAM_PWK, COALESCE(r.nama_perwakilan, 'ALL PERWAKILAN') as nama_perwakilan", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count - with proper type conversion
-    try:
-        count_result = execute_query(count_query, params, fetch_one=True)
-        total = int(count_result[0]) if count_result and count_result[0] else 0
-    except (ValueError, TypeError):
-        total = 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
+        'lembar': 'j.LEMBAR',
+        'format_nomor': 'j.FORMAT_NOMOR',
+        'perwakilan': 'COALESCE(r.nama_perwakilan, \'ALL PERWAKILAN\')'
+    }
+    if sort_by not in valid_columns:
+        sort_by = 'id_jenis'
+    sort_column = valid_columns[sort_by]
     
-    # Execute query
-    jenis_sistem_list = execute_query(paginated_query, params, fetch=True) or []
+    # Validate sort direction
+    sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
+
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""j.ID_JENIS ILIKE %s OR
+                   j.JENIS ILIKE %s OR
+                   j.KATEGORI ILIKE %s OR
+                   j.FORMAT_NOMOR ILIKE %s OR
+                   COALESCE(r.nama_perwakilan, 'ALL PERWAKILAN') ILIKE %s""")
+        params.extend([search_param] * 5)
+
+    # Fetch the page and the total in one round-trip
+    jenis_sistem_list, total, total_estimated = fetch_list_page(
+        select="""j.ID_JENIS, j.JENIS, j.KATEGORI, j.LEMBAR, j.FORMAT_NOMOR,
+                  j.TRIGRAM_PWK, 
+                  COALESCE(r.nama_perwakilan, 'ALL PERWAKILAN') as nama_perwakilan""",
+        from_clause="ref_jenis_sistem j LEFT JOIN ref_perwakilan r ON j.TRIGRAM_PWK = r.trigram",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('jenis_sistem', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -6600,8 +5598,9 @@ def list_jenis_sistem():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('j.', '').replace('COALESCE(r.nama_perwakilan, \'ALL PERWAKILAN\')', 'perwakilan'),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/jenis_sistem/create', methods=['GET', 'POST'])
@@ -6610,25 +5609,13 @@ def create_jenis_sistem():
         return redirect(url_for('login'))
 
     # Get perwakilan list
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
+    if session.get('role') == 0:
         # Tambahkan opsi ALL untuk admin
         perwakilan_list.append(('ALL', 'ALL PERWAKILAN'))
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
 
     # Get kategori list from database
-    kategori_list = execute_query(
-        "SELECT kategori FROM ref_kategori_sistem ORDER BY kategori",
-        fetch=True
-    ) or []
+    kategori_list = get_reference('kategori_sistem')
     kategori_options = [k[0] for k in kategori_list]  # Extract kategori values
 
     if request.method == 'POST':
@@ -6640,7 +5627,7 @@ def create_jenis_sistem():
             
             # Handle All Perwakilan checkbox
             use_all_perwakilan = 'all_perwakilan' in form_data
-            trigram_pwk = 'ALL' if use_all_perwakilan else form_data.get('trigram_pwk', '').strip().upper()
+            trigram_pwk = 'ALL' if use_all_perwakilan else normalize_trigram(form_data.get('trigram_pwk'))
             
             # Validasi untuk non-admin
             if session.get('role') != 0:
@@ -6657,23 +5644,16 @@ def create_jenis_sistem():
                                         form_data=request.form,
                                         kategori_options=kategori_options)
 
-            # Generate ID_JENIS
-            last_id = execute_query(
-                "SELECT ID_JENIS FROM ref_jenis_sistem ORDER BY ID_JENIS DESC LIMIT 1",
-                fetch_one=True
-            )
-            new_id = f"J{(int(last_id[0][1:]) + 1):04d}" if last_id else "J0001"
-
             # Pastikan 'ALL' ada di tabel ref_perwakilan
             if trigram_pwk == 'ALL':
                 execute_query(
                     "INSERT INTO ref_perwakilan (trigram, nama_perwakilan) VALUES ('ALL', 'ALL PERWAKILAN') ON CONFLICT (trigram) DO NOTHING",
                     commit=True
                 )
+                invalidate_entity('perwakilan')
 
             # Prepare data
             data = (
-                new_id,
                 form_data.get('jenis', '').strip(),
                 form_data.get('kategori', '').strip(),
                 int(form_data.get('lembar')) if form_data.get('lembar') else None,
@@ -6685,11 +5665,11 @@ def create_jenis_sistem():
             
             # Debugging - print prepared data
             print("Prepared Data:", data)
-            logger.debug(f"Data yang akan disimpan - ID: {new_id}, Trigram: {trigram_pwk}")
+            logger.debug(f"Data yang akan disimpan - Trigram: {trigram_pwk}")
             logger.debug(f"Full data: {data}")
 
             # Validasi required fields
-            if not data[1] or not data[2]:
+            if not data[0] or not data[1]:
                 flash('Jenis Sistem dan Kategori wajib diisi', 'error')
                 return render_template('jenis_sistem/create.html', 
                                     perwakilan_list=perwakilan_list,
@@ -6697,13 +5677,15 @@ def create_jenis_sistem():
                                     kategori_options=kategori_options)
 
             # Execute query yang benar ke tabel ref_jenis_sistem
-            success = execute_query("""
+            # ID_JENIS (J0001 format) is allocated by the INSERT
+            success = execute_query(f"""
                 INSERT INTO ref_jenis_sistem 
                 (ID_JENIS, JENIS, KATEGORI, LEMBAR, FORMAT_NOMOR, TRIGRAM_PWK, USER_INPUT, USER_UPDATE)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES ({next_id_sql('jenis_sistem')}, %s, %s, %s, %s, %s, %s, %s)
             """, data, commit=True)
             
             if success:
+                invalidate_entity('jenis_sistem')
                 flash('Data berhasil ditambahkan', 'success')
                 return redirect(url_for('list_jenis_sistem'))
             else:
@@ -6745,25 +5727,13 @@ def edit_jenis_sistem(id_jenis):
             return redirect(url_for('list_jenis_sistem'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
+    if session.get('role') == 0:
         # Add ALL option for admin
         perwakilan_list.append(('ALL', 'ALL PERWAKILAN'))
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
 
     # Get kategori list from database
-    kategori_list = execute_query(
-        "SELECT kategori FROM ref_kategori_sistem ORDER BY kategori",
-        fetch=True
-    ) or []
+    kategori_list = get_reference('kategori_sistem')
     kategori_options = [k[0] for k in kategori_list]  # Extract kategori values
 
     if request.method == 'POST':
@@ -6777,7 +5747,7 @@ def edit_jenis_sistem(id_jenis):
                 form_data.get('kategori', '').strip(),
                 int(form_data.get('lembar')) if form_data.get('lembar') else None,
                 form_data.get('format_nomor', '').strip(),
-                form_data.get('trigram_pwk', '').strip().upper(),
+                normalize_trigram(form_data.get('trigram_pwk')),
                 session.get('user_id'),  # USER_UPDATE
                 id_jenis
             )
@@ -6810,6 +5780,7 @@ def edit_jenis_sistem(id_jenis):
             """, data, commit=True)
             
             if success:
+                invalidate_entity('jenis_sistem')
                 flash('Data Jenis Sistem berhasil diperbarui', 'success')
                 return redirect(url_for('list_jenis_sistem'))
             else:
@@ -6851,6 +5822,7 @@ def delete_jenis_sistem(id_jenis):
         )
         
         if success:
+            invalidate_entity('jenis_sistem')
             flash('Data Jenis Sistem berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data Jenis Sistem', 'error')
@@ -6863,444 +5835,78 @@ def delete_jenis_sistem(id_jenis):
 # ==============================================
 # TABEL_SISTEM CRUD ROUTES 
 # ==============================================
+SISTEM_STATUS_LABELS = {
+    0: "Belum Berlaku",
+    1: "Sedang Berlaku",
+    2: "Tidak Berlaku"
+}
+SISTEM_STATUS_HIGHLIGHTS = {0: 'neutral', 1: 'good', 2: 'bad'}
+
+SISTEM_EXPORT = {
+    'title': 'LAPORAN DATA SISTEM',
+    'sheet': 'Data Sistem',
+    'filename': 'data_sistem',
+    'list_endpoint': 'list_sistem',
+    'query': """
+        SELECT s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem,
+               s.jml_lembar, s.status, s.no_urut
+        FROM tabel_sistem s
+        JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis""",
+    'search': [
+        "s.id_sistem ILIKE %s",
+        "s.tahun::text ILIKE %s",
+        "s.id_jenis = ANY(ARRAY(SELECT id_jenis FROM ref_jenis_sistem WHERE jenis ILIKE %s))",
+        "s.no_sistem ILIKE %s",
+        "s.nama_sistem ILIKE %s",
+    ],
+    'sort': {
+        'id_sistem': 's.id_sistem',
+        'tahun': 's.tahun',
+        'jenis': 'j.jenis',
+        'no_sistem': 's.no_sistem',
+        'nama_sistem': 's.nama_sistem',
+        'jml_lembar': 's.jml_lembar',
+        'status': 's.status',
+        'no_urut': 's.no_urut'
+    },
+    'default_sort': 'id_sistem',
+    'columns': [
+        export_column("ID Sistem", 0, 0.1, 50, align='CENTER'),
+        export_column("Tahun", 1, 0.07, 40, align='CENTER'),
+        export_column("Jenis Sistem", 2, 0.15, 60),
+        export_column("Nomor Sistem", 3, 0.15, 70),
+        export_column("Nama Sistem", 4, 0.2, 80),
+        export_column("Jml Lembar", 5, 0.08, 40, align='CENTER'),
+        export_column("Status", lambda row: SISTEM_STATUS_LABELS.get(row[6], row[6]), 0.1, 50, align='CENTER',
+                      highlight=lambda row: SISTEM_STATUS_HIGHLIGHTS.get(row[6])),
+        export_column("No Urut", 7, 0.1, 40, align='CENTER'),
+    ],
+}
+
 @app.route('/sistem/export/pdf')
 def export_sistem_pdf():
     if 'user_id' not in session or session.get('role') != 0:  # Admin only
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_sistem')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_sistem': 's.id_sistem',
-            'tahun': 's.tahun',
-            'jenis': 'j.jenis',
-            'no_sistem': 's.no_sistem',
-            'nama_sistem': 's.nama_sistem',
-            'jml_lembar': 's.jml_lembar',
-            'status': 's.status',
-            'no_urut': 's.no_urut'
-        }
-        sort_column = valid_columns.get(sort_column, 's.id_sistem')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem,
-                   s.jml_lembar, s.status, s.no_urut
-            FROM tabel_sistem s
-            JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis
-            WHERE (s.id_sistem ILIKE %s OR
-                  s.tahun::text ILIKE %s OR
-                  j.jenis ILIKE %s OR
-                  s.no_sistem ILIKE %s OR
-                  s.nama_sistem ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        sistem_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 orientation (portrait)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,  # Changed from landscape(letter) to A4
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA SISTEM", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "ID Sistem", 
-            "Tahun", 
-            "Jenis Sistem", 
-            "Nomor Sistem", 
-            "Nama Sistem",
-            "Jml Lembar",
-            "Status",
-            "No Urut"
-        ]
-        data.append(headers)
-        
-        # Status mapping for display
-        status_map = {
-            0: "Belum Berlaku",
-            1: "Sedang Berlaku",
-            2: "Tidak Berlaku"
-        }
-        
-        for idx, item in enumerate(sistem_list, 1):
-            row = [
-                str(idx),
-                item[0] or '-',
-                str(item[1]) if item[1] is not None else '-',
-                item[2] or '-',
-                item[3] or '-',
-                item[4] or '-',
-                str(item[5]) if item[5] is not None else '-',
-                status_map.get(item[6], str(item[6])) if item[6] is not None else '-',
-                str(item[7]) if item[7] is not None else '-'
-            ]
-            data.append(row)
-        
-        # Calculate available width (subtract margins)
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution (adjust these ratios as needed)
-        col_ratios = [0.05, 0.1, 0.07, 0.15, 0.15, 0.2, 0.08, 0.1, 0.1]  # Sum should be 1.0
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [30, 50, 40, 60, 70, 80, 40, 50, 40]  # Minimum widths in points
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 8),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 8),
-            ('LEADING', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'CENTER'),    # ID Sistem centered
-            ('ALIGN', (2,0), (2,-1), 'CENTER'),    # Tahun centered
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Jenis Sistem left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # Nomor Sistem left-aligned
-            ('ALIGN', (5,0), (5,-1), 'LEFT'),      # Nama Sistem left-aligned
-            ('ALIGN', (6,0), (6,-1), 'CENTER'),    # Jml Lembar centered
-            ('ALIGN', (7,0), (7,-1), 'CENTER'),    # Status centered
-            ('ALIGN', (8,0), (8,-1), 'CENTER')     # No Urut centered
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_sistem_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_sistem'))
+    return export_response(SISTEM_EXPORT, 'pdf')
 
 @app.route('/sistem/export/excel')
 def export_sistem_excel():
     if 'user_id' not in session or session.get('role') != 0:  # Admin only
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_sistem')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_sistem': 's.id_sistem',
-            'tahun': 's.tahun',
-            'jenis': 'j.jenis',
-            'no_sistem': 's.no_sistem',
-            'nama_sistem': 's.nama_sistem',
-            'jml_lembar': 's.jml_lembar',
-            'status': 's.status',
-            'no_urut': 's.no_urut'
-        }
-        sort_column = valid_columns.get(sort_column, 's.id_sistem')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem,
-                   s.jml_lembar, s.status, s.no_urut
-            FROM tabel_sistem s
-            JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis
-            WHERE (s.id_sistem ILIKE %s OR
-                  s.tahun::text ILIKE %s OR
-                  j.jenis ILIKE %s OR
-                  s.no_sistem ILIKE %s OR
-                  s.nama_sistem ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
+    return export_response(SISTEM_EXPORT, 'xlsx')
 
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
+@app.route('/sistem/export/csv')
+def export_sistem_csv():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return csv_export_response(SISTEM_EXPORT)
 
-        # Execute query to get all data
-        sistem_list = execute_query(query, params, fetch=True) or []
+@app.route('/sistem/export/parquet')
+def export_sistem_parquet():
+    if 'user_id' not in session or session.get('role') != 0:  # Admin only
+        return redirect(url_for('login'))
+    return parquet_export_response(SISTEM_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Sistem")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        # Status format colors
-        status_format0 = workbook.add_format({
-            'border': 1,
-            'bg_color': '#CCCCCC',  # Gray for Belum Berlaku
-            'align': 'center'
-        })
-        
-        status_format1 = workbook.add_format({
-            'border': 1,
-            'bg_color': '#C6EFCE',  # Green for Sedang Berlaku
-            'align': 'center'
-        })
-        
-        status_format2 = workbook.add_format({
-            'border': 1,
-            'bg_color': '#FFC7CE',  # Red for Tidak Berlaku
-            'align': 'center'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:I1', 'LAPORAN DATA SISTEM', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "ID Sistem", 
-            "Tahun", 
-            "Jenis Sistem", 
-            "Nomor Sistem", 
-            "Nama Sistem",
-            "Jml Lembar",
-            "Status",
-            "No Urut"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Status mapping for display
-        status_map = {
-            0: "Belum Berlaku",
-            1: "Sedang Berlaku",
-            2: "Tidak Berlaku"
-        }
-        
-        # Write data
-        for idx, item in enumerate(sistem_list, 1):
-            # Write each cell with appropriate format
-            worksheet.write(current_row, 0, idx, center_format)  # No
-            
-            # ID Sistem
-            worksheet.write(current_row, 1, item[0] or '-', center_format)
-            
-            # Tahun
-            worksheet.write(current_row, 2, str(item[1]) if item[1] is not None else '-', center_format)
-            
-            # Jenis Sistem
-            worksheet.write(current_row, 3, item[2] or '-', data_format)
-            
-            # Nomor Sistem
-            worksheet.write(current_row, 4, item[3] or '-', data_format)
-            
-            # Nama Sistem
-            worksheet.write(current_row, 5, item[4] or '-', data_format)
-            
-            # Jml Lembar
-            worksheet.write(current_row, 6, str(item[5]) if item[5] is not None else '-', center_format)
-            
-            # Status with conditional formatting
-            status_value = item[6]
-            status_text = status_map.get(status_value, str(status_value)) if status_value is not None else '-'
-            
-            if status_value == 0:
-                worksheet.write(current_row, 7, status_text, status_format0)
-            elif status_value == 1:
-                worksheet.write(current_row, 7, status_text, status_format1)
-            elif status_value == 2:
-                worksheet.write(current_row, 7, status_text, status_format2)
-            else:
-                worksheet.write(current_row, 7, status_text, center_format)
-            
-            # No Urut
-            worksheet.write(current_row, 8, str(item[7]) if item[7] is not None else '-', center_format)
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [
-            ("No", 5),
-            ("ID Sistem", 10),
-            ("Tahun", 8),
-            ("Jenis Sistem", 20),
-            ("Nomor Sistem", 15),
-            ("Nama Sistem", 30),
-            ("Jml Lembar", 10),
-            ("Status", 15),
-            ("No Urut", 10)
-        ]
-        
-        for i, (header, default_width) in enumerate(col_widths):
-            max_length = len(header)
-            for row in sistem_list:
-                if i == 0:  # No column
-                    val_length = len(str(idx))
-                elif i == 1:  # ID Sistem
-                    val_length = len(str(row[0] or ''))
-                elif i == 2:  # Tahun
-                    val_length = len(str(row[1] or ''))
-                elif i == 3:  # Jenis Sistem
-                    val_length = len(str(row[2] or ''))
-                elif i == 4:  # Nomor Sistem
-                    val_length = len(str(row[3] or ''))
-                elif i == 5:  # Nama Sistem
-                    val_length = len(str(row[4] or ''))
-                elif i == 6:  # Jml Lembar
-                    val_length = len(str(row[5] or ''))
-                elif i == 7:  # Status
-                    status_text = status_map.get(row[6], str(row[6])) if row[6] is not None else '-'
-                    val_length = len(status_text)
-                elif i == 8:  # No Urut
-                    val_length = len(str(row[7] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_sistem_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_sistem'))
-        
 @app.route('/sistem')
 def list_sistem():
     if 'user_id' not in session or session.get('role') != 0:  # Admin only
@@ -7310,7 +5916,7 @@ def list_sistem():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'id_sistem')
+    sort_by = request.args.get('sort', 'id_sistem')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -7324,52 +5930,38 @@ def list_sistem():
         'status': 's.status',
         'no_urut': 's.no_urut'
     }
-    sort_column = valid_columns.get(sort_column, 's.id_sistem')
+    if sort_by not in valid_columns:
+        sort_by = 'id_sistem'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = """
-        SELECT s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem,
-               s.jml_lembar, s.status, s.no_urut,
-               s.user_input, s.date_input, s.user_update, s.date_update
-        FROM tabel_sistem s
-        JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis
-        WHERE (s.id_sistem ILIKE %s OR
-              s.tahun::text ILIKE %s OR
-              j.jenis ILIKE %s OR
-              s.no_sistem ILIKE %s OR
-              s.nama_sistem ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem, " +
-        "s.jml_lembar, s.status, s.no_urut, s.user_input, s.date_input, " +
-        "s.user_update, s.date_update", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count
-    try:
-        count_result = execute_query(count_query, params, fetch_one=True)
-        total = int(count_result[0]) if count_result and count_result[0] else 0
-    except (ValueError, TypeError):
-        total = 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    sistem_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""s.id_sistem ILIKE %s OR
+                      s.tahun::text ILIKE %s OR
+                      s.id_jenis = ANY(ARRAY(SELECT id_jenis FROM ref_jenis_sistem WHERE jenis ILIKE %s)) OR
+                      s.no_sistem ILIKE %s OR
+                      s.nama_sistem ILIKE %s""")
+        params.extend([search_param] * 5)
+
+    # Fetch the page and the total in one round-trip
+    sistem_list, total, total_estimated = fetch_list_page(
+        select="""s.id_sistem, s.tahun, j.jenis, s.no_sistem, s.nama_sistem,
+                  s.jml_lembar, s.status, s.no_urut,
+                  s.user_input, s.date_input, s.user_update, s.date_update""",
+        from_clause="tabel_sistem s JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('sistem', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -7379,8 +5971,9 @@ def list_sistem():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('s.', ''),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/sistem/create', methods=['GET', 'POST'])
@@ -7398,16 +5991,8 @@ def create_sistem():
         try:
             form_data = request.form
             
-            # Generate ID_SISTEM
-            last_id = execute_query(
-                "SELECT id_sistem FROM tabel_sistem ORDER BY id_sistem DESC LIMIT 1",
-                fetch_one=True
-            )
-            new_id = f"S{(int(last_id[0][1:]) + 1):04d}" if last_id else "S0001"
-
             # Prepare data
             data = (
-                new_id,
                 int(form_data.get('tahun')) if form_data.get('tahun') else None,
                 form_data.get('id_jenis', '').strip(),
                 form_data.get('no_sistem', '').strip(),
@@ -7420,7 +6005,7 @@ def create_sistem():
             )
 
             # Validasi required fields
-            if not data[1] or not data[2] or not data[3]:
+            if not data[0] or not data[1] or not data[2]:
                 flash('Tahun, Jenis Sistem, dan Nomor Sistem wajib diisi', 'error')
                 return render_template('sistem/create.html', 
                                     jenis_list=jenis_list,
@@ -7428,14 +6013,16 @@ def create_sistem():
                                     status_options=[(0, 'Belum Berlaku'), (1, 'Sedang Berlaku'), (2, 'Tidak Berlaku')])
 
             # Execute query
-            success = execute_query("""
+            # ID_SISTEM (S0001 format) is allocated by the INSERT
+            success = execute_query(f"""
                 INSERT INTO tabel_sistem 
                 (id_sistem, tahun, id_jenis, no_sistem, nama_sistem, jml_lembar, 
                  status, no_urut, user_input, user_update)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                VALUES ({next_id_sql('sistem')}, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, data, commit=True)
             
             if success:
+                invalidate_entity('sistem')
                 flash('Data berhasil ditambahkan', 'success')
                 return redirect(url_for('list_sistem'))
             else:
@@ -7522,6 +6109,7 @@ def edit_sistem(id_sistem):
             """, data, commit=True)
             
             if success:
+                invalidate_entity('sistem')
                 flash('Data Sistem berhasil diperbarui', 'success')
                 return redirect(url_for('list_sistem'))
             else:
@@ -7551,6 +6139,7 @@ def delete_sistem(id_sistem):
         )
         
         if success:
+            invalidate_entity('sistem')
             flash('Data Sistem berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data Sistem', 'error')
@@ -7564,445 +6153,79 @@ def delete_sistem(id_sistem):
 # ALKOM CRUD ROUTES
 # ==============================================
 
+ALKOM_EXPORT = {
+    'title': 'LAPORAN DATA ALKOM',
+    'sheet': 'Data Alkom',
+    'filename': 'data_alkom',
+    'list_endpoint': 'list_alkom',
+    'query': """
+        SELECT a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit,
+               a.status_alkom, a.fasilitas_internet, a.status_langganan,
+               a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan,
+               a.no_bmn, r.trigram as id_pwk, r.nama_perwakilan
+        FROM tabel_Alkom a
+        LEFT JOIN ref_perwakilan r ON a.perwakilan = r.trigram""",
+    'search': [
+        "a.provider ILIKE %s",
+        "a.jenis_telpon_satelit ILIKE %s",
+        "a.nomor_telp_satelit ILIKE %s",
+        "a.perwakilan = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+        "a.pengadaan ILIKE %s",
+        "a.no_bmn ILIKE %s",
+    ],
+    'sort': {
+        'no': 'a.no',
+        'perwakilan': 'r.nama_perwakilan',
+        'provider': 'a.provider',
+        'jenis_telpon_satelit': 'a.jenis_telpon_satelit',
+        'status_alkom': 'a.status_alkom',
+        'tahun_pengadaan': 'a.tahun_pengadaan'
+    },
+    'default_sort': 'no',
+    'columns': [
+        export_column("Perwakilan", 13, 0.12, 40, admin_only=True),
+        export_column("Provider", 1, 0.12, 40),
+        export_column("Jenis Telpon Satelit", 2, 0.12, 40),
+        export_column("Nomor Telp", 3, 0.1, 40),
+        export_column("Status", 4, 0.08, 30,
+                      highlight=lambda row: 'good' if row[4] == 'aktif' else 'bad'),
+        export_column("Fasilitas Internet", 5, 0.1, 40),
+        # Procurement and BMN registration are printed over two lines in the PDF
+        export_column("Pengadaan", lambda row: f"{row[7] or '-'}\n{row[8] or ''}", 0.12, 50,
+                      align='CENTER', only='pdf'),
+        export_column("Pengadaan (Tahun)", lambda row: f"{row[7] or '-'} ({row[8] or ''})", 0.12, 50,
+                      only='xlsx'),
+        export_column("Pencatatan BMN", lambda row: f"{row[9] or '-'}\n{row[10] or ''}", 0.12, 50,
+                      align='CENTER', only='pdf'),
+        export_column("Pencatatan BMN (Tahun)", lambda row: f"{row[9] or '-'} ({row[10] or ''})", 0.12, 50,
+                      only='xlsx'),
+        export_column("No. BMN", 11, 0.07, 30),
+    ],
+}
+
 @app.route('/alkom/export/pdf')
 def export_alkom_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'a.no',
-            'perwakilan': 'r.nama_perwakilan',
-            'provider': 'a.provider',
-            'jenis_telpon_satelit': 'a.jenis_telpon_satelit',
-            'status_alkom': 'a.status_alkom',
-            'tahun_pengadaan': 'a.tahun_pengadaan'
-        }
-        sort_column = valid_columns.get(sort_column, 'a.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit,
-                   a.status_alkom, a.fasilitas_internet, a.status_langganan,
-                   a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan,
-                   a.no_bmn, r.trigram as id_pwk, r.nama_perwakilan
-            FROM tabel_Alkom a
-            LEFT JOIN ref_perwakilan r ON a.perwakilan = r.trigram
-            WHERE (a.provider ILIKE %s OR
-                  a.jenis_telpon_satelit ILIKE %s OR
-                  a.nomor_telp_satelit ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  a.pengadaan ILIKE %s OR
-                  a.no_bmn ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(6)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND a.perwakilan = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        alkom_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,  # Changed to A4
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA ALKOM", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No",
-            "Perwakilan" if session.get('role') == 0 else None,
-            "Provider",
-            "Jenis Telpon Satelit",
-            "Nomor Telp",
-            "Status",
-            "Fasilitas Internet",
-            "Pengadaan",
-            "Pencatatan BMN",
-            "No. BMN"
-        ]
-        # Filter out None values (for non-admin users)
-        headers = [h for h in headers if h is not None]
-        data.append(headers)
-        
-        for idx, item in enumerate(alkom_list, 1):
-            row = [
-                str(idx),
-                item[13] if session.get('role') == 0 else None,  # Perwakilan
-                item[1] or '-',   # Provider
-                item[2] or '-',   # Jenis Telpon Satelit
-                item[3] or '-',   # Nomor Telp
-                item[4] or '-',   # Status
-                item[5] or '-',   # Fasilitas Internet
-                f"{item[7] or '-'}\n{item[8] or ''}",  # Pengadaan + Tahun
-                f"{item[9] or '-'}\n{item[10] or ''}",  # Pencatatan BMN + Tahun
-                item[11] or '-'   # No BMN
-            ]
-            # Filter out None values (for non-admin users)
-            row = [r for r in row if r is not None]
-            data.append(row)
-        
-        # Calculate available width using A4 width
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution - adjusted ratios for better fit
-        if session.get('role') == 0:  # Admin
-            col_ratios = [0.05, 0.12, 0.12, 0.12, 0.1, 0.08, 0.1, 0.12, 0.12, 0.07]
-        else:  # Non-admin
-            col_ratios = [0.05, 0.15, 0.15, 0.1, 0.08, 0.12, 0.15, 0.12, 0.08]
-        
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths - reduced to prevent overflow
-        if session.get('role') == 0:  # Admin
-            min_widths = [25, 40, 40, 40, 40, 30, 40, 50, 50, 30]
-        else:  # Non-admin
-            min_widths = [25, 40, 40, 40, 30, 40, 50, 50, 30]
-            
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table with adjusted column widths
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style with adjusted font size and padding
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 7),  # Reduced font size
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 4),  # Reduced padding
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 7),  # Reduced font size
-            ('LEADING', (0,0), (-1,-1), 8),   # Reduced leading
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),
-            ('ALIGN', (-4,0), (-4,-1), 'CENTER'),
-            ('ALIGN', (-3,0), (-3,-1), 'CENTER'),
-            ('ALIGN', (-1,0), (-1,-1), 'LEFT'),
-            
-            # Cell padding
-            ('TOPPADDING', (0,0), (-1,-1), 2),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-            ('LEFTPADDING', (0,0), (-1,-1), 3),
-            ('RIGHTPADDING', (0,0), (-1,-1), 3)
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_alkom_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_alkom'))
+    return export_response(ALKOM_EXPORT, 'pdf')
 
 @app.route('/alkom/export/excel')
 def export_alkom_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'no')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'no': 'a.no',
-            'perwakilan': 'r.nama_perwakilan',
-            'provider': 'a.provider',
-            'jenis_telpon_satelit': 'a.jenis_telpon_satelit',
-            'status_alkom': 'a.status_alkom',
-            'tahun_pengadaan': 'a.tahun_pengadaan'
-        }
-        sort_column = valid_columns.get(sort_column, 'a.no')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit,
-                   a.status_alkom, a.fasilitas_internet, a.status_langganan,
-                   a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan,
-                   a.no_bmn, r.trigram as id_pwk, r.nama_perwakilan
-            FROM tabel_Alkom a
-            LEFT JOIN ref_perwakilan r ON a.perwakilan = r.trigram
-            WHERE (a.provider ILIKE %s OR
-                  a.jenis_telpon_satelit ILIKE %s OR
-                  a.nomor_telp_satelit ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  a.pengadaan ILIKE %s OR
-                  a.no_bmn ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(6)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND a.perwakilan = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        alkom_list = execute_query(query, params, fetch=True) or []
+    return export_response(ALKOM_EXPORT, 'xlsx')
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Alkom")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        status_active_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'bg_color': '#C6EFCE',  # Light green
-            'font_color': '#006100'  # Dark green
-        })
-        
-        status_inactive_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top',
-            'bg_color': '#FFC7CE',  # Light red
-            'font_color': '#9C0006'  # Dark red
-        })
-        
-        # Write title and metadata
-        if session.get('role') == 0:  # Admin
-            worksheet.merge_range('A1:J1', 'LAPORAN DATA ALKOM', title_format)
-        else:
-            worksheet.merge_range('A1:I1', 'LAPORAN DATA ALKOM', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No",
-            "Perwakilan" if session.get('role') == 0 else None,
-            "Provider",
-            "Jenis Telpon Satelit",
-            "Nomor Telp",
-            "Status",
-            "Fasilitas Internet",
-            "Pengadaan (Tahun)",
-            "Pencatatan BMN (Tahun)",
-            "No. BMN"
-        ]
-        # Filter out None values (for non-admin users)
-        headers = [h for h in headers if h is not None]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(alkom_list, 1):
-            row = [
-                idx,
-                item[13] if session.get('role') == 0 else None,  # Perwakilan
-                item[1] or '-',   # Provider
-                item[2] or '-',   # Jenis Telpon Satelit
-                item[3] or '-',   # Nomor Telp
-                item[4] or '-',   # Status
-                item[5] or '-',   # Fasilitas Internet
-                f"{item[7] or '-'} ({item[8] or ''})",  # Pengadaan + Tahun
-                f"{item[9] or '-'} ({item[10] or ''})",  # Pencatatan BMN + Tahun
-                item[11] or '-'   # No BMN
-            ]
-            # Filter out None values (for non-admin users)
-            row = [r for r in row if r is not None]
-            
-            for col, value in enumerate(row):
-                if col == headers.index("Status") - (0 if session.get('role') == 0 else 1):
-                    if item[4] == 'aktif':
-                        worksheet.write(current_row, col, value, status_active_format)
-                    else:
-                        worksheet.write(current_row, col, value, status_inactive_format)
-                else:
-                    worksheet.write(current_row, col, value, data_format)
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        for i, header in enumerate(headers):
-            max_length = len(header)
-            for row in alkom_list:
-                if i == 0:  # No column
-                    val_length = len(str(row[0]))
-                elif i == 1 and session.get('role') == 0:  # Perwakilan
-                    val_length = len(str(row[13] or ''))
-                elif (i == 1 and session.get('role') != 0) or (i == 2 and session.get('role') == 0):
-                    # Provider column (shifted for non-admin)
-                    val_length = len(str(row[1] or ''))
-                elif (i == 2 and session.get('role') != 0) or (i == 3 and session.get('role') == 0):
-                    # Jenis Telpon Satelit column
-                    val_length = len(str(row[2] or ''))
-                elif (i == 3 and session.get('role') != 0) or (i == 4 and session.get('role') == 0):
-                    # Nomor Telp column
-                    val_length = len(str(row[3] or ''))
-                elif (i == 4 and session.get('role') != 0) or (i == 5 and session.get('role') == 0):
-                    # Status column
-                    val_length = len(str(row[4] or ''))
-                elif (i == 5 and session.get('role') != 0) or (i == 6 and session.get('role') == 0):
-                    # Fasilitas Internet column
-                    val_length = len(str(row[5] or ''))
-                elif (i == 6 and session.get('role') != 0) or (i == 7 and session.get('role') == 0):
-                    # Pengadaan column
-                    val_length = len(f"{row[7] or ''} {row[8] or ''}")
-                elif (i == 7 and session.get('role') != 0) or (i == 8 and session.get('role') == 0):
-                    # Pencatatan BMN column
-                    val_length = len(f"{row[9] or ''} {row[10] or ''}")
-                elif (i == 8 and session.get('role') != 0) or (i == 9 and session.get('role') == 0):
-                    # No BMN column
-                    val_length = len(str(row[11] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        # Freeze header row
-        worksheet.freeze_panes(1, 0)
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_alkom_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_alkom'))
+@app.route('/alkom/export/csv')
+def export_alkom_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(ALKOM_EXPORT)
+
+@app.route('/alkom/export/parquet')
+def export_alkom_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(ALKOM_EXPORT)
 
 @app.route('/alkom')
 def list_alkom():
@@ -8013,7 +6236,7 @@ def list_alkom():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'no')
+    sort_by = request.args.get('sort', 'no')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -8025,60 +6248,41 @@ def list_alkom():
         'status_alkom': 'a.status_alkom',
         'tahun_pengadaan': 'a.tahun_pengadaan'
     }
-    sort_column = valid_columns.get(sort_column, 'a.no')
+    if sort_by not in valid_columns:
+        sort_by = 'no'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = """
-    SELECT a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit,
-           a.status_alkom, a.fasilitas_internet, a.status_langganan,
-           a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan,
-           a.no_bmn, r.trigram as id_pwk, r.nama_perwakilan
-    FROM tabel_Alkom a
-    LEFT JOIN ref_perwakilan r ON a.perwakilan = r.trigram
-    WHERE (a.provider ILIKE %s OR
-          a.jenis_telpon_satelit ILIKE %s OR
-          a.nomor_telp_satelit ILIKE %s OR
-          r.nama_perwakilan ILIKE %s OR
-          a.pengadaan ILIKE %s OR
-          a.no_bmn ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-    params = [search_param for _ in range(6)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND a.perwakilan = %s"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit, " +
-        "a.status_alkom, a.fasilitas_internet, a.status_langganan, " +
-        "a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan, " +
-        "r.trigram as id_pwk, r.nama_perwakilan", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]  # Remove ORDER BY for count query
-
-    # Get total count
-    count_result = execute_query(count_query, params, fetch_one=True)
-    total = count_result[0] if count_result else 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    alkom_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""a.provider ILIKE %s OR
+                   a.jenis_telpon_satelit ILIKE %s OR
+                   a.nomor_telp_satelit ILIKE %s OR
+                   a.perwakilan = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s)) OR
+                   a.pengadaan ILIKE %s OR
+                   a.no_bmn ILIKE %s""")
+        params.extend([search_param] * 6)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page and the total in one round-trip
+    alkom_list, total, total_estimated = fetch_list_page(
+        select="""a.no, a.provider, a.jenis_telpon_satelit, a.nomor_telp_satelit,
+                  a.status_alkom, a.fasilitas_internet, a.status_langganan,
+                  a.pengadaan, a.tahun_pengadaan, a.pencatatan_BMN, a.tahun_pencatatan,
+                  a.no_bmn, r.trigram as id_pwk, r.nama_perwakilan""",
+        from_clause="tabel_Alkom a LEFT JOIN ref_perwakilan r ON a.perwakilan = r.trigram",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('alkom', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -8088,8 +6292,9 @@ def list_alkom():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('a.', ''),
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/alkom/create', methods=['GET', 'POST'])
@@ -8098,17 +6303,7 @@ def create_alkom():
         return redirect(url_for('login'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -8116,7 +6311,7 @@ def create_alkom():
             
             # Prepare data
             data = (
-                form_data.get('perwakilan', '').strip().upper(),
+                normalize_trigram(form_data.get('perwakilan')),
                 form_data.get('provider', '').strip(),
                 form_data.get('jenis_telpon_satelit', '').strip(),
                 form_data.get('nomor_telp_satelit', '').strip(),
@@ -8165,6 +6360,7 @@ def create_alkom():
             """, data, commit=True)
             
             if success:
+                invalidate_entity('alkom')
                 flash('Data Alkom berhasil ditambahkan', 'success')
                 return redirect(url_for('list_alkom'))
             else:
@@ -8211,17 +6407,7 @@ def edit_alkom(no):
             return redirect(url_for('list_alkom'))
 
     # Get perwakilan list based on user role
-    if session.get('role') == 0:  # Admin
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-            fetch=True
-        ) or []
-    else:  # Regular user
-        perwakilan_list = execute_query(
-            "SELECT trigram, nama_perwakilan FROM ref_perwakilan WHERE trigram = %s",
-            (session.get('trigram'),),
-            fetch=True
-        ) or []
+    perwakilan_list = perwakilan_options()
 
     if request.method == 'POST':
         try:
@@ -8230,7 +6416,7 @@ def edit_alkom(no):
             
             # Prepare data tuple with proper null handling
             data = (
-                form_data.get('perwakilan', '').strip().upper(),
+                normalize_trigram(form_data.get('perwakilan')),
                 form_data.get('provider', '').strip(),
                 form_data.get('jenis_telpon_satelit', '').strip(),
                 form_data.get('nomor_telp_satelit', '').strip(),
@@ -8277,6 +6463,7 @@ def edit_alkom(no):
             """, data, commit=True)
             
             if success:
+                invalidate_entity('alkom')
                 flash('Data Alkom berhasil diperbarui', 'success')
                 return redirect(url_for('list_alkom'))
             else:
@@ -8322,6 +6509,7 @@ def delete_alkom(no):
         )
         
         if success:
+            invalidate_entity('alkom')
             flash('Data Alkom berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data Alkom', 'error')
@@ -8356,36 +6544,25 @@ def list_tipe_palsan():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query
-    query = """
-        SELECT id_tipe, nama 
-        FROM tipe_palsan
-        WHERE (id_tipe ILIKE %s OR 
-              nama ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param, search_param]
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT id_tipe, nama", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]
-
-    # Get total count
-    count_result = execute_query(count_query, params, fetch_one=True)
-    total = int(count_result[0]) if count_result and count_result[0] else 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    tipe_palsan_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("id_tipe ILIKE %s OR nama ILIKE %s")
+        params.extend([search_param] * 2)
+
+    # Fetch the page and the total in one round-trip
+    tipe_palsan_list, total, total_estimated = fetch_list_page(
+        select="id_tipe, nama",
+        from_clause="tipe_palsan",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('tipe_palsan', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -8395,6 +6572,7 @@ def list_tipe_palsan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -8414,19 +6592,17 @@ def create_tipe_palsan():
                 return render_template('tipe_palsan/create.html', 
                                     form_data=request.form)
 
-            # Generate ID otomatis
-            id_tipe = generate_tipe_palsan_id()
-
-            # Insert with user tracking
+            # Insert with user tracking; the ID (P0001 format) is allocated by the INSERT
             success = execute_query(
-                """INSERT INTO tipe_palsan 
+                f"""INSERT INTO tipe_palsan 
                    (id_tipe, nama, user_input, user_update) 
-                   VALUES (%s, %s, %s, %s)""",
-                (id_tipe, nama, session.get('user_id'), session.get('user_id')),
+                   VALUES ({next_id_sql('tipe_palsan')}, %s, %s, %s)""",
+                (nama, session.get('user_id'), session.get('user_id')),
                 commit=True
             )
             
             if success:
+                invalidate_entity('tipe_palsan')
                 flash('Tipe Palsan berhasil ditambahkan', 'success')
                 return redirect(url_for('list_tipe_palsan'))
             else:
@@ -8474,6 +6650,7 @@ def edit_tipe_palsan(id_tipe):
             )
             
             if success:
+                invalidate_entity('tipe_palsan')
                 flash('Tipe Palsan berhasil diperbarui', 'success')
                 return redirect(url_for('list_tipe_palsan'))
             else:
@@ -8509,6 +6686,7 @@ def delete_tipe_palsan(id_tipe):
         )
         
         if success:
+            invalidate_entity('tipe_palsan')
             flash('Tipe Palsan berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus Tipe Palsan', 'error')
@@ -8521,393 +6699,68 @@ def delete_tipe_palsan(id_tipe):
 # ===========================================
 # PALSAN CRUD ROUTES
 # ===========================================
+PALSAN_EXPORT = {
+    'title': 'LAPORAN DATA PALSAN',
+    'sheet': 'Data Palsan',
+    'filename': 'data_palsan',
+    'list_endpoint': 'list_palsan',
+    'query': """
+        SELECT p.id_palsan, p.serial_number, p.status,
+               p.id_pwk, r.nama_perwakilan,
+               p.id_tipe, t.nama as tipe_palsan,
+               p.pengadaan, p.tahun_pengadaan,
+               p.pencatatan, p.tahun_pencatatan
+        FROM tabel_palsan p
+        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
+        LEFT JOIN tipe_palsan t ON p.id_tipe = t.id_tipe""",
+    'search': [
+        "p.id_palsan ILIKE %s",
+        "p.serial_number ILIKE %s",
+        "p.status ILIKE %s",
+        "p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s))",
+        "p.id_tipe = ANY(ARRAY(SELECT id_tipe FROM tipe_palsan WHERE nama ILIKE %s))",
+    ],
+    'sort': {
+        'id_palsan': 'p.id_palsan',
+        'serial_number': 'p.serial_number',
+        'status': 'p.status',
+        'perwakilan': 'r.nama_perwakilan',
+        'tipe': 't.nama'
+    },
+    'default_sort': 'id_palsan',
+    'columns': [
+        export_column("ID Palsan", 0, 0.1, 50, align='CENTER'),
+        export_column("Perwakilan", 4, 0.2, 80),
+        export_column("Serial Number", 1, 0.15, 70),
+        export_column("Tipe Palsan", 6, 0.2, 80),
+        export_column("Status", 2, 0.15, 60, align='CENTER'),
+        export_column("Tahun Pengadaan", 8, 0.15, 60, align='CENTER'),
+    ],
+}
+
 @app.route('/palsan/export/pdf')
 def export_palsan_pdf():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_palsan')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_palsan': 'p.id_palsan',
-            'serial_number': 'p.serial_number',
-            'status': 'p.status',
-            'perwakilan': 'r.nama_perwakilan',
-            'tipe': 't.nama'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.id_palsan')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.id_palsan, p.serial_number, p.status, 
-                   p.id_pwk, r.nama_perwakilan,
-                   p.id_tipe, t.nama as tipe_palsan,
-                   p.pengadaan, p.tahun_pengadaan,
-                   p.pencatatan, p.tahun_pencatatan
-            FROM tabel_palsan p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            LEFT JOIN tipe_palsan t ON p.id_tipe = t.id_tipe
-            WHERE (p.id_palsan ILIKE %s OR 
-                  p.serial_number ILIKE %s OR
-                  p.status ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  t.nama ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
-
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        palsan_list = execute_query(query, params, fetch=True) or []
-
-        # Create PDF with A4 size (portrait orientation)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, 
-                              pagesize=A4,  # Changed to A4
-                              leftMargin=15,
-                              rightMargin=15,
-                              topMargin=20,
-                              bottomMargin=20)
-        elements = []
-        
-        # Styles configuration
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Title'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        # Metadata style
-        meta_style = ParagraphStyle(
-            'Meta',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6
-        )
-        
-        # Add title
-        elements.append(Paragraph("LAPORAN DATA PALSAN", title_style))
-        
-        # Add metadata
-        metadata = [
-            f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
-        ]
-        if search:
-            metadata.insert(0, f"Filter: {search}")
-        
-        for meta in metadata:
-            elements.append(Paragraph(meta, meta_style))
-        
-        # Prepare table data
-        data = []
-        headers = [
-            "No", 
-            "ID Palsan", 
-            "Perwakilan", 
-            "Serial Number", 
-            "Tipe Palsan", 
-            "Status",
-            "Tahun Pengadaan"
-        ]
-        data.append(headers)
-        
-        for idx, item in enumerate(palsan_list, 1):
-            row = [
-                str(idx),
-                item[0] or '-',
-                item[4] or '-',
-                item[1] or '-',
-                item[6] or '-',
-                item[2] or '-',
-                item[8] or '-'
-            ]
-            data.append(row)
-        
-        # Calculate available width (using A4 width)
-        available_width = A4[0] - doc.leftMargin - doc.rightMargin
-        
-        # Define column distribution (adjust these ratios as needed)
-        col_ratios = [0.05, 0.1, 0.2, 0.15, 0.2, 0.15, 0.15]  # Sum should be 1.0
-        col_widths = [available_width * ratio for ratio in col_ratios]
-        
-        # Ensure minimum widths
-        min_widths = [30, 50, 80, 70, 80, 60, 60]  # Minimum widths in points
-        col_widths = [max(w, min_w) for w, min_w in zip(col_widths, min_widths)]
-        
-        # Create table
-        table = Table(data, 
-                     colWidths=col_widths,
-                     repeatRows=1,
-                     hAlign='LEFT')
-        
-        # Table style
-        style = TableStyle([
-            # Header style
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 8),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            
-            # Cell style
-            ('FONTSIZE', (0,1), (-1,-1), 8),
-            ('LEADING', (0,0), (-1,-1), 9),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('WORDWRAP', (0,0), (-1,-1), True),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.whitesmoke]),
-            
-            # Specific column alignments
-            ('ALIGN', (0,0), (0,-1), 'CENTER'),    # No column centered
-            ('ALIGN', (1,0), (1,-1), 'CENTER'),    # ID Palsan centered
-            ('ALIGN', (2,0), (2,-1), 'LEFT'),      # Perwakilan left-aligned
-            ('ALIGN', (3,0), (3,-1), 'LEFT'),      # Serial Number left-aligned
-            ('ALIGN', (4,0), (4,-1), 'LEFT'),      # Tipe Palsan left-aligned
-            ('ALIGN', (5,0), (5,-1), 'CENTER'),    # Status centered
-            ('ALIGN', (6,0), (6,-1), 'CENTER')     # Tahun Pengadaan centered
-        ])
-        
-        table.setStyle(style)
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"data_palsan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
-        
-    except Exception as e:
-        print(f"PDF Export Error: {str(e)}")
-        flash('Gagal membuat PDF: ' + str(e), 'error')
-        return redirect(url_for('list_palsan'))
+    return export_response(PALSAN_EXPORT, 'pdf')
 
 @app.route('/palsan/export/excel')
 def export_palsan_excel():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    try:
-        # Get all parameters from the request
-        search = request.args.get('search', '').strip()
-        sort_column = request.args.get('sort', 'id_palsan')
-        sort_direction = request.args.get('dir', 'asc')
-
-        # Validate sort column
-        valid_columns = {
-            'id_palsan': 'p.id_palsan',
-            'serial_number': 'p.serial_number',
-            'status': 'p.status',
-            'perwakilan': 'r.nama_perwakilan',
-            'tipe': 't.nama'
-        }
-        sort_column = valid_columns.get(sort_column, 'p.id_palsan')
-        sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
-
-        # Base query with joins
-        query = """
-            SELECT p.id_palsan, p.serial_number, p.status, 
-                   p.id_pwk, r.nama_perwakilan,
-                   p.id_tipe, t.nama as tipe_palsan,
-                   p.pengadaan, p.tahun_pengadaan,
-                   p.pencatatan, p.tahun_pencatatan
-            FROM tabel_palsan p
-            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-            LEFT JOIN tipe_palsan t ON p.id_tipe = t.id_tipe
-            WHERE (p.id_palsan ILIKE %s OR 
-                  p.serial_number ILIKE %s OR
-                  p.status ILIKE %s OR
-                  r.nama_perwakilan ILIKE %s OR
-                  t.nama ILIKE %s)
-        """
-
-        # Parameters for the query
-        search_param = f'%{search}%'
-        params = [search_param for _ in range(5)]
-
-        # Add perwakilan filter for non-admin users
-        if session.get('role') != 0:  # If not admin
-            user_trigram = session.get('trigram')
-            if user_trigram:
-                query += " AND p.id_pwk = %s"
-                params.append(user_trigram)
+    return export_response(PALSAN_EXPORT, 'xlsx')
 
-        # Sort by the selected column
-        query += f" ORDER BY {sort_column} {sort_direction}"
-
-        # Execute query to get all data
-        palsan_list = execute_query(query, params, fetch=True) or []
+@app.route('/palsan/export/csv')
+def export_palsan_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return csv_export_response(PALSAN_EXPORT)
 
-        # Create Excel file in memory
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        worksheet = workbook.add_worksheet("Data Palsan")
-        
-        # Add formats
-        title_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',
-            'font_color': '#FFFFFF',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'text_wrap': True
-        })
-        
-        # Data formats
-        data_format = workbook.add_format({
-            'border': 1,
-            'text_wrap': True,
-            'valign': 'top'
-        })
-        
-        center_format = workbook.add_format({
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        # Write title and metadata
-        worksheet.merge_range('A1:G1', 'LAPORAN DATA PALSAN', title_format)
-        
-        current_row = 1
-        if search:
-            worksheet.write(current_row, 0, f"Filter: {search}", subtitle_format)
-            current_row += 1
-            
-        worksheet.write(current_row, 0, f"Tanggal Export: {datetime.now().strftime('%d-%m-%Y %H:%M')}", subtitle_format)
-        current_row += 2
-        
-        # Write headers
-        headers = [
-            "No", 
-            "ID Palsan", 
-            "Perwakilan", 
-            "Serial Number", 
-            "Tipe Palsan", 
-            "Status",
-            "Tahun Pengadaan"
-        ]
-        
-        for col, header in enumerate(headers):
-            worksheet.write(current_row, col, header, header_format)
-        
-        current_row += 1
-        
-        # Write data
-        for idx, item in enumerate(palsan_list, 1):
-            row = [
-                idx,
-                item[0] or '-',
-                item[4] or '-',
-                item[1] or '-',
-                item[6] or '-',
-                item[2] or '-',
-                item[8] or '-'
-            ]
-            
-            # Write each cell with appropriate format
-            worksheet.write(current_row, 0, row[0], center_format)  # No
-            worksheet.write(current_row, 1, row[1], center_format)  # ID Palsan
-            worksheet.write(current_row, 2, row[2], data_format)   # Perwakilan
-            worksheet.write(current_row, 3, row[3], data_format)   # Serial Number
-            worksheet.write(current_row, 4, row[4], data_format)   # Tipe Palsan
-            worksheet.write(current_row, 5, row[5], center_format) # Status
-            worksheet.write(current_row, 6, row[6], center_format) # Tahun Pengadaan
-            
-            current_row += 1
-        
-        # Auto-adjust column widths based on content
-        col_widths = [
-            ('No', 5),
-            ('ID Palsan', 15),
-            ('Perwakilan', 25),
-            ('Serial Number', 20),
-            ('Tipe Palsan', 25),
-            ('Status', 15),
-            ('Tahun Pengadaan', 15)
-        ]
-        
-        for i, (header, default_width) in enumerate(col_widths):
-            max_length = default_width
-            for row in palsan_list:
-                if i == 0:  # No column
-                    val_length = len(str(idx))
-                elif i == 1:  # ID Palsan
-                    val_length = len(str(row[0] or ''))
-                elif i == 2:  # Perwakilan
-                    val_length = len(str(row[4] or ''))
-                elif i == 3:  # Serial Number
-                    val_length = len(str(row[1] or ''))
-                elif i == 4:  # Tipe Palsan
-                    val_length = len(str(row[6] or ''))
-                elif i == 5:  # Status
-                    val_length = len(str(row[2] or ''))
-                elif i == 6:  # Tahun Pengadaan
-                    val_length = len(str(row[8] or ''))
-                
-                if val_length > max_length:
-                    max_length = val_length
-            
-            # Set column width with some padding
-            worksheet.set_column(i, i, min(max_length + 2, 50))  # Max width 50 chars
-        
-        workbook.close()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"data_palsan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-    except Exception as e:
-        print(f"Excel Export Error: {str(e)}")
-        flash('Gagal membuat Excel: ' + str(e), 'error')
-        return redirect(url_for('list_palsan'))
+@app.route('/palsan/export/parquet')
+def export_palsan_parquet():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    return parquet_export_response(PALSAN_EXPORT)
 
 @app.route('/palsan')
 def list_palsan():
@@ -8918,7 +6771,7 @@ def list_palsan():
     search = request.args.get('search', '').strip()
     page = request.args.get('page', 1, type=int)
     per_page = 20
-    sort_column = request.args.get('sort', 'id_palsan')
+    sort_by = request.args.get('sort', 'id_palsan')
     sort_direction = request.args.get('dir', 'asc')
 
     # Validate sort column
@@ -8928,63 +6781,49 @@ def list_palsan():
         'status': 'p.status',
         'perwakilan': 'r.nama_perwakilan',
         'tipe': 't.nama',
-        'dipinjamkan' : 't.dipinjamkan'
+        'dipinjamkan' : 'p.dipinjamkan'
     }
-    sort_column = valid_columns.get(sort_column, 'p.id_palsan')
+    if sort_by not in valid_columns:
+        sort_by = 'id_palsan'
+    sort_column = valid_columns[sort_by]
     
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query with joins
-    query = """
-        SELECT p.id_palsan, p.serial_number, p.status, 
-            p.id_pwk, r.nama_perwakilan,
-            p.id_tipe, t.nama as tipe_palsan,
-            p.pengadaan, p.tahun_pengadaan,
-            p.pencatatan, p.tahun_pencatatan, p.dipinjamkan
-        FROM tabel_palsan p
-        LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
-        LEFT JOIN tipe_palsan t ON p.id_tipe = t.id_tipe
-        WHERE (p.id_palsan ILIKE %s OR 
-            p.serial_number ILIKE %s OR
-            p.status ILIKE %s OR
-            r.nama_perwakilan ILIKE %s OR
-            t.nama ILIKE %s)
-    """
-
-    # Parameters for the query
-    search_param = f'%{search}%'
-    params = [search_param for _ in range(5)]
-
-    # Add perwakilan filter for non-admin users
-    if session.get('role') != 0:  # If not admin
-        user_trigram = session.get('trigram')
-        if user_trigram:
-            query += " AND p.id_pwk = %s"
-            params.append(user_trigram)
-
-    # Add sorting
-    query += f" ORDER BY {sort_column} {sort_direction}"
-
-    # Count query for pagination
-    count_query = query.replace(
-        "SELECT p.id_palsan, p.serial_number, p.status, p.id_pwk, r.nama_perwakilan, p.id_tipe, t.nama as tipe_palsan, p.pengadaan, p.tahun_pengadaan, p.pencatatan, p.tahun_pencatatan, p.dipinjamkan", 
-        "SELECT COUNT(*)"
-    ).split("ORDER BY")[0]
-
-    # Get total count - handle both integer and string results
-    count_result = execute_query(count_query, params, fetch_one=True)
-    try:
-        total = int(count_result[0]) if count_result and count_result[0] else 0
-    except (ValueError, TypeError):
-        logger.error(f"Invalid count value: {count_result[0] if count_result else 'None'}")
-        total = 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    palsan_list = execute_query(paginated_query, params, fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("""p.id_palsan ILIKE %s OR 
+                   p.serial_number ILIKE %s OR
+                   p.status ILIKE %s OR
+                   p.id_pwk = ANY(ARRAY(SELECT trigram FROM ref_perwakilan WHERE nama_perwakilan ILIKE %s)) OR
+                   p.id_tipe = ANY(ARRAY(SELECT id_tipe FROM tipe_palsan WHERE nama ILIKE %s))""")
+        params.extend([search_param] * 5)
+
+    # Non-admin users only see their perwakilan's rows (row-level security)
+    # Fetch the page, seeking from the cursor when one is given
+    palsan_list, total, total_estimated, next_cursor, prev_cursor = fetch_keyset_page(
+        select="""p.id_palsan, p.serial_number, p.status, 
+                  p.id_pwk, r.nama_perwakilan,
+                  p.id_tipe, t.nama as tipe_palsan,
+                  p.pengadaan, p.tahun_pengadaan,
+                  p.pencatatan, p.tahun_pencatatan, p.dipinjamkan""",
+        from_clause="""tabel_palsan p
+            LEFT JOIN ref_perwakilan r ON p.id_pwk = r.trigram
+            LEFT JOIN tipe_palsan t ON p.id_tipe = t.id_tipe""",
+        where=where,
+        params=params,
+        sort_expr=sort_column,
+        key_expr="p.id_palsan",
+        direction=sort_direction,
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('palsan', search),
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
     
@@ -8994,8 +6833,11 @@ def list_palsan():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
-                         sort_column=sort_column.replace('p.', ''),
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         sort_column=sort_by,
                          sort_direction=sort_direction)
 
 @app.route('/palsan/create', methods=['GET', 'POST'])
@@ -9004,15 +6846,9 @@ def create_palsan():
         return redirect(url_for('login'))
 
     # Get data untuk dropdown
-    perwakilan_list = execute_query(
-        "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-        fetch=True
-    ) or []
+    perwakilan_list = get_reference('perwakilan')
     
-    tipe_palsan_list = execute_query(
-        "SELECT id_tipe, nama FROM tipe_palsan ORDER BY nama",
-        fetch=True
-    ) or []
+    tipe_palsan_list = get_reference('tipe_palsan')
 
     if request.method == 'POST':
         try:
@@ -9020,8 +6856,7 @@ def create_palsan():
             form_data = request.form
             
             data = (
-                generate_palsan_id(),
-                form_data.get('id_pwk', '').strip(),
+                normalize_trigram(form_data.get('id_pwk')),
                 form_data.get('id_tipe', '').strip(),
                 form_data.get('serial_number', '').strip(),
                 form_data.get('pengadaan', '').strip() or None,
@@ -9034,25 +6869,26 @@ def create_palsan():
             )
 
             # Validasi required fields
-            if not data[1] or not data[2] or not data[3]:
+            if not data[0] or not data[1] or not data[2]:
                 flash('Perwakilan, Tipe Palsan, dan Serial Number wajib diisi', 'error')
                 return render_template('palsan/create.html',
                                     form_data=request.form,
                                     perwakilan_list=perwakilan_list,
                                     tipe_palsan_list=tipe_palsan_list)
 
-            # Insert data
+            # Insert data; the ID (PL001 format) is allocated by the INSERT
             success = execute_query(
-                """INSERT INTO tabel_palsan 
+                f"""INSERT INTO tabel_palsan 
                    (id_palsan, id_pwk, id_tipe, serial_number, 
                     pengadaan, tahun_pengadaan, pencatatan, tahun_pencatatan,
                     status, user_input, user_update) 
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                   VALUES ({next_id_sql('palsan')}, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
                 data,
                 commit=True
             )
             
             if success:
+                invalidate_entity('palsan')
                 flash('Data Palsan berhasil ditambahkan', 'success')
                 return redirect(url_for('list_palsan'))
             else:
@@ -9088,15 +6924,9 @@ def edit_palsan(id_palsan):
         return redirect(url_for('list_palsan'))
 
     # Get data untuk dropdown
-    perwakilan_list = execute_query(
-        "SELECT trigram, nama_perwakilan FROM ref_perwakilan ORDER BY nama_perwakilan",
-        fetch=True
-    ) or []
+    perwakilan_list = get_reference('perwakilan')
     
-    tipe_palsan_list = execute_query(
-        "SELECT id_tipe, nama FROM tipe_palsan ORDER BY nama",
-        fetch=True
-    ) or []
+    tipe_palsan_list = get_reference('tipe_palsan')
 
     if request.method == 'POST':
         try:
@@ -9104,7 +6934,7 @@ def edit_palsan(id_palsan):
             form_data = request.form
             
             data = (
-                form_data.get('id_pwk', '').strip(),
+                normalize_trigram(form_data.get('id_pwk')),
                 form_data.get('id_tipe', '').strip(),
                 form_data.get('serial_number', '').strip(),
                 form_data.get('pengadaan', '').strip() or None,
@@ -9140,6 +6970,7 @@ def edit_palsan(id_palsan):
             )
             
             if success:
+                invalidate_entity('palsan')
                 flash('Data Palsan berhasil diperbarui', 'success')
                 return redirect(url_for('list_palsan'))
             else:
@@ -9166,22 +6997,24 @@ def delete_palsan(id_palsan):
             fetch_one=True
         )
         
-        if distributed and distributed[0] > 0:
-            # If distributed, first delete from distribusi_palsan
-            execute_query(
-                "DELETE FROM distribusi_palsan WHERE id_palsan = %s",
+        with transaction():
+            if distributed and distributed[0] > 0:
+                # If distributed, first delete from distribusi_palsan
+                execute_query(
+                    "DELETE FROM distribusi_palsan WHERE id_palsan = %s",
+                    (id_palsan,),
+                    commit=True
+                )
+            
+            # Then delete from tabel_palsan
+            success = execute_query(
+                "DELETE FROM tabel_palsan WHERE id_palsan = %s",
                 (id_palsan,),
                 commit=True
             )
         
-        # Then delete from tabel_palsan
-        success = execute_query(
-            "DELETE FROM tabel_palsan WHERE id_palsan = %s",
-            (id_palsan,),
-            commit=True
-        )
-        
         if success:
+            invalidate_entity('palsan')
             flash('Data Palsan berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data Palsan', 'error')
@@ -9278,27 +7111,30 @@ def distribusi_palsan():
                                     selected_tipe=selected_tipe,
                                     form_data=request.form)
 
-            # Update status palsan menjadi dipinjamkan
-            execute_query(
-                """UPDATE tabel_palsan 
-                   SET dipinjamkan = 1,
-                       user_update = %s,
-                       date_update = CURRENT_TIMESTAMP
-                   WHERE id_palsan = %s""",
-                (session['user_id'], id_palsan),
-                commit=True
-            )
-            
-            # Tambahkan record distribusi
-            execute_query(
-                """INSERT INTO distribusi_palsan 
-                   (id_palsan, satker_peminjam, nama_peminjam, nip_peminjam,
-                    penyerah, nip_penyerah, user_id) 
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (id_palsan, satker_peminjam, nama_peminjam, nip_peminjam,
-                 penyerah, nip_penyerah, session['user_id']),
-                commit=True
-            )
+            # Update status dan catat distribusi dalam satu transaksi
+            with transaction():
+                # Update status palsan menjadi dipinjamkan
+                execute_query(
+                    """UPDATE tabel_palsan 
+                       SET dipinjamkan = 1,
+                           user_update = %s,
+                           date_update = CURRENT_TIMESTAMP
+                       WHERE id_palsan = %s""",
+                    (session['user_id'], id_palsan),
+                    commit=True
+                )
+                
+                # Tambahkan record distribusi
+                execute_query(
+                    """INSERT INTO distribusi_palsan 
+                       (id_palsan, satker_peminjam, nama_peminjam, nip_peminjam,
+                        penyerah, nip_penyerah, user_id) 
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                    (id_palsan, satker_peminjam, nama_peminjam, nip_peminjam,
+                     penyerah, nip_penyerah, session['user_id']),
+                    commit=True
+                )
+            invalidate_entity('palsan')
             
              # Check which button was clicked
             action = request.form.get('action', 'save')
@@ -9412,31 +7248,25 @@ def list_kategori_sistem():
     # Validate sort direction
     sort_direction = 'DESC' if sort_direction.lower() == 'desc' else 'ASC'
 
-    # Base query
-    query = f"""
-        SELECT id, kategori, keterangan
-        FROM ref_kategori_sistem
-        WHERE kategori ILIKE %s OR keterangan ILIKE %s
-        ORDER BY {sort_column} {sort_direction}
-    """
-
-    # Count query for pagination
-    count_query = """
-        SELECT COUNT(*)
-        FROM ref_kategori_sistem
-        WHERE kategori ILIKE %s OR keterangan ILIKE %s
-    """
-
-    search_param = f'%{search}%'
-    
-    # Get total count
-    total = execute_query(count_query, (search_param, search_param), fetch_one=True)[0] or 0
-    
-    # Add pagination to main query
-    paginated_query = query + f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-    
-    # Execute query
-    kategori_sistem_list = execute_query(paginated_query, (search_param, search_param), fetch=True) or []
+    # Search filter
+    where = []
+    params = []
+    if search:
+        search_param = f'%{search}%'
+        where.append("kategori ILIKE %s OR keterangan ILIKE %s")
+        params.extend([search_param] * 2)
+
+    # Fetch the page and the total in one round-trip
+    kategori_sistem_list, total, total_estimated = fetch_list_page(
+        select="id, kategori, keterangan",
+        from_clause="ref_kategori_sistem",
+        where=where,
+        params=params,
+        order_by=f"{sort_column} {sort_direction}",
+        page=page,
+        per_page=per_page,
+        count_scope=list_count_scope('kategori_sistem', search)
+    )
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -9446,6 +7276,7 @@ def list_kategori_sistem():
                          page=page,
                          per_page=per_page,
                          total=total,
+                         total_estimated=total_estimated,
                          total_pages=total_pages,
                          sort_column=sort_column,
                          sort_direction=sort_direction)
@@ -9465,15 +7296,15 @@ def create_kategori_sistem():
                 return render_template('kategori_sistem/create.html', 
                                     form_data=request.form)
 
-            new_id = generate_next_kategori_id()
-
+            # The ID (K0001 format) is allocated by the INSERT
             success = execute_query(
-                "INSERT INTO ref_kategori_sistem (id, kategori, keterangan) VALUES (%s, %s, %s)",
-                (new_id, kategori, keterangan),
+                f"INSERT INTO ref_kategori_sistem (id, kategori, keterangan) VALUES ({next_id_sql('kategori_sistem')}, %s, %s)",
+                (kategori, keterangan),
                 commit=True
             )
             
             if success:
+                invalidate_entity('kategori_sistem')
                 flash('Data berhasil ditambahkan', 'success')
                 return redirect(url_for('list_kategori_sistem'))
             else:
@@ -9518,6 +7349,7 @@ def edit_kategori_sistem(id):
             """, (kategori, keterangan, id), commit=True)
             
             if success:
+                invalidate_entity('kategori_sistem')
                 flash('Data kategori sistem berhasil diperbarui', 'success')
                 return redirect(url_for('list_kategori_sistem'))
             else:
@@ -9541,6 +7373,7 @@ def delete_kategori_sistem(id):
         )
         
         if success:
+            invalidate_entity('kategori_sistem')
             flash('Data kategori sistem berhasil dihapus', 'success')
         else:
             flash('Gagal menghapus data kategori sistem', 'error')
@@ -9550,8 +7383,334 @@ def delete_kategori_sistem(id):
     
     return redirect(url_for('list_kategori_sistem'))
 # ==============================================
+# DATA SNAPSHOT
+# ==============================================
+
+# Parquet files bundled by /export/snapshot: (file name, export spec, admin only)
+SNAPSHOT_EXPORTS = (
+    ('pengguna', PENGGUNA_EXPORT, True),
+    ('perwakilan', PERWAKILAN_EXPORT, False),
+    ('kepri', KEPRI_EXPORT, False),
+    ('personel', PERSONEL_EXPORT, False),
+    ('pegawai_setempat', PEGAWAI_SETEMPAT_EXPORT, False),
+    ('pendidikan', PENDIDIKAN_EXPORT, False),
+    ('fungsional', FUNGSIONAL_EXPORT, False),
+    ('aks', AKS_EXPORT, False),
+    ('sistem', SISTEM_EXPORT, True),
+    ('alkom', ALKOM_EXPORT, False),
+    ('palsan', PALSAN_EXPORT, False),
+)
+
+@app.route('/export/snapshot')
+def export_snapshot():
+    """Every entity the user may export, as one ZIP of Parquet files"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    is_admin = session.get('role') == 0
+    try:
+        import_pyarrow()
+        # One snapshot for all files, so they are consistent with each other
+        execute_query("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_THRESHOLD)
+        # Parquet is compressed already
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as bundle:
+            for name, spec, admin_only in SNAPSHOT_EXPORTS:
+                if admin_only and not is_admin:
+                    continue
+                query, params = export_query(spec, '', None, 'asc')
+                with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_THRESHOLD) as part:
+                    write_parquet(query, params, part)
+                    part.seek(0)
+                    with bundle.open(f'{name}.parquet', 'w', force_zip64=True) as member:
+                        shutil.copyfileobj(part, member, EXPORT_CHUNK_SIZE)
+
+        return stream_export_file(
+            output,
+            f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            'application/zip'
+        )
+    except Exception as e:
+        logger.error(f"Snapshot Export Error: {str(e)}")
+        flash('Gagal membuat snapshot data: ' + str(e), 'error')
+        return redirect(url_for('dashboard'))
+
+# ==============================================
+# EXPORT JOBS
+# ==============================================
+
+# Long PDF/Excel exports run in a per-process worker pool instead of the
+# request thread. Job state is kept in export_jobs (migrations/008), so any
+# process can report a job's progress. The files are written to
+# EXPORT_FOLDER, which every process serving downloads must be able to read
+# (shared storage when there is more than one host), and are deleted with
+# their job after EXPORT_JOB_TTL.
+EXPORT_JOB_WORKERS = 2
+EXPORT_JOB_TTL = 3600  # seconds a job and its file are kept
+EXPORT_JOB_PROGRESS_INTERVAL = 1  # seconds between progress writes
+EXPORT_JOB_EVENTS_TIMEOUT = 30  # seconds an event stream holds a worker; clients reconnect
+EXPORT_JOB_EVENTS_RETRY = 2000  # milliseconds before an event stream client reconnects
+EXPORT_JOB_PURGE_INTERVAL = 300  # seconds between purges of expired jobs, per process
+EXPORT_JOB_FOLDER = app.config['EXPORT_FOLDER']
+
+EXPORT_JOB_SPECS = {name: (spec, admin_only) for name, spec, admin_only in SNAPSHOT_EXPORTS}
+
+_export_executor = None
+_export_executor_lock = threading.Lock()
+
+def get_export_executor():
+    """Start the export worker pool once per process"""
+    global _export_executor
+    with _export_executor_lock:
+        if _export_executor is None:
+            _export_executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS,
+                                                  thread_name_prefix='export-job')
+        return _export_executor
+
+def _export_job_write(query, params=None, fetch=False):
+    """Run a job bookkeeping statement on its own connection and commit at once.
+
+    Job rows must be visible to other workers straight away, independent of
+    the request or export transaction running on this thread.
+    """
+    conn = get_db_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchall() if fetch else None
+    finally:
+        release_db_connection(conn, discard=conn.closed != 0)
+
+def _update_export_job(job_id, **fields):
+    assignments = [f"{name} = %s" for name in fields]
+    params = list(fields.values())
+    if fields.get('status') in ('done', 'failed'):
+        assignments.append("finished_at = now(), expires_at = now() + %s * interval '1 second'")
+        params.append(EXPORT_JOB_TTL)
+    _export_job_write(f"UPDATE export_jobs SET {', '.join(assignments)} WHERE id = %s",
+                      params + [job_id])
+
+def purge_export_jobs():
+    """Delete expired jobs and their files"""
+    for _, file_name in _export_job_write(
+            "DELETE FROM export_jobs WHERE expires_at < now() RETURNING id, file_name", fetch=True):
+        if file_name:
+            try:
+                os.remove(os.path.join(EXPORT_JOB_FOLDER, file_name))
+            except FileNotFoundError:
+                pass
+
+_export_purge_lock = threading.Lock()
+_export_purged_at = 0.0
+
+@app.before_request
+def schedule_export_job_purge():
+    """Purge expired jobs in the worker pool every EXPORT_JOB_PURGE_INTERVAL"""
+    global _export_purged_at
+    with _export_purge_lock:
+        if time.monotonic() - _export_purged_at < EXPORT_JOB_PURGE_INTERVAL:
+            return
+        _export_purged_at = time.monotonic()
+    get_export_executor().submit(_purge_export_jobs_logged)
+
+def _purge_export_jobs_logged():
+    try:
+        purge_export_jobs()
+    except Exception as e:
+        logger.error(f"Export job purge failed: {str(e)}")
+
+def _track_export_progress(job_id, rows):
+    done, reported = 0, time.monotonic()
+    for row in rows:
+        yield row
+        done += 1
+        if time.monotonic() - reported >= EXPORT_JOB_PROGRESS_INTERVAL:
+            _update_export_job(job_id, progress=done)
+            reported = time.monotonic()
+    _update_export_job(job_id, progress=done)
+
+@contextmanager
+def _export_job_connection(scope):
+    """Bind a pooled connection with the job owner's perwakilan scope to this thread"""
+    conn = get_db_connection()
+    discard = False
+    _tx_local.conn = conn
+    _tx_local.db_pending = False
+    try:
+        if scope is not None:
+            set_connection_scope(conn, scope)
+        yield conn
+    finally:
+        _tx_local.conn = None
+        try:
+            conn.rollback()
+            if scope is not None:
+                set_connection_scope(conn, None)
+        except psycopg2.Error:
+            discard = True
+        release_db_connection(conn, discard=discard or conn.closed != 0)
+
+def _run_export_job(job_id, spec, fmt, query, params, search, scope, is_admin):
+    _, build, extension, _ = EXPORT_FORMATS[fmt]
+    # The file name is not derived from the job id, which shows up in URLs
+    file_name = f"{uuid4().hex}.{extension}"
+    path = os.path.join(EXPORT_JOB_FOLDER, file_name)
+    try:
+        with _export_job_connection(scope):
+            total = execute_query(f"SELECT COUNT(*) FROM ({query}) t", params, fetch_one=True)[0]
+            _update_export_job(job_id, status='running', total=total)
+            with closing(iter_query_rows(query, params)) as rows:
+                output = build(spec, export_columns(spec, fmt, is_admin),
+                               _track_export_progress(job_id, rows), search)
+
+        with output, open(path, 'wb') as f:
+            output.seek(0)
+            shutil.copyfileobj(output, f, EXPORT_CHUNK_SIZE)
+        _update_export_job(job_id, status='done', file_name=file_name)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        if os.path.exists(path):
+            os.remove(path)
+        _update_export_job(job_id, status='failed', error=str(e))
+
+def get_export_job(job_id, user_id, download_url=None):
+    """Return the user's job as a dict (with download_url once it is done), or None"""
+    row = execute_query("""
+        SELECT id, entity, format, status, progress, total, error
+        FROM export_jobs
+        WHERE id = %s AND user_id = %s AND expires_at > now()
+    """, (job_id, user_id), fetch_one=True)
+    if row is None:
+        return None
+    job = dict(zip(('id', 'entity', 'format', 'status', 'progress', 'total', 'error'), row))
+    job['download_url'] = download_url if job['status'] == 'done' else None
+    return job
+
+@app.route('/export/jobs', methods=['POST'])
+def submit_export_job():
+    """Queue a PDF/Excel export of a list view; returns (or redirects to) the job"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    entity = request.form.get('entity', '')
+    fmt = request.form.get('format', '')
+    is_admin = session.get('role') == 0
+    spec, admin_only = EXPORT_JOB_SPECS.get(entity, (None, False))
+    if spec is None or fmt not in EXPORT_FORMATS or (admin_only and not is_admin):
+        flash('Jenis export tidak valid', 'error')
+        return redirect(url_for('dashboard'))
+
+    search = request.form.get('search', '').strip()
+    query, params = export_query(spec, search, request.form.get('sort'), request.form.get('dir', 'asc'))
+    job_id = uuid4().hex
+    try:
+        os.makedirs(EXPORT_JOB_FOLDER, exist_ok=True)
+        _export_job_write("""
+            INSERT INTO export_jobs (id, user_id, entity, format, expires_at)
+            VALUES (%s, %s, %s, %s, now() + %s * interval '1 second')
+        """, (job_id, session['user_id'], entity, fmt, EXPORT_JOB_TTL))
+        get_export_executor().submit(_run_export_job, job_id, spec, fmt, query, params, search,
+                                     current_perwakilan_scope(), is_admin)
+    except Exception as e:
+        logger.error(f"Error submitting export job: {str(e)}")
+        flash('Gagal memulai export: ' + str(e), 'error')
+        return redirect(url_for(spec['list_endpoint']))
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'id': job_id,
+            'status_url': url_for('export_job_status', job_id=job_id),
+            'events_url': url_for('export_job_events', job_id=job_id),
+        }), 202
+    return redirect(url_for('view_export_job', job_id=job_id))
+
+@app.route('/export/jobs/<job_id>')
+def view_export_job(job_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    job = get_export_job(job_id, session['user_id'], url_for('download_export_job', job_id=job_id))
+    if job is None:
+        flash('Export tidak ditemukan atau sudah kedaluwarsa', 'error')
+        return redirect(url_for('dashboard'))
+    spec, _ = EXPORT_JOB_SPECS[job['entity']]
+    return render_template('export/job.html', job=job, title=spec['title'],
+                           list_endpoint=spec['list_endpoint'])
+
+@app.route('/export/jobs/<job_id>/status')
+def export_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    job = get_export_job(job_id, session['user_id'], url_for('download_export_job', job_id=job_id))
+    if job is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(job)
+
+@app.route('/export/jobs/<job_id>/events')
+def export_job_events(job_id):
+    """Server-sent events with the job's state whenever it changes.
+
+    Each stream ends after EXPORT_JOB_EVENTS_TIMEOUT so it does not hold a
+    worker thread for long; EventSource clients reconnect on their own. The
+    progress page polls export_job_status instead.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    user_id = session['user_id']
+    download_url = url_for('download_export_job', job_id=job_id)
+
+    def generate():
+        yield f"retry: {EXPORT_JOB_EVENTS_RETRY}\n\n"
+        last = None
+        deadline = time.monotonic() + EXPORT_JOB_EVENTS_TIMEOUT
+        while time.monotonic() < deadline:
+            job = get_export_job(job_id, user_id, download_url)
+            if job != last:
+                yield f"data: {json.dumps(job)}\n\n"
+                last = job
+            if job is None or job['status'] in ('done', 'failed'):
+                return
+            time.sleep(EXPORT_JOB_PROGRESS_INTERVAL)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/export/jobs/<job_id>/download')
+def download_export_job(job_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    row = execute_query("""
+        SELECT entity, format, file_name, created_at
+        FROM export_jobs
+        WHERE id = %s AND user_id = %s AND status = 'done' AND expires_at > now()
+    """, (job_id, session['user_id']), fetch_one=True)
+    path = os.path.join(EXPORT_JOB_FOLDER, row[2]) if row else None
+    if path is None or not os.path.exists(path):
+        flash('File export tidak ditemukan atau sudah kedaluwarsa', 'error')
+        return redirect(url_for('dashboard'))
+
+    spec, _ = EXPORT_JOB_SPECS[row[0]]
+    _, _, extension, mimetype = EXPORT_FORMATS[row[1]]
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f"{spec['filename']}_{row[3].strftime('%Y%m%d_%H%M%S')}.{extension}",
+        mimetype=mimetype
+    )
+
+# ==============================================
 # RUN APPLICATION
 # ==============================================
 
 if __name__ == '__main__':
+    try:
+        db_pool.fill()
+        apply_migrations()
+    except psycopg2.Error as e:
+        logger.error(f"Could not prepare database: {e}")
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,108 @@
+-- Trigram indexes for the list/export search filters (col ILIKE '%term%').
+-- A B-tree cannot serve a leading wildcard; a pg_trgm GIN index can, and
+-- the per-column indexes of one table combine into a BitmapOr.
+--
+-- Searches on joined lookup tables are written as
+--   fk = ANY(ARRAY(SELECT key FROM lookup WHERE col ILIKE %s))
+-- so they also need a B-tree on the foreign key column.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- tabel_pengguna
+CREATE INDEX IF NOT EXISTS idx_pengguna_nama_pengguna_trgm ON tabel_pengguna USING gin (nama_pengguna gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pengguna_username_trgm ON tabel_pengguna USING gin (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pengguna_id_pengguna_trgm ON tabel_pengguna USING gin (id_pengguna gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pengguna_id_pwk ON tabel_pengguna (id_pwk);
+
+-- ref_perwakilan
+CREATE INDEX IF NOT EXISTS idx_perwakilan_nama_perwakilan_trgm ON ref_perwakilan USING gin (nama_perwakilan gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_perwakilan_negara_trgm ON ref_perwakilan USING gin (negara gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_perwakilan_trigram_trgm ON ref_perwakilan USING gin (trigram gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_perwakilan_bigram_trgm ON ref_perwakilan USING gin (bigram gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_perwakilan_jenis_pwk_trgm ON ref_perwakilan USING gin (jenis_pwk gin_trgm_ops);
+
+-- tabel_kepri
+CREATE INDEX IF NOT EXISTS idx_kepri_nama_trgm ON tabel_kepri USING gin (nama gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_kepri_id_pwk_trgm ON tabel_kepri USING gin (id_pwk gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_kepri_tahun_trgm ON tabel_kepri USING gin ((tahun::text) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_kepri_id_pwk ON tabel_kepri (id_pwk);
+
+-- tabel_jabatan
+CREATE INDEX IF NOT EXISTS idx_jabatan_nama_trgm ON tabel_jabatan USING gin (nama gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_jabatan_singkatan_trgm ON tabel_jabatan USING gin (singkatan gin_trgm_ops);
+
+-- tabel_personel
+CREATE INDEX IF NOT EXISTS idx_personel_nama_trgm ON tabel_personel USING gin (nama gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personel_nip_trgm ON tabel_personel USING gin (nip gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personel_pangkat_gol_trgm ON tabel_personel USING gin (pangkat_gol gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personel_id_pwk_trgm ON tabel_personel USING gin (id_pwk gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personel_id_jabatan ON tabel_personel (id_jabatan);
+CREATE INDEX IF NOT EXISTS idx_personel_id_pwk ON tabel_personel (id_pwk);
+
+-- tabel_pegawai_setempat
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_nama_trgm ON tabel_pegawai_setempat USING gin (nama gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_nik_trgm ON tabel_pegawai_setempat USING gin (nik gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_telp_trgm ON tabel_pegawai_setempat USING gin (telp gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_email_trgm ON tabel_pegawai_setempat USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_id_pwk_trgm ON tabel_pegawai_setempat USING gin (id_pwk gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_id_pwk ON tabel_pegawai_setempat (id_pwk);
+
+-- tabel_jenis_pendidikan
+CREATE INDEX IF NOT EXISTS idx_jenis_pendidikan_jenis_pend_trgm ON tabel_jenis_pendidikan USING gin (jenis_pend gin_trgm_ops);
+
+-- tabel_pendidikan
+CREATE INDEX IF NOT EXISTS idx_pendidikan_nama_pend_trgm ON tabel_pendidikan USING gin (nama_pend gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pendidikan_tahun_trgm ON tabel_pendidikan USING gin ((tahun::text) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_pendidikan_id_personel ON tabel_pendidikan (id_personel);
+CREATE INDEX IF NOT EXISTS idx_pendidikan_id_jabatan ON tabel_pendidikan (id_jabatan);
+CREATE INDEX IF NOT EXISTS idx_pendidikan_id_jenis_pendidikan ON tabel_pendidikan (id_jenis_pendidikan);
+
+-- tabel_jenis_fungsional
+CREATE INDEX IF NOT EXISTS idx_jenis_fungsional_nama_fungsional_trgm ON tabel_jenis_fungsional USING gin (nama_fungsional gin_trgm_ops);
+
+-- tabel_fungsional
+CREATE INDEX IF NOT EXISTS idx_fungsional_nama_fungsional ON tabel_fungsional (nama_fungsional);
+CREATE INDEX IF NOT EXISTS idx_fungsional_nama_pendidikan ON tabel_fungsional (nama_pendidikan);
+CREATE INDEX IF NOT EXISTS idx_fungsional_id_personel ON tabel_fungsional (id_personel);
+
+-- tabel_aks (tgl_penggantian::text depends on DateStyle and cannot be indexed)
+CREATE INDEX IF NOT EXISTS idx_aks_aks_trgm ON tabel_aks USING gin (aks gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_aks_no_berita_trgm ON tabel_aks USING gin (no_berita gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_aks_id_personel ON tabel_aks (id_personel);
+CREATE INDEX IF NOT EXISTS idx_aks_id_pwk ON tabel_aks (id_pwk);
+
+-- ref_jenis_sistem
+CREATE INDEX IF NOT EXISTS idx_jenis_sistem_id_jenis_trgm ON ref_jenis_sistem USING gin (id_jenis gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_jenis_sistem_jenis_trgm ON ref_jenis_sistem USING gin (jenis gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_jenis_sistem_kategori_trgm ON ref_jenis_sistem USING gin (kategori gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_jenis_sistem_format_nomor_trgm ON ref_jenis_sistem USING gin (format_nomor gin_trgm_ops);
+
+-- tabel_sistem
+CREATE INDEX IF NOT EXISTS idx_sistem_id_sistem_trgm ON tabel_sistem USING gin (id_sistem gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sistem_no_sistem_trgm ON tabel_sistem USING gin (no_sistem gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sistem_nama_sistem_trgm ON tabel_sistem USING gin (nama_sistem gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sistem_tahun_trgm ON tabel_sistem USING gin ((tahun::text) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sistem_id_jenis ON tabel_sistem (id_jenis);
+
+-- tabel_alkom
+CREATE INDEX IF NOT EXISTS idx_alkom_provider_trgm ON tabel_alkom USING gin (provider gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_alkom_jenis_telpon_satelit_trgm ON tabel_alkom USING gin (jenis_telpon_satelit gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_alkom_nomor_telp_satelit_trgm ON tabel_alkom USING gin (nomor_telp_satelit gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_alkom_pengadaan_trgm ON tabel_alkom USING gin (pengadaan gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_alkom_no_bmn_trgm ON tabel_alkom USING gin (no_bmn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_alkom_perwakilan ON tabel_alkom (perwakilan);
+
+-- tipe_palsan
+CREATE INDEX IF NOT EXISTS idx_tipe_palsan_id_tipe_trgm ON tipe_palsan USING gin (id_tipe gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tipe_palsan_nama_trgm ON tipe_palsan USING gin (nama gin_trgm_ops);
+
+-- tabel_palsan
+CREATE INDEX IF NOT EXISTS idx_palsan_id_palsan_trgm ON tabel_palsan USING gin (id_palsan gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_palsan_serial_number_trgm ON tabel_palsan USING gin (serial_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_palsan_status_trgm ON tabel_palsan USING gin (status gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_palsan_id_pwk ON tabel_palsan (id_pwk);
+CREATE INDEX IF NOT EXISTS idx_palsan_id_tipe ON tabel_palsan (id_tipe);
+
+-- ref_kategori_sistem
+CREATE INDEX IF NOT EXISTS idx_kategori_sistem_kategori_trgm ON ref_kategori_sistem USING gin (kategori gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_kategori_sistem_keterangan_trgm ON ref_kategori_sistem USING gin (keterangan gin_trgm_ops);
@@ -0,0 +1,69 @@
+-- Full-text search vectors for the global /search endpoint.
+-- Each searchable table gets a stored tsvector column kept up to date by
+-- PostgreSQL itself, and a GIN index on it. The 'simple' configuration is
+-- used because the data is mostly names, numbers (NIP, NIK, serials) and
+-- trigram codes, which language stemming would only mangle.
+-- Weight A marks identifying fields (names, numbers, codes), B the rest.
+
+ALTER TABLE tabel_personel ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nama, '') || ' ' || coalesce(nip, '') || ' ' || coalesce(id_pwk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(pangkat_gol, '') || ' ' || coalesce(penempatan, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_personel_search ON tabel_personel USING gin (search_vector);
+
+ALTER TABLE tabel_pegawai_setempat ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nama, '') || ' ' || coalesce(nik, '') || ' ' || coalesce(id_pwk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(telp, '') || ' ' || coalesce(email, '') || ' ' || coalesce(t_lahir, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_search ON tabel_pegawai_setempat USING gin (search_vector);
+
+ALTER TABLE tabel_pendidikan ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nama_pend, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tahun::text, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_pendidikan_search ON tabel_pendidikan USING gin (search_vector);
+
+ALTER TABLE tabel_fungsional ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(no_sk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(jenjang, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_fungsional_search ON tabel_fungsional USING gin (search_vector);
+
+ALTER TABLE tabel_aks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(aks, '') || ' ' || coalesce(no_berita, '') || ' ' || coalesce(id_pwk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(status::text, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_aks_search ON tabel_aks USING gin (search_vector);
+
+ALTER TABLE tabel_alkom ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nomor_telp_satelit, '') || ' ' || coalesce(no_bmn, '') || ' ' || coalesce(perwakilan, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(provider, '') || ' ' || coalesce(jenis_telpon_satelit, '') || ' ' || coalesce(pengadaan, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_alkom_search ON tabel_alkom USING gin (search_vector);
+
+ALTER TABLE tabel_palsan ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(id_palsan, '') || ' ' || coalesce(serial_number, '') || ' ' || coalesce(id_pwk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(status::text, '') || ' ' || coalesce(pengadaan, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_palsan_search ON tabel_palsan USING gin (search_vector);
+
+ALTER TABLE tabel_sistem ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(id_sistem, '') || ' ' || coalesce(no_sistem, '') || ' ' || coalesce(nama_sistem, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tahun::text, '') || ' ' || coalesce(status::text, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_sistem_search ON tabel_sistem USING gin (search_vector);
+
+ALTER TABLE tabel_kepri ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nama, '') || ' ' || coalesce(id_pwk, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tahun::text, '') || ' ' || coalesce(status::text, '') || ' ' || coalesce(keterangan, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_kepri_search ON tabel_kepri USING gin (search_vector);
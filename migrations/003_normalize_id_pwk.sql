@@ -0,0 +1,35 @@
+-- Perwakilan trigrams are normalized (trimmed, upper case) when written,
+-- so scoping predicates can be plain equality. Bring existing rows in line
+-- and index the scoped lists on (trigram, key): a non-admin list page is
+-- then an index range scan already in key order.
+-- ref_perwakilan.trigram has always been written upper case and is left alone.
+
+UPDATE tabel_personel SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_pegawai_setempat SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_kepri SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_aks SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_palsan SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_pengguna SET id_pwk = UPPER(TRIM(id_pwk)) WHERE id_pwk <> UPPER(TRIM(id_pwk));
+UPDATE tabel_alkom SET perwakilan = UPPER(TRIM(perwakilan)) WHERE perwakilan <> UPPER(TRIM(perwakilan));
+UPDATE ref_jenis_sistem SET trigram_pwk = UPPER(TRIM(trigram_pwk)) WHERE trigram_pwk <> UPPER(TRIM(trigram_pwk));
+
+-- The composite indexes replace the single-column ones from 001
+DROP INDEX IF EXISTS idx_personel_id_pwk;
+DROP INDEX IF EXISTS idx_pegawai_setempat_id_pwk;
+DROP INDEX IF EXISTS idx_kepri_id_pwk;
+DROP INDEX IF EXISTS idx_aks_id_pwk;
+DROP INDEX IF EXISTS idx_palsan_id_pwk;
+DROP INDEX IF EXISTS idx_pengguna_id_pwk;
+DROP INDEX IF EXISTS idx_alkom_perwakilan;
+
+CREATE INDEX IF NOT EXISTS idx_personel_id_pwk_no ON tabel_personel (id_pwk, no);
+CREATE INDEX IF NOT EXISTS idx_pegawai_setempat_id_pwk_no ON tabel_pegawai_setempat (id_pwk, no);
+CREATE INDEX IF NOT EXISTS idx_kepri_id_pwk_no ON tabel_kepri (id_pwk, no);
+CREATE INDEX IF NOT EXISTS idx_aks_id_pwk_no ON tabel_aks (id_pwk, no);
+CREATE INDEX IF NOT EXISTS idx_palsan_id_pwk_id_palsan ON tabel_palsan (id_pwk, id_palsan);
+CREATE INDEX IF NOT EXISTS idx_pengguna_id_pwk_id_pengguna ON tabel_pengguna (id_pwk, id_pengguna);
+CREATE INDEX IF NOT EXISTS idx_alkom_perwakilan_no ON tabel_alkom (perwakilan, no);
+CREATE INDEX IF NOT EXISTS idx_jenis_sistem_trigram_pwk ON ref_jenis_sistem (trigram_pwk);
+
+ANALYZE tabel_personel, tabel_pegawai_setempat, tabel_kepri, tabel_aks, tabel_palsan,
+        tabel_pengguna, tabel_alkom, ref_jenis_sistem;
@@ -0,0 +1,83 @@
+-- Row-level security for perwakilan tenancy.
+-- Non-admin requests run as app_perwakilan (SET ROLE) with app.trigram set
+-- to the user's trigram; the policies below apply to that role only, so
+-- admin requests, migrations and background work keep unrestricted access
+-- without an extra predicate. Each policy is a single equality on the
+-- (id_pwk, key) indexes from 003.
+--
+-- all_rows keeps every table readable and writable for other roles; the
+-- restrictive perwakilan_scope is ANDed on top of it for app_perwakilan.
+-- With no WITH CHECK clause, rows written as app_perwakilan must also
+-- satisfy USING, so a user cannot insert or move rows to another trigram.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'app_perwakilan') THEN
+        CREATE ROLE app_perwakilan NOLOGIN;
+    END IF;
+END
+$$;
+
+GRANT app_perwakilan TO CURRENT_USER;
+GRANT USAGE ON SCHEMA public TO app_perwakilan;
+GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN SCHEMA public TO app_perwakilan;
+GRANT USAGE, SELECT, UPDATE ON ALL SEQUENCES IN SCHEMA public TO app_perwakilan;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT, INSERT, UPDATE, DELETE ON TABLES TO app_perwakilan;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT USAGE, SELECT, UPDATE ON SEQUENCES TO app_perwakilan;
+
+ALTER TABLE tabel_personel ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_personel;
+CREATE POLICY all_rows ON tabel_personel USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_personel;
+CREATE POLICY perwakilan_scope ON tabel_personel AS RESTRICTIVE TO app_perwakilan
+    USING (id_pwk = current_setting('app.trigram', true));
+
+ALTER TABLE tabel_pegawai_setempat ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_pegawai_setempat;
+CREATE POLICY all_rows ON tabel_pegawai_setempat USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_pegawai_setempat;
+CREATE POLICY perwakilan_scope ON tabel_pegawai_setempat AS RESTRICTIVE TO app_perwakilan
+    USING (id_pwk = current_setting('app.trigram', true));
+
+ALTER TABLE tabel_kepri ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_kepri;
+CREATE POLICY all_rows ON tabel_kepri USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_kepri;
+CREATE POLICY perwakilan_scope ON tabel_kepri AS RESTRICTIVE TO app_perwakilan
+    USING (id_pwk = current_setting('app.trigram', true));
+
+ALTER TABLE tabel_aks ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_aks;
+CREATE POLICY all_rows ON tabel_aks USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_aks;
+CREATE POLICY perwakilan_scope ON tabel_aks AS RESTRICTIVE TO app_perwakilan
+    USING (id_pwk = current_setting('app.trigram', true));
+
+ALTER TABLE tabel_palsan ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_palsan;
+CREATE POLICY all_rows ON tabel_palsan USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_palsan;
+CREATE POLICY perwakilan_scope ON tabel_palsan AS RESTRICTIVE TO app_perwakilan
+    USING (id_pwk = current_setting('app.trigram', true));
+
+ALTER TABLE tabel_alkom ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_alkom;
+CREATE POLICY all_rows ON tabel_alkom USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_alkom;
+CREATE POLICY perwakilan_scope ON tabel_alkom AS RESTRICTIVE TO app_perwakilan
+    USING (perwakilan = current_setting('app.trigram', true));
+
+-- Pendidikan and fungsional belong to the perwakilan of their personel
+ALTER TABLE tabel_pendidikan ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_pendidikan;
+CREATE POLICY all_rows ON tabel_pendidikan USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_pendidikan;
+CREATE POLICY perwakilan_scope ON tabel_pendidikan AS RESTRICTIVE TO app_perwakilan
+    USING (id_personel IN (SELECT no FROM tabel_personel WHERE id_pwk = current_setting('app.trigram', true)));
+
+ALTER TABLE tabel_fungsional ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON tabel_fungsional;
+CREATE POLICY all_rows ON tabel_fungsional USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON tabel_fungsional;
+CREATE POLICY perwakilan_scope ON tabel_fungsional AS RESTRICTIVE TO app_perwakilan
+    USING (id_personel IN (SELECT no FROM tabel_personel WHERE id_pwk = current_setting('app.trigram', true)));
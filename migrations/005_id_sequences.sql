@@ -0,0 +1,38 @@
+-- Sequences behind the formatted IDs (U0001, K0001, J0001, S0001, P0001,
+-- PL001) and the perwakilan numbers. IDs are allocated with nextval()
+-- inside the INSERT, replacing the MAX()/ORDER BY DESC lookups that raced
+-- under concurrent creates and sorted PL999 after PL1000.
+
+-- prefix || n, zero-padded to width; longer numbers are never truncated
+CREATE OR REPLACE FUNCTION format_id(prefix text, width integer, n bigint)
+RETURNS text
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT prefix || CASE WHEN length(n::text) >= width THEN n::text
+                          ELSE lpad(n::text, width, '0') END
+$$;
+
+CREATE SEQUENCE IF NOT EXISTS seq_id_pengguna;
+CREATE SEQUENCE IF NOT EXISTS seq_id_kategori_sistem;
+CREATE SEQUENCE IF NOT EXISTS seq_id_jenis_sistem;
+CREATE SEQUENCE IF NOT EXISTS seq_id_sistem;
+CREATE SEQUENCE IF NOT EXISTS seq_id_tipe_palsan;
+CREATE SEQUENCE IF NOT EXISTS seq_id_palsan;
+CREATE SEQUENCE IF NOT EXISTS seq_perwakilan_no;
+CREATE SEQUENCE IF NOT EXISTS seq_perwakilan_urutan;
+
+-- Continue after the highest number already in use
+SELECT setval('seq_id_pengguna', COALESCE(MAX(substring(id_pengguna FROM 2)::bigint), 0) + 1, false)
+FROM tabel_pengguna WHERE id_pengguna ~ '^U[0-9]+$';
+SELECT setval('seq_id_kategori_sistem', COALESCE(MAX(substring(id FROM 2)::bigint), 0) + 1, false)
+FROM ref_kategori_sistem WHERE id ~ '^K[0-9]+$';
+SELECT setval('seq_id_jenis_sistem', COALESCE(MAX(substring(id_jenis FROM 2)::bigint), 0) + 1, false)
+FROM ref_jenis_sistem WHERE id_jenis ~ '^J[0-9]+$';
+SELECT setval('seq_id_sistem', COALESCE(MAX(substring(id_sistem FROM 2)::bigint), 0) + 1, false)
+FROM tabel_sistem WHERE id_sistem ~ '^S[0-9]+$';
+SELECT setval('seq_id_tipe_palsan', COALESCE(MAX(substring(id_tipe FROM 2)::bigint), 0) + 1, false)
+FROM tipe_palsan WHERE id_tipe ~ '^P[0-9]+$';
+SELECT setval('seq_id_palsan', COALESCE(MAX(substring(id_palsan FROM 3)::bigint), 0) + 1, false)
+FROM tabel_palsan WHERE id_palsan ~ '^PL[0-9]+$';
+SELECT setval('seq_perwakilan_no', COALESCE(MAX(no_perwakilan), 0) + 1, false) FROM ref_perwakilan;
+SELECT setval('seq_perwakilan_urutan', COALESCE(MAX(no_urutan), 0) + 1, false) FROM ref_perwakilan;
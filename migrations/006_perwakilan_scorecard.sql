@@ -0,0 +1,63 @@
+-- Per-perwakilan scorecard: what each perwakilan holds, one row per trigram.
+-- Each source table is grouped once; the dashboard reads the result with a
+-- single indexed lookup. The unique index allows REFRESH ... CONCURRENTLY,
+-- so readers are never blocked while it is rebuilt.
+-- Sistem rows belong to the perwakilan of their jenis sistem.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_perwakilan_scorecard AS
+SELECT r.trigram,
+       r.nama_perwakilan,
+       COALESCE(per.total, 0) AS personel,
+       COALESCE(peg.total, 0) AS pegawai_setempat,
+       COALESCE(pend.total, 0) AS pendidikan,
+       COALESCE(fung.total, 0) AS fungsional,
+       COALESCE(aks.total, 0) AS aks,
+       COALESCE(alkom.total, 0) AS alkom,
+       COALESCE(pal.total, 0) AS palsan,
+       COALESCE(pal.dipinjamkan, 0) AS palsan_dipinjamkan,
+       COALESCE(sis.belum_berlaku, 0) AS sistem_belum_berlaku,
+       COALESCE(sis.sedang_berlaku, 0) AS sistem_sedang_berlaku,
+       COALESCE(sis.tidak_berlaku, 0) AS sistem_tidak_berlaku,
+       now() AS refreshed_at
+FROM ref_perwakilan r
+LEFT JOIN (SELECT id_pwk, COUNT(*) AS total FROM tabel_personel GROUP BY id_pwk) per
+       ON per.id_pwk = r.trigram
+LEFT JOIN (SELECT id_pwk, COUNT(*) AS total FROM tabel_pegawai_setempat GROUP BY id_pwk) peg
+       ON peg.id_pwk = r.trigram
+LEFT JOIN (SELECT p.id_pwk, COUNT(*) AS total
+           FROM tabel_pendidikan d JOIN tabel_personel p ON d.id_personel = p.no
+           GROUP BY p.id_pwk) pend
+       ON pend.id_pwk = r.trigram
+LEFT JOIN (SELECT p.id_pwk, COUNT(*) AS total
+           FROM tabel_fungsional f JOIN tabel_personel p ON f.id_personel = p.no
+           GROUP BY p.id_pwk) fung
+       ON fung.id_pwk = r.trigram
+LEFT JOIN (SELECT id_pwk, COUNT(*) AS total FROM tabel_aks GROUP BY id_pwk) aks
+       ON aks.id_pwk = r.trigram
+LEFT JOIN (SELECT perwakilan, COUNT(*) AS total FROM tabel_alkom GROUP BY perwakilan) alkom
+       ON alkom.perwakilan = r.trigram
+LEFT JOIN (SELECT id_pwk, COUNT(*) AS total,
+                  COUNT(*) FILTER (WHERE dipinjamkan = 1) AS dipinjamkan
+           FROM tabel_palsan GROUP BY id_pwk) pal
+       ON pal.id_pwk = r.trigram
+LEFT JOIN (SELECT j.trigram_pwk,
+                  COUNT(*) FILTER (WHERE s.status = 0) AS belum_berlaku,
+                  COUNT(*) FILTER (WHERE s.status = 1) AS sedang_berlaku,
+                  COUNT(*) FILTER (WHERE s.status = 2) AS tidak_berlaku
+           FROM tabel_sistem s JOIN ref_jenis_sistem j ON s.id_jenis = j.id_jenis
+           GROUP BY j.trigram_pwk) sis
+       ON sis.trigram_pwk = r.trigram;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_perwakilan_scorecard_trigram ON mv_perwakilan_scorecard (trigram);
+
+-- Materialized views cannot carry row-level security, so app_perwakilan
+-- reads the scorecard through a view that keeps only its own trigram.
+-- The view runs with its owner's rights; current_user is still the caller.
+REVOKE ALL ON mv_perwakilan_scorecard FROM app_perwakilan;
+
+CREATE OR REPLACE VIEW v_perwakilan_scorecard WITH (security_barrier) AS
+SELECT * FROM mv_perwakilan_scorecard
+WHERE current_user <> 'app_perwakilan'
+   OR trigram = current_setting('app.trigram', true);
+
+GRANT SELECT ON v_perwakilan_scorecard TO app_perwakilan;
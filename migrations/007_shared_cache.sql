@@ -0,0 +1,18 @@
+-- Cache entries shared by every app process and node (SharedCache in app.py).
+-- UNLOGGED skips the WAL, so writes are cheap; the table is emptied after a
+-- crash, which only costs cache misses. Each cache uses its own namespace;
+-- entity lets writes drop every entry derived from a table, accessed_at
+-- drives least-recently-used pruning.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS app_cache (
+    namespace VARCHAR(50) NOT NULL,
+    key TEXT NOT NULL,
+    entity VARCHAR(50) NOT NULL,
+    value BYTEA NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    accessed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_app_cache_entity ON app_cache (namespace, entity);
+CREATE INDEX IF NOT EXISTS idx_app_cache_accessed_at ON app_cache (namespace, accessed_at);
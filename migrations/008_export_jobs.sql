@@ -0,0 +1,22 @@
+-- Background PDF/Excel exports (EXPORT JOBS in app.py). Any app process may
+-- answer the status and download requests of a job another one runs, so
+-- job state lives here; the finished files are kept under
+-- EXPORT_FOLDER until expires_at, then deleted with their row.
+
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    entity VARCHAR(50) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    file_name TEXT,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_user_id ON export_jobs (user_id);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_expires_at ON export_jobs (expires_at);
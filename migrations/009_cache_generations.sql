@@ -0,0 +1,13 @@
+-- Invalidation counters for the shared caches (SharedCache in app.py).
+-- invalidate() bumps the (namespace, entity) row in the writer's own
+-- transaction; clear() bumps the namespace-wide '*' row. A value computed
+-- by any process is only stored if the counters it read before computing
+-- are unchanged, so a total counted from rows that a concurrent write has
+-- since replaced is never cached.
+
+CREATE TABLE IF NOT EXISTS app_cache_generation (
+    namespace VARCHAR(50) NOT NULL,
+    entity VARCHAR(50) NOT NULL,
+    generation BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, entity)
+);
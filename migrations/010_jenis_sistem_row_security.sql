@@ -0,0 +1,14 @@
+-- Row-level security for ref_jenis_sistem, on the same terms as 004.
+-- A jenis belongs to the perwakilan in trigram_pwk; rows with no
+-- perwakilan (NULL) or marked 'ALL' are shared and stay visible to every
+-- scoped user. A scoped user with an empty app.trigram only sees those.
+
+UPDATE ref_jenis_sistem SET trigram_pwk = UPPER(TRIM(trigram_pwk))
+WHERE trigram_pwk IS DISTINCT FROM UPPER(TRIM(trigram_pwk));
+
+ALTER TABLE ref_jenis_sistem ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS all_rows ON ref_jenis_sistem;
+CREATE POLICY all_rows ON ref_jenis_sistem USING (true);
+DROP POLICY IF EXISTS perwakilan_scope ON ref_jenis_sistem;
+CREATE POLICY perwakilan_scope ON ref_jenis_sistem AS RESTRICTIVE TO app_perwakilan
+    USING (trigram_pwk IS NULL OR trigram_pwk IN ('ALL', current_setting('app.trigram', true)));
@@ -0,0 +1,4 @@
+-- AKS searches match tgl_penggantian by equality when the search term is a
+-- date (search_date() in app.py) instead of ILIKE on its text form, which
+-- no index could serve (see 001).
+CREATE INDEX IF NOT EXISTS idx_aks_tgl_penggantian ON tabel_aks (tgl_penggantian);